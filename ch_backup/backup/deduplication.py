@@ -39,6 +39,7 @@ class PartDedupInfo(Slotted):
         "disk_name",
         "verified",
         "encrypted",
+        "hash_of_all_files",
     )
 
     # pylint: disable=too-many-arguments,too-many-positional-arguments
@@ -56,6 +57,7 @@ class PartDedupInfo(Slotted):
         verified: bool,
         encrypted: bool,
         link_part_name: Optional[str] = None,
+        hash_of_all_files: Optional[str] = None,
     ) -> None:
         self.database = database
         self.table = table
@@ -69,6 +71,7 @@ class PartDedupInfo(Slotted):
         self.disk_name = disk_name
         self.verified = verified
         self.encrypted = encrypted
+        self.hash_of_all_files = hash_of_all_files
 
     def to_sql(self):
         """
@@ -76,7 +79,8 @@ class PartDedupInfo(Slotted):
         """
         files_array = "[" + ",".join(f"'{file}'" for file in self.files) + "]"
         link_part_name = self.link_part_name or ""
-        return f"('{self.database}','{self.table}','{self.name}','{self.backup_name}','{link_part_name}','{self.checksum}',{self.size},{files_array},{int(self.tarball)},'{self.disk_name}',{int(self.verified)}, {int(self.encrypted)})"
+        hash_of_all_files = self.hash_of_all_files or ""
+        return f"('{self.database}','{self.table}','{self.name}','{self.backup_name}','{link_part_name}','{self.checksum}',{self.size},{files_array},{int(self.tarball)},'{self.disk_name}',{int(self.verified)}, {int(self.encrypted)},'{hash_of_all_files}')"
 
 
 TableDedupReferences = Set[str]
@@ -221,6 +225,7 @@ def _populate_dedup_info(
                         # Propagate link_part_name so that downstream deduplication
                         # knows the actual storage name in the source backup.
                         link_part_name=part.link_part_name,
+                        hash_of_all_files=part.hash_of_all_files,
                     )
 
                     table_dedup_info.add(part.name)
@@ -274,12 +279,9 @@ def deduplicate_parts(
     """
     Deduplicate part if it's possible.
     """
-    layout = context.backup_layout
-
     existing_parts = context.ch_ctl.get_deduplication_info(
         database, table, frozen_parts
     )
-    deduplicated_parts: Dict[str, PartMetadata] = {}
 
     logging.debug(
         "Deduplication lookup for {}.{}: {} frozen parts, {} matches found. First match: {}",
@@ -290,6 +292,45 @@ def deduplicate_parts(
         existing_parts[0] if existing_parts else "none",
     )
 
+    return _deduplicate_parts(context, database, table, existing_parts)
+
+
+def deduplicate_parts_by_hash(
+    context: BackupContext,
+    database: str,
+    table: str,
+    part_hashes: Dict[str, str],
+) -> Dict[str, PartMetadata]:
+    """
+    Deduplicate parts by hashes of all files from system.parts if it's possible.
+
+    Unlike deduplicate_parts, it doesn't require scanning of frozen parts. Only parts of backups
+    created with deduplication by hashes enabled can be found.
+    """
+    existing_parts = context.ch_ctl.get_deduplication_info_by_hash(
+        database, table, part_hashes
+    )
+
+    logging.debug(
+        "Deduplication lookup by hashes for {}.{}: {} parts, {} matches found",
+        database,
+        table,
+        len(part_hashes),
+        len(existing_parts),
+    )
+
+    return _deduplicate_parts(context, database, table, existing_parts)
+
+
+def _deduplicate_parts(
+    context: BackupContext,
+    database: str,
+    table: str,
+    existing_parts: List[Dict],
+) -> Dict[str, PartMetadata]:
+    layout = context.backup_layout
+    deduplicated_parts: Dict[str, PartMetadata] = {}
+
     for existing_part in existing_parts:
         current_name = existing_part.get("current_name") or existing_part["name"]
         dedup_part_name = existing_part["name"]
@@ -328,6 +369,7 @@ def deduplicate_parts(
             tarball=existing_part["tarball"],
             disk_name=existing_part["disk_name"],
             encrypted=existing_part.get("encrypted", True),
+            hash_of_all_files=existing_part.get("hash_of_all_files") or None,
         )
 
         if not existing_part["verified"]:
@@ -4,6 +4,7 @@ Management of backup data layout.
 
 # pylint: disable=too-many-lines
 
+import copy
 import os
 from contextlib import contextmanager
 from functools import partial
@@ -18,6 +19,7 @@ from typing import (
     Literal,
     Optional,
     Sequence,
+    Tuple,
     Union,
 )
 from urllib.parse import quote
@@ -25,14 +27,16 @@ from urllib.parse import quote
 from nacl.exceptions import CryptoError
 
 from ch_backup import logging
-from ch_backup.backup.metadata import BackupMetadata, PartMetadata
+from ch_backup.backup.metadata import BackupMetadata, BackupState, PartMetadata
 from ch_backup.backup.metadata.table_metadata import TableMetadata
+from ch_backup.backup.part_cache import PartCache
 from ch_backup.calculators import calc_encrypted_size, calc_tarball_size
 from ch_backup.clickhouse.models import Database, Disk, FrozenPart, Table
 from ch_backup.config import Config
 from ch_backup.encryption import get_encryption
 from ch_backup.exceptions import StorageError
 from ch_backup.storage import StorageLoader
+from ch_backup.storage.async_pipeline.base_pipeline.exec_pool import ThreadExecPool
 from ch_backup.storage.engine.s3 import S3RetryingError
 from ch_backup.util import dir_is_empty, escape_metadata_file_name
 
@@ -61,6 +65,12 @@ class BackupLayout:
         self._encryption_metadata_size = get_encryption(
             enc_conf["type"], enc_conf
         ).metadata_size()
+        restore_conf = config["restore"]
+        self._part_cache: Optional[PartCache] = None
+        if restore_conf.get("part_cache_path"):
+            self._part_cache = PartCache(
+                restore_conf["part_cache_path"], restore_conf["part_cache_max_size"]
+            )
 
     def upload_backup_metadata(self, backup: BackupMetadata) -> None:
         """
@@ -215,10 +225,16 @@ class BackupLayout:
             raise StorageError(msg) from e
 
     def upload_data_part(
-        self, backup_meta: BackupMetadata, fpart: FrozenPart, callback: Callable
+        self,
+        backup_meta: BackupMetadata,
+        fpart: FrozenPart,
+        callback: Callable,
+        done_callback: Optional[Callable] = None,
     ) -> None:
         """
         Upload part data.
+
+        Callback is executed on waiting for completion of uploads, done callback right after the upload.
         """
         logging.debug(
             'Uploading data part {} of "{}"."{}"',
@@ -243,6 +259,8 @@ class BackupLayout:
                 encryption=backup_meta.encrypted,
                 delete=True,
                 callback=callback,
+                size=fpart.size,
+                done_callback=done_callback,
             )
         except Exception as e:
             msg = f"Failed to create async upload of {remote_path}"
@@ -619,12 +637,25 @@ class BackupLayout:
         part: PartMetadata,
         fs_part_path: str,
         callback: Callable,
+        owner: Optional[Tuple[str, str]] = None,
     ) -> None:
         """
         Download part data to the specified directory.
+
+        If owner (user and group) is specified, it's set to files of the part stored as tarball on their
+        creation. Parts stored as tarball are taken from the local part cache if it's configured, downloaded
+        ones are added to it.
         """
         source_part_name = part.deduplicated_part_name
 
+        if (
+            part.tarball
+            and self._part_cache
+            and self._part_cache.get(part, fs_part_path, owner)
+        ):
+            callback(part)
+            return
+
         logging.debug(
             'Downloading data part {} (stored as {}) of "{}"."{}"',
             part.name,
@@ -655,7 +686,11 @@ class BackupLayout:
                     local_path=fs_part_path,
                     is_async=True,
                     encryption=part.encrypted,
-                    callback=partial(callback, part),
+                    callback=partial(
+                        self._on_part_downloaded, part, fs_part_path, callback
+                    ),
+                    size=part.size,
+                    owner=owner,
                 )
             except Exception as e:
                 msg = f"Failed to download part tarball file {remote_path}"
@@ -676,6 +711,13 @@ class BackupLayout:
                     msg = f"Failed to download part file {remote_path}"
                     raise StorageError(msg) from e
 
+    def _on_part_downloaded(
+        self, part: PartMetadata, fs_part_path: str, callback: Callable
+    ) -> None:
+        if self._part_cache:
+            self._part_cache.put(part, fs_part_path)
+        callback(part)
+
     def check_data_part(self, backup_name: str, part: PartMetadata) -> bool:
         """
         Check availability of part data in storage.
@@ -840,6 +882,143 @@ class BackupLayout:
                     msg = f'Failed to download tarball file "{remote_path}"'
                     raise StorageError(msg) from e
 
+    def copy_backup(
+        self, backup_meta: BackupMetadata, target: "BackupLayout", threads: int
+    ) -> BackupMetadata:
+        """
+        Copy backup to the storage of target layout with server-side copy requests.
+
+        Parts deduplicated with other backups are copied into the target backup itself,
+        so the copy doesn't depend on other backups.
+        """
+        backup_path = self.get_backup_path(backup_meta.name)
+        target_backup_path = target.get_backup_path(backup_meta.name)
+
+        target_meta = copy.deepcopy(backup_meta)
+        # DEPRECATED: ``path`` is populated for backward compatibility.
+        target_meta.path = target_backup_path
+        target_meta.state = BackupState.CREATING
+
+        files_to_copy: List[tuple] = []
+        for remote_path in self._storage_loader.list_dir(
+            backup_path, recursive=True, absolute=True
+        ):
+            if os.path.basename(remote_path) in (
+                BACKUP_META_FNAME,
+                BACKUP_LIGHT_META_FNAME,
+            ):
+                continue
+            files_to_copy.append(
+                (
+                    remote_path,
+                    os.path.join(
+                        target_backup_path, os.path.relpath(remote_path, backup_path)
+                    ),
+                )
+            )
+
+        for db_name in backup_meta.get_databases():
+            for table in target_meta.get_tables(db_name):
+                linked_parts = [part for part in table.get_parts() if part.link]
+                target_meta.remove_parts(table, linked_parts)
+                for part in linked_parts:
+                    files_to_copy.extend(
+                        self._linked_part_files(part, target_backup_path)
+                    )
+                    target_meta.add_part(
+                        PartMetadata(
+                            database=part.database,
+                            table=part.table,
+                            name=part.name,
+                            checksum=part.checksum,
+                            size=part.size,
+                            files=part.files,
+                            tarball=part.tarball,
+                            disk_name=part.disk_name,
+                            encrypted=part.encrypted,
+                            hash_of_all_files=part.hash_of_all_files,
+                        )
+                    )
+
+        target.upload_backup_metadata(target_meta)
+        try:
+            logging.debug(
+                'Copying {} files of backup "{}" to bucket "{}"',
+                len(files_to_copy),
+                backup_meta.name,
+                target.bucket,
+            )
+            with ThreadExecPool(threads) as pool:
+                for source_path, remote_path in files_to_copy:
+                    pool.submit(
+                        f'Copy "{source_path}" to "{remote_path}"',
+                        target.copy_file,
+                        self.bucket,
+                        source_path,
+                        remote_path,
+                    )
+                pool.wait_all()
+            target_meta.state = backup_meta.state
+        except Exception as e:
+            target_meta.state = BackupState.FAILED
+            target_meta.exception = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            target.upload_backup_metadata(target_meta)
+
+        return target_meta
+
+    def _linked_part_files(
+        self, part: PartMetadata, target_backup_path: str
+    ) -> List[tuple]:
+        """
+        Return pairs of source and target paths of files of the deduplicated part.
+        """
+        source_part_name = part.deduplicated_part_name
+        # part.link is the source backup name for deduplicated parts.
+        source_dir_path = self._get_escaped_if_exists(
+            _part_path,
+            self.get_backup_path(part.link),  # type: ignore[arg-type]
+            part.database,
+            part.table,
+            source_part_name,
+        )
+        target_dir_path = _part_path(
+            target_backup_path, part.database, part.table, part.name
+        )
+
+        if part.tarball:
+            return [
+                (
+                    os.path.join(source_dir_path, f"{source_part_name}.tar"),
+                    os.path.join(target_dir_path, f"{part.name}.tar"),
+                )
+            ]
+        return [
+            (
+                os.path.join(source_dir_path, filename),
+                os.path.join(target_dir_path, filename),
+            )
+            for filename in part.files
+        ]
+
+    def copy_file(self, source_bucket: str, source_path: str, remote_path: str) -> None:
+        """
+        Copy file from the source bucket to the storage of the layout.
+        """
+        try:
+            self._storage_loader.copy_file(source_bucket, source_path, remote_path)
+        except Exception as e:
+            msg = f'Failed to copy "{source_path}" from bucket "{source_bucket}"'
+            raise StorageError(msg) from e
+
+    @property
+    def bucket(self) -> str:
+        """
+        Return name of the bucket containing backups.
+        """
+        return self._storage_loader.bucket
+
     def delete_backup(self, backup_name: str) -> None:
         """
         Delete backup data and metadata from storage.
@@ -44,6 +44,7 @@ class RawMetadata(Slotted):
         "link_part_name",
         "disk_name",
         "encrypted",
+        "hash_of_all_files",
     )
 
     # pylint: disable=too-many-positional-arguments
@@ -57,6 +58,7 @@ class RawMetadata(Slotted):
         link_part_name: Optional[str] = None,
         disk_name: Optional[str] = None,
         encrypted: bool = True,
+        hash_of_all_files: Optional[str] = None,
     ) -> None:
         self.checksum = checksum
         self.size = size
@@ -66,6 +68,7 @@ class RawMetadata(Slotted):
         self.link_part_name = link_part_name
         self.disk_name = disk_name
         self.encrypted = encrypted
+        self.hash_of_all_files = hash_of_all_files
 
 
 class PartMetadata(Slotted):
@@ -89,12 +92,21 @@ class PartMetadata(Slotted):
         link_part_name: Optional[str] = None,
         disk_name: Optional[str] = None,
         encrypted: bool = True,
+        hash_of_all_files: Optional[str] = None,
     ) -> None:
         self.database: str = database
         self.table: str = table
         self.name: str = name
         self.raw_metadata: RawMetadata = RawMetadata(
-            checksum, size, files, tarball, link, link_part_name, disk_name, encrypted
+            checksum,
+            size,
+            files,
+            tarball,
+            link,
+            link_part_name,
+            disk_name,
+            encrypted,
+            hash_of_all_files,
         )
 
     @property
@@ -156,6 +168,13 @@ class PartMetadata(Slotted):
         """
         return self.raw_metadata.encrypted
 
+    @property
+    def hash_of_all_files(self) -> Optional[str]:
+        """
+        Return hash of all files of data part reported by ClickHouse in system.parts, if it's known.
+        """
+        return self.raw_metadata.hash_of_all_files
+
     @property
     def tarball(self) -> bool:
         """
@@ -185,6 +204,7 @@ class PartMetadata(Slotted):
             link_part_name=link_part_name,
             disk_name=raw_metadata.get("disk_name", "default"),
             encrypted=raw_metadata.get("encrypted", True),
+            hash_of_all_files=raw_metadata.get("hash_of_all_files"),
         )
 
     @classmethod
@@ -204,4 +224,5 @@ class PartMetadata(Slotted):
             tarball=True,
             disk_name=frozen_part.disk_name,
             encrypted=encrypted,
+            hash_of_all_files=frozen_part.hash_of_all_files,
         )
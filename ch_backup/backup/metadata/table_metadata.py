@@ -106,7 +106,7 @@ class TableMetadata(SimpleNamespace):
         assert part.table == self.name
         assert part.name not in self.raw_metadata["parts"]
 
-        self.raw_metadata["parts"][part.name] = {
+        raw_part = {
             "checksum": part.checksum,
             "bytes": part.size,
             "files": part.files,
@@ -116,6 +116,9 @@ class TableMetadata(SimpleNamespace):
             "disk_name": part.disk_name,
             "encrypted": part.encrypted,
         }
+        if part.hash_of_all_files:
+            raw_part["hash_of_all_files"] = part.hash_of_all_files
+        self.raw_metadata["parts"][part.name] = raw_part
 
     @classmethod
     def load(cls, database: str, name: str, raw_metadata: dict) -> "TableMetadata":
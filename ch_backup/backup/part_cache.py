@@ -0,0 +1,169 @@
+"""
+Local cache of restored data parts.
+"""
+
+import os
+import shutil
+import threading
+import time
+from hashlib import md5
+from typing import Dict, Optional, Tuple
+
+from ch_backup import logging
+from ch_backup.backup.metadata import PartMetadata
+from ch_backup.storage.async_pipeline.stages.filesystem.download_progress import (
+    PROGRESS_FILE_NAME,
+)
+from ch_backup.util import link_dir_files, scan_dir_file_sizes
+
+# Prefix of entries being added to the cache
+TMP_PREFIX = ".tmp-"
+
+
+class PartCache:
+    """
+    Local content-addressed cache of downloaded data parts with LRU eviction.
+
+    Parts are kept unpacked in directories named by their checksums, so they are hardlinked into detached
+    directories of tables instead of being downloaded again. The last access time of an entry is kept
+    as modification time of its directory. Least recently used entries are evicted when the total size
+    of the cache exceeds max_size.
+    """
+
+    def __init__(self, path: str, max_size: int) -> None:
+        self._path = path
+        self._max_size = max_size
+        # Access times and sizes of entries by checksums, loaded on first use
+        self._entries: Optional[Dict[str, Tuple[float, int]]] = None
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        part: PartMetadata,
+        target_path: str,
+        owner: Optional[Tuple[str, str]] = None,
+    ) -> bool:
+        """
+        Link files of the cached part into the target directory. Return True if the part is found in the cache.
+
+        If owner (user and group) is specified, it's set to created directories.
+        """
+        with self._lock:
+            entries = self._load()
+            if part.checksum not in entries:
+                return False
+
+            if os.path.exists(os.path.join(target_path, PROGRESS_FILE_NAME)):
+                logging.debug(
+                    f"Part {part.name} is not restored from cache as its download is resumed"
+                )
+                return False
+
+            entry_path = os.path.join(self._path, part.checksum)
+            try:
+                files = [file for file, _ in scan_dir_file_sizes(entry_path)]
+                valid = _get_checksum(entry_path) == part.checksum and (
+                    not part.files or set(files) == set(part.files)
+                )
+            except OSError as e:
+                logging.warning(f"Failed to read cache entry {entry_path}: {e!r}")
+                valid = False
+            if not valid:
+                logging.warning(
+                    f"Cache entry {entry_path} of part {part.name} is broken, evicting it"
+                )
+                self._evict(part.checksum)
+                return False
+
+            try:
+                # Remove files left by interrupted restore
+                shutil.rmtree(target_path, ignore_errors=True)
+                link_dir_files(entry_path, target_path, files)
+                if owner:
+                    _chown_dirs(target_path, owner)
+                now = time.time()
+                os.utime(entry_path, (now, now))
+            except OSError as e:
+                logging.warning(
+                    f"Failed to restore part {part.name} from cache entry {entry_path}: {e!r}"
+                )
+                shutil.rmtree(target_path, ignore_errors=True)
+                return False
+
+            entries[part.checksum] = (now, entries[part.checksum][1])
+            logging.debug(f"Part {part.name} is restored from cache")
+            return True
+
+    def put(self, part: PartMetadata, source_path: str) -> None:
+        """
+        Add the downloaded part to the cache, evicting least recently used entries if needed.
+        """
+        with self._lock:
+            entries = self._load()
+            if part.checksum in entries:
+                return
+
+            entry_path = os.path.join(self._path, part.checksum)
+            tmp_path = os.path.join(self._path, TMP_PREFIX + part.checksum)
+            try:
+                if _get_checksum(source_path) != part.checksum:
+                    logging.warning(
+                        f"Part {part.name} is not cached because of checksum mismatch"
+                    )
+                    return
+                files = scan_dir_file_sizes(source_path)
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                link_dir_files(source_path, tmp_path, [file for file, _ in files])
+                os.rename(tmp_path, entry_path)
+            except OSError as e:
+                logging.warning(f"Failed to cache part {part.name}: {e!r}")
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                return
+
+            entries[part.checksum] = (time.time(), sum(size for _, size in files))
+            self._evict_lru()
+
+    def _load(self) -> Dict[str, Tuple[float, int]]:
+        if self._entries is None:
+            self._entries = {}
+            os.makedirs(self._path, exist_ok=True)
+            for entry in os.listdir(self._path):
+                entry_path = os.path.join(self._path, entry)
+                if entry.startswith(TMP_PREFIX):
+                    shutil.rmtree(entry_path, ignore_errors=True)
+                    continue
+                try:
+                    size = sum(size for _, size in scan_dir_file_sizes(entry_path))
+                    self._entries[entry] = (os.stat(entry_path).st_mtime, size)
+                except OSError:
+                    continue
+        return self._entries
+
+    def _evict_lru(self) -> None:
+        assert self._entries is not None
+        total_size = sum(size for _, size in self._entries.values())
+        by_access_time = sorted(self._entries.items(), key=lambda item: item[1][0])
+        for checksum, (_, size) in by_access_time:
+            if total_size <= self._max_size:
+                break
+            total_size -= size
+            self._evict(checksum)
+
+    def _evict(self, checksum: str) -> None:
+        assert self._entries is not None
+        logging.debug(f"Evicting part {checksum} from cache")
+        shutil.rmtree(os.path.join(self._path, checksum), ignore_errors=True)
+        self._entries.pop(checksum, None)
+
+
+def _get_checksum(part_path: str) -> str:
+    with open(os.path.join(part_path, "checksums.txt"), "rb") as f:
+        return md5(f.read()).hexdigest()  # nosec
+
+
+def _chown_dirs(dir_path: str, owner: Tuple[str, str]) -> None:
+    user, group = owner
+    shutil.chown(dir_path, user, group)
+    for path, dirs, _ in os.walk(dir_path):
+        for directory in dirs:
+            shutil.chown(os.path.join(path, directory), user, group)
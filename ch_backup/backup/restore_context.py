@@ -3,10 +3,11 @@ Backup restoring context.
 """
 
 import json
+import os
 from collections import defaultdict
 from enum import Enum
 from os.path import exists
-from typing import Any, Callable, Dict, Mapping
+from typing import Any, Dict, List, Mapping, Optional, TextIO
 
 from ch_backup.backup.metadata import PartMetadata
 
@@ -25,12 +26,16 @@ class PartState(str, Enum):
 class RestoreContext:
     """
     Backup restore context. Allows continue restore process after errors.
+
+    The state file is a journal of JSON lines: a snapshot of the state followed by its changes. Changes are
+    appended by batches of restore_context_sync_threshold_ops entries, so each of them costs O(1). The journal
+    is compacted to a single snapshot when it becomes longer than the state itself. Snapshots are written
+    to a temporary file and renamed to the state file, and an incomplete last line is skipped on load.
     """
 
     def __init__(self, config: Dict):
         self._state_file = config["restore_context_path"]
         self._state_file_dump_threshold = config["restore_context_sync_threshold_ops"]
-        self._state_updates_cnt = 0
 
         self._databases_dict: Dict[str, Dict[str, Dict[str, PartState]]] = defaultdict(
             lambda: defaultdict(lambda: defaultdict(lambda: PartState.NOT_DOWNLOADED))
@@ -44,18 +49,11 @@ class RestoreContext:
             )
         )
 
-    @staticmethod
-    def _dump_state_if_need(function: Callable) -> Any:
-        def wrapper(self, *args, **kwargs):
-            result = function(self, *args, **kwargs)
-            # pylint: disable=protected-access
-            self._state_updates_cnt += 1
-            if self._state_updates_cnt >= self._state_file_dump_threshold:
-                self.dump_state()
-                self._state_updates_cnt = 0
-            return result
-
-        return wrapper
+        # Changes not written to the journal yet
+        self._pending: List[list] = []
+        self._journal: Optional[TextIO] = None
+        self._journal_entries = 0
+        self._state_entries = 0
 
     @property
     def _databases(self) -> Dict[str, Dict[str, Dict[str, PartState]]]:
@@ -77,26 +75,26 @@ class RestoreContext:
     def _part(self, part: PartMetadata) -> PartState:
         return self._databases[part.database][part.table][part.name]
 
-    @_dump_state_if_need
     def change_part_state(self, state: PartState, part: PartMetadata) -> None:
         """
         Changes the state of the restoring part.
         """
         self._databases[part.database][part.table][part.name] = state
+        self._append(["state", part.database, part.table, part.name, state])
 
-    @_dump_state_if_need
     def add_failed_chown(self, database: str, table: str, path: str) -> None:
         """
         Save information about failed detached dir chown in context
         """
         self._failed[database][table]["failed_paths"].append(path)
+        self._append(["failed_path", database, table, path])
 
-    @_dump_state_if_need
     def add_failed_part(self, part: PartMetadata, e: Exception) -> None:
         """
         Save information about failed to restore part in context
         """
         self._failed[part.database][part.table]["failed_parts"][part.name] = repr(e)
+        self._append(["failed_part", part.database, part.table, part.name, repr(e)])
 
     def has_failed_parts(self) -> bool:
         """
@@ -120,28 +118,76 @@ class RestoreContext:
         """
         Dumps restore state of file to disk.
         """
+        if self._journal is None or self._journal_entries > max(
+            self._state_entries, self._state_file_dump_threshold
+        ):
+            self._compact()
+            return
+
+        assert self._journal is not None
+        for entry in self._pending:
+            self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+        self._journal_entries += len(self._pending)
+        self._pending = []
+
+    def _append(self, entry: list) -> None:
+        self._pending.append(entry)
+        if len(self._pending) >= self._state_file_dump_threshold:
+            self.dump_state()
+
+    def _compact(self) -> None:
+        """
+        Write snapshot of the state to the state file.
+        """
         # Using _databases property with empty dict might cause loading of the state file
         # So use it here before file is opened
         json_dict = {
             "databases": self._databases,
             "failed": self._failed,
         }
-        with open(self._state_file, "w", encoding="utf-8") as f:
-            json.dump(
-                json_dict,
-                f,
-            )
+        if self._journal:
+            self._journal.close()
+
+        tmp_file = f"{self._state_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(json_dict, f)
+            f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_file, self._state_file)
+
+        self._journal = open(  # pylint: disable=consider-using-with
+            self._state_file, "a", encoding="utf-8"
+        )
+        self._journal_entries = 0
+        self._state_entries = sum(
+            len(parts)
+            for tables in self._databases.values()
+            for parts in tables.values()
+        )
+        self._pending = []
 
     def _load_state(self) -> None:
+        databases: Dict[str, Dict[str, Dict[str, PartState]]] = defaultdict(
+            lambda: defaultdict(lambda: defaultdict(lambda: PartState.NOT_DOWNLOADED))
+        )
         with open(self._state_file, "r", encoding="utf-8") as f:
-            state: Dict[str, Any] = json.load(f)
-            databases: Dict[str, Dict[str, Dict[str, PartState]]] = defaultdict(
-                lambda: defaultdict(
-                    lambda: defaultdict(lambda: PartState.NOT_DOWNLOADED)
-                )
-            )
-            for db, tables in state.get("databases", {}).items():
-                for table, parts in tables.items():
-                    for part_name, part_state in parts.items():
-                        databases[db][table][part_name] = part_state
-            self._databases = databases
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Incomplete entry written on crash
+                    break
+
+                # Information about failures is kept for the current restore only
+                if isinstance(entry, dict):
+                    databases.clear()
+                    for db, tables in entry.get("databases", {}).items():
+                        for table, parts in tables.items():
+                            for part_name, part_state in parts.items():
+                                databases[db][table][part_name] = part_state
+                elif entry[0] == "state":
+                    _, db, table, part_name, part_state = entry
+                    databases[db][table][part_name] = part_state
+        self._databases = databases
@@ -41,6 +41,19 @@ def calc_aligned_files_size(files: List[Path], alignment: int = 1) -> int:
     return size
 
 
+def calc_aligned_sizes(sizes: Iterable[int], alignment: int = 1) -> int:
+    """
+    Calculate total size of files of specified sizes with padding added after each file.
+    """
+    total_size = 0
+    for size in sizes:
+        remainder = size % alignment
+        if remainder > 0:
+            size += alignment - remainder
+        total_size += size
+    return total_size
+
+
 def calc_aligned_data_size(data_list: List[bytes], alignment: int = 1) -> int:
     """
     Calculate total size of data with padding added after each element.
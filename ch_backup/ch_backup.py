@@ -3,7 +3,7 @@ Clickhouse backup logic
 """
 
 from collections import defaultdict
-from copy import copy
+from copy import copy, deepcopy
 from datetime import timedelta
 from enum import Enum
 from typing import Dict, List, Optional, Sequence, Set, Tuple
@@ -14,6 +14,7 @@ from ch_backup.backup.deduplication import (
     collect_dedup_info,
     collect_dedup_references_for_batch_backup_deletion,
 )
+from ch_backup.backup.layout import BackupLayout
 from ch_backup.backup.metadata import BackupMetadata, BackupState, TableMetadata
 from ch_backup.backup.sources import BackupSources
 from ch_backup.backup_context import BackupContext
@@ -29,7 +30,7 @@ from ch_backup.logic.access import AccessBackup
 from ch_backup.logic.database import DatabaseBackup
 from ch_backup.logic.database_sync import SyncStatus, wait_sync_replicated_databases
 from ch_backup.logic.named_collections import NamedCollectionsBackup
-from ch_backup.logic.partial_restore import PartialRestoreFilter
+from ch_backup.logic.partial_restore import PartialRestoreFilter, PartitionFilter
 from ch_backup.logic.table import TableBackup
 from ch_backup.logic.udf import UDFBackup
 from ch_backup.logic.workload_entities import WorkloadEntitiesBackup
@@ -247,6 +248,7 @@ class ClickhouseBackup:
         keep_going: bool = False,
         restore_tables_in_replicated_database: bool = False,
         partial_restore_filter: Optional[PartialRestoreFilter] = None,
+        partition_filter: Optional[PartitionFilter] = None,
     ) -> None:
         """
         Restore specified backup
@@ -339,6 +341,7 @@ class ClickhouseBackup:
                 clean_zookeeper_mode=clean_zookeeper_mode,
                 keep_going=keep_going,
                 restore_tables_in_replicated_database=restore_tables_in_replicated_database,
+                partition_filter=partition_filter,
             )
 
     def delete(
@@ -446,6 +449,52 @@ class ClickhouseBackup:
 
         return deleted_backup_names, None
 
+    def copy(
+        self,
+        backup_name: str,
+        bucket: str,
+        path_root: Optional[str] = None,
+        region_name: Optional[str] = None,
+    ) -> str:
+        """
+        Copy backup to another bucket with server-side copy requests.
+        """
+        backup = self._get_backup(backup_name)
+        if backup.state != BackupState.CREATED:
+            raise ClickhouseBackupError(
+                f"Backup {backup_name} can't be copied as its state is {backup.state.value}"
+            )
+
+        target_config = deepcopy(self._config)
+        target_config.merge(
+            {
+                "storage": {
+                    "credentials": {"bucket": bucket},
+                    "boto_config": {
+                        "region_name": region_name
+                        or self._config["storage"]["boto_config"]["region_name"]
+                    },
+                },
+                "backup": {
+                    "path_root": path_root or self._context.config["path_root"],
+                },
+            }
+        )
+        target_layout = BackupLayout(target_config)
+        if target_layout.get_backup(backup_name, use_light_meta=True):
+            raise ClickhouseBackupError(
+                f"Backup with name {backup_name} already exists in bucket {bucket}"
+            )
+
+        with self._context.locker(operation="COPY"):
+            self._context.backup_layout.copy_backup(
+                backup,
+                target_layout,
+                self._config["multiprocessing"]["copy_threads"],
+            )
+
+        return backup.name
+
     def restore_access_control(self, backup_name: str) -> None:
         """Restore ClickHouse access control metadata."""
         self._context.backup_meta = self._get_backup(backup_name)
@@ -556,6 +605,7 @@ class ClickhouseBackup:
         clean_zookeeper_mode: CleanZooKeeperMode = CleanZooKeeperMode.DISABLED,
         keep_going: bool = False,
         restore_tables_in_replicated_database: bool = False,
+        partition_filter: Optional[PartitionFilter] = None,
     ) -> None:
         # pylint: disable=too-many-locals
 
@@ -616,19 +666,22 @@ class ClickhouseBackup:
             )
 
             # Restore tables and data stored on local disks.
-            self._table_backup_manager.restore(
-                context=self._context,
-                databases=databases,
-                schema_only=sources.schema_only,
-                tables=tables,
-                metadata_cleaner=metadata_cleaner,
-                cloud_storage_source_bucket=cloud_storage_source_bucket,
-                cloud_storage_source_path=cloud_storage_source_path,
-                cloud_storage_source_endpoint=cloud_storage_source_endpoint,
-                skip_cloud_storage=skip_cloud_storage,
-                keep_going=keep_going,
-                restore_tables_in_replicated_database=restore_tables_in_replicated_database,
-            )
+            # Lookups of tables and disks are served from a catalog snapshot refreshed on DDL of ch-backup.
+            with self._context.ch_ctl.catalog_snapshot():
+                self._table_backup_manager.restore(
+                    context=self._context,
+                    databases=databases,
+                    schema_only=sources.schema_only,
+                    tables=tables,
+                    metadata_cleaner=metadata_cleaner,
+                    cloud_storage_source_bucket=cloud_storage_source_bucket,
+                    cloud_storage_source_path=cloud_storage_source_path,
+                    cloud_storage_source_endpoint=cloud_storage_source_endpoint,
+                    skip_cloud_storage=skip_cloud_storage,
+                    keep_going=keep_going,
+                    restore_tables_in_replicated_database=restore_tables_in_replicated_database,
+                    partition_filter=partition_filter,
+                )
 
             # Retry sync for databases that failed during initial sync.
             # After table restore, broken tables should be fixed and DDL worker
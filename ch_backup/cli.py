@@ -36,7 +36,7 @@ from .backup.metadata import BackupState, TableMetadata
 from .backup.sources import BackupSources
 from .ch_backup import CleanZooKeeperMode, ClickhouseBackup
 from .config import DEFAULT_CONFIG, Config
-from .logic.partial_restore import PartialRestoreFilter
+from .logic.partial_restore import PartialRestoreFilter, PartitionFilter
 from .params import JsonParamType, KeyValues, List, String, TimeSpan
 from .profile import profile
 from .util import chown_dir_contents, drop_privileges, setup_environment, utcnow
@@ -559,6 +559,13 @@ def backup_command(
         "When used together with option table-included-patterns, it has a higher priority and excludes tables from final result."
         "Examples: db1.table1 | db1.table2,db2.* | db1.prefix*,db2.*suffix | db1.*",
     ),
+    option(
+        "--partitions",
+        type=List(regexp=r"[\w.-]+"),
+        help="Comma-separated list of partition IDs or inclusive ranges of them to restore data of. "
+        "Data parts of other partitions will be skipped. Range bounds are compared as numbers if they are numeric. "
+        "Examples: 20240115 | 202401,202402 | 20240101..20240131",
+    ),
     option("--nc", is_flag=True, help="Perform partial restore of named collections."),
     option(
         "--workload", is_flag=True, help="Perform partial restore of workload entities."
@@ -608,6 +615,7 @@ def restore_command(
     table_excluded_patterns: Optional[typing.List[str]] = None,
     nc: bool = False,
     workload: bool = False,
+    partitions: Optional[typing.List[str]] = None,
 ) -> None:
     """Restore data from a particular backup."""
     # pylint: disable=too-many-arguments,too-many-locals
@@ -642,6 +650,7 @@ def restore_command(
         keep_going=keep_going,
         restore_tables_in_replicated_database=restore_tables_in_replicated_database,
         partial_restore_filter=matcher,
+        partition_filter=PartitionFilter(partitions) if partitions else None,
     )
 
 
@@ -712,6 +721,43 @@ def delete_command(
         print(deleted_backup_name)
 
 
+@command(name="copy")  # type: ignore
+@argument("name", metavar="BACKUP")
+@option(
+    "--bucket",
+    type=str,
+    required=True,
+    help="Bucket to copy backup to.",
+)
+@option(
+    "--path-root",
+    type=str,
+    default=None,
+    help="Root path of backups in the target bucket. The default is the same as in the source bucket.",
+)
+@option(
+    "--region",
+    type=str,
+    default=None,
+    help="Region of the target bucket. The default is the same as in the source bucket.",
+)
+# pylint: disable=too-many-positional-arguments
+def copy_command(
+    ctx: Context,
+    ch_backup: ClickhouseBackup,
+    name: str,
+    bucket: str,
+    path_root: Optional[str],
+    region: Optional[str],
+) -> None:
+    """Copy particular backup to another bucket using server-side copy."""
+    name = _validate_and_resolve_name(
+        ctx, ch_backup, name, backup_state=BackupState.CREATED
+    )
+
+    print(ch_backup.copy(name, bucket, path_root=path_root, region_name=region))
+
+
 @command(name="purge")
 def purge_command(_ctx: Context, ch_backup: ClickhouseBackup) -> None:
     """Purge outdated backups."""
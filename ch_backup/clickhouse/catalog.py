@@ -0,0 +1,163 @@
+"""
+Snapshot of ClickHouse catalog of tables and disks.
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from ch_backup.clickhouse.models import Disk, Table
+
+TableKey = Tuple[str, str]
+
+QueryTables = Callable[[Optional[str], Optional[Sequence[str]], bool], Sequence[Table]]
+
+
+class CatalogSnapshot:
+    """
+    Snapshot of system.tables, system.detached_tables and system.disks.
+
+    Short info of all tables and full info of MergeTree tables are loaded by the first lookup.
+    DDL performed by ch-backup marks affected tables stale, so only they are queried again on the next lookup.
+    Full info of tables of other engines is queried on demand, as it may require access to an external source.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        query_tables: QueryTables,
+        query_merge_tree_tables: Callable[[], Sequence[Table]],
+        query_detached_tables: Callable[[], Sequence[Table]],
+        query_disk: Callable[[str], Disk],
+    ) -> None:
+        self._query_tables = query_tables
+        self._query_merge_tree_tables = query_merge_tree_tables
+        self._query_detached_tables = query_detached_tables
+        self._query_disk = query_disk
+        self._tables: Optional[Dict[TableKey, Table]] = None
+        self._full_tables: Dict[TableKey, Table] = {}
+        self._stale: Set[TableKey] = set()
+        self._detached_tables: Optional[Sequence[Table]] = None
+        self._disks: Dict[str, Disk] = {}
+        self._lock = threading.Lock()
+
+    def get_tables(
+        self,
+        db_name: Optional[str] = None,
+        tables: Optional[Sequence[str]] = None,
+        short_query: bool = False,
+    ) -> List[Table]:
+        """
+        Get tables matching the database and table names, in the same way as ClickhouseCTL.get_tables does.
+        """
+        with self._lock:
+            all_tables = self._load_tables()
+
+            def _matches(key: TableKey) -> bool:
+                return (not db_name or key[0] == db_name) and (
+                    not tables or key[1] in tables
+                )
+
+            stale = [key for key in self._stale if _matches(key)]
+            if stale:
+                self._refresh(all_tables, stale)
+
+            keys = [key for key in all_tables if _matches(key)]
+            if short_query:
+                return [_copy_table(all_tables[key]) for key in keys]
+
+            missing = [key for key in keys if key not in self._full_tables]
+            for database, names in _group_by_database(missing).items():
+                for table in self._query_tables(database, names, False):
+                    self._full_tables[(table.database, table.name)] = table
+
+            return [
+                _copy_table(self._full_tables[key])
+                for key in keys
+                if key in self._full_tables
+            ]
+
+    def get_detached_tables(self) -> Sequence[Table]:
+        """
+        Get detached tables.
+        """
+        with self._lock:
+            if self._detached_tables is None:
+                self._detached_tables = self._query_detached_tables()
+            return [_copy_table(table) for table in self._detached_tables]
+
+    def get_disk(self, disk_name: str) -> Disk:
+        """
+        Get disk by name.
+        """
+        with self._lock:
+            if disk_name not in self._disks:
+                self._disks[disk_name] = self._query_disk(disk_name)
+            return self._disks[disk_name]
+
+    def invalidate_table(self, db_name: str, table_name: str) -> None:
+        """
+        Mark the table as changed by DDL, so its info is queried again on the next lookup.
+        """
+        with self._lock:
+            self._stale.add((db_name, table_name))
+            self._detached_tables = None
+
+    def invalidate_tables(self) -> None:
+        """
+        Drop info of all tables, e.g. after DDL on a database.
+        """
+        with self._lock:
+            self._tables = None
+            self._full_tables = {}
+            self._stale = set()
+            self._detached_tables = None
+
+    def invalidate_disks(self) -> None:
+        """
+        Drop info of disks, e.g. after reload of ClickHouse configuration.
+        """
+        with self._lock:
+            self._disks = {}
+
+    def _load_tables(self) -> Dict[TableKey, Table]:
+        if self._tables is None:
+            self._tables = {
+                (table.database, table.name): table
+                for table in self._query_tables(None, None, True)
+            }
+            self._full_tables = {
+                (table.database, table.name): table
+                for table in self._query_merge_tree_tables()
+            }
+            self._stale = set()
+        return self._tables
+
+    def _refresh(self, all_tables: Dict[TableKey, Table], keys: List[TableKey]) -> None:
+        for database, names in _group_by_database(keys).items():
+            found = {
+                table.name: table for table in self._query_tables(database, names, True)
+            }
+            for name in names:
+                key = (database, name)
+                self._stale.discard(key)
+                self._full_tables.pop(key, None)
+                all_tables.pop(key, None)
+                if name in found:
+                    all_tables[key] = found[name]
+
+
+def _copy_table(table: Table) -> Table:
+    """
+    Make shallow copy of the table, so callers can't change the snapshot.
+    """
+    result = Table.make_dummy(table.database, table.name)
+    result.__dict__.update(table.__dict__)
+    return result
+
+
+def _group_by_database(keys: Sequence[TableKey]) -> Dict[str, List[str]]:
+    result: Dict[str, List[str]] = {}
+    for database, name in keys:
+        result.setdefault(database, []).append(name)
+    return result
@@ -2,6 +2,7 @@
 ClickHouse client.
 """
 
+import threading
 from contextlib import contextmanager
 from typing import Any, Iterator, Optional, Union
 
@@ -41,6 +42,9 @@ class ClickhouseClient:
         protocol = config["protocol"]
         port = config["port"] or (8123 if protocol == "http" else 8443)
         self._session = self._create_session(config, settings)
+        # Sessions of threads other than the one creating the client
+        self._thread_sessions = threading.local()
+        self._owner_thread_id = threading.get_ident()
         self._url = f"{protocol}://{host}:{port}"
         self.timeout = config["timeout"]
         self.connect_timeout = config["connect_timeout"]
@@ -78,8 +82,8 @@ class ClickhouseClient:
 
             # https://github.com/psf/requests/issues/2766
             # requests.Session object is not guaranteed to be thread-safe.
-            # When using ClickhouseClient with multithreading, "new_session"
-            # should be True, so a separate Session is used for each query.
+            # So each thread uses its own Session, and when "new_session"
+            # is True, a separate Session is used for the query.
             with self._get_session(new_session) as session:
                 response = session.post(
                     self._url,
@@ -107,7 +111,7 @@ class ClickhouseClient:
         session = (
             self._create_session(self._config, self._settings)
             if new_session
-            else self._session
+            else self._get_thread_session()
         )
         try:
             yield session
@@ -115,6 +119,19 @@ class ClickhouseClient:
             if new_session:
                 session.close()
 
+    def _get_thread_session(self) -> requests.Session:
+        """
+        Return session of the current thread, it has the same settings as the main session.
+        """
+        if threading.get_ident() == self._owner_thread_id:
+            return self._session
+
+        session = getattr(self._thread_sessions, "session", None)
+        if session is None:
+            session = self._create_session(self._config, dict(self._session.params))
+            self._thread_sessions.session = session
+        return session
+
     @staticmethod
     def _create_session(config, settings):
         session = requests.Session()
@@ -7,16 +7,30 @@ Clickhouse-control classes module
 import os
 import re
 import shutil
+import threading
 from contextlib import contextmanager, suppress
+from functools import partial
 from hashlib import md5
 from pathlib import Path
 from tarfile import BLOCKSIZE  # type: ignore
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from typing import (
+    Any,
+    Container,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from ch_backup import logging
-from ch_backup.backup.metadata import TableMetadata
+from ch_backup.backup.metadata import PartMetadata, TableMetadata
 from ch_backup.backup.restore_context import RestoreContext
-from ch_backup.calculators import calc_aligned_files_size
+from ch_backup.calculators import calc_aligned_sizes
+from ch_backup.clickhouse.catalog import CatalogSnapshot
 from ch_backup.clickhouse.client import ClickhouseClient
 from ch_backup.clickhouse.models import (
     Database,
@@ -27,12 +41,17 @@ from ch_backup.clickhouse.models import (
 )
 from ch_backup.exceptions import ClickhouseBackupError
 from ch_backup.storage.async_pipeline.base_pipeline.exec_pool import ThreadExecPool
+from ch_backup.storage.async_pipeline.stages.filesystem.download_progress import (
+    PROGRESS_FILE_NAME,
+)
 from ch_backup.util import (
     chown_dir_contents,
     chown_file,
     escape,
-    list_dir_files,
+    link_dir_files,
+    parallel_map,
     retry,
+    scan_dir_file_sizes,
     strip_query,
 )
 
@@ -192,6 +211,13 @@ PART_ATTACH_SQL = strip_query(
 """
 )
 
+PARTITION_ATTACH_SQL = strip_query(
+    """
+    ALTER TABLE `{db_name}`.`{table_name}`
+    ATTACH PARTITION ID '{partition_id}'
+"""
+)
+
 TABLE_ATTACH_SQL = strip_query(
     """
     ATTACH TABLE `{db_name}`.`{table_name}`
@@ -363,7 +389,8 @@ CREATE_IF_NOT_EXISTS_DEDUP_TABLE_SQL = strip_query(
         tarball Bool,
         disk_name String,
         verified Bool,
-        encrypted Bool
+        encrypted Bool,
+        hash_of_all_files String
     )
     ENGINE = MergeTree()
     ORDER BY (database, table, name, checksum)
@@ -399,6 +426,44 @@ GET_DEDUPLICATED_PARTS_SQL = strip_query(
 """
 )
 
+GET_DEDUPLICATED_PARTS_BY_HASH_SQL = strip_query(
+    """
+    SELECT
+        `{system_db}`._deduplication_info_current.name AS current_name,
+        `{system_db}`._deduplication_info.*
+    FROM `{system_db}`._deduplication_info
+    JOIN `{system_db}`._deduplication_info_current
+    ON _deduplication_info.hash_of_all_files = _deduplication_info_current.checksum
+    WHERE database='{database}' AND table='{table}' AND hash_of_all_files != ''
+    ORDER BY _deduplication_info.backup_name DESC
+    LIMIT 1 BY current_name
+    FORMAT JSON
+"""
+)
+
+GET_PART_HASHES_SQL = strip_query(
+    """
+    SELECT
+        name,
+        hash_of_all_files
+    FROM system.parts
+    WHERE database = '{db_name}' AND table = '{table_name}'
+    FORMAT JSON
+"""
+)
+
+GET_ACTIVE_PART_HASHES_SQL = strip_query(
+    """
+    SELECT
+        name,
+        partition_id,
+        hash_of_all_files
+    FROM system.parts
+    WHERE database = '{db_name}' AND table = '{table_name}' AND active = 1
+    FORMAT JSON
+"""
+)
+
 SHOW_CREATE_DATABASE_SQL = strip_query(
     """
     SHOW CREATE DATABASE `{db_name}`
@@ -560,6 +625,15 @@ GET_PARTITIONS = strip_query(
 """
 )
 
+GET_TABLE_DATA_SIZE_SQL = strip_query(
+    """
+    SELECT sum(bytes_on_disk)
+    FROM system.parts
+    WHERE database = '{db_name}' AND table = '{table_name}' AND active = 1
+    FORMAT TSVRaw
+"""
+)
+
 METADATA_PLACEHOLDER_FOR_MISSED_DETACHED_TABLE = strip_query(
     """
 ATTACH TABLE _ UUID '{uuid}'
@@ -597,6 +671,8 @@ class ClickhouseCTL:
         self._ch_client = ClickhouseClient(self._ch_ctl_config)
         self._ch_version = self._ch_client.query(GET_VERSION_SQL)
         self._disks = self.get_disks()
+        self._deduplication_lock = threading.Lock()
+        self._catalog: Optional[CatalogSnapshot] = None
         settings = self._ch_ctl_config.get("settings")
         if settings is None:
             settings = {
@@ -629,20 +705,42 @@ class ClickhouseCTL:
                 settings["database_replicated_allow_explicit_uuid"] = 1
         self._ch_client.settings.update(settings)
 
-    def chown_detached_table_parts(self, table: Table, context: RestoreContext) -> None:
+    def chown_detached_parts(
+        self, table: Table, parts: Iterable[PartMetadata], context: RestoreContext
+    ) -> None:
         """
-        Change permissions (owner and group) of detached data parts for the
-        specified table. New values for permissions are taken from the config.
+        Change permissions (owner and group) of the specified detached data parts
+        of the table. New values for permissions are taken from the config.
+
+        If privileges are dropped, files of parts are created by ClickHouse user,
+        so only directories of parts are processed.
         """
-        for _, disk in table.paths_with_disks:
-            detached_path = self._get_table_detached_path(table, disk.name)
+        for part in parts:
+            part_path = self.get_detached_part_path(table, part.disk_name, part.name)
             try:
-                self.chown_dir(detached_path)
+                if self._main_config["drop_privileges"]:
+                    chown_file(
+                        self._ch_ctl_config["user"],
+                        self._ch_ctl_config["group"],
+                        part_path,
+                    )
+                else:
+                    self.chown_dir(part_path)
             except FileNotFoundError:
                 logging.warning(
-                    f"table {table.database}.{table.name} path {detached_path} not found"
+                    f"table {table.database}.{table.name} path {part_path} not found"
                 )
-                context.add_failed_chown(table.database, table.database, detached_path)
+                context.add_failed_chown(table.database, table.name, part_path)
+
+    def get_file_owner(self) -> Optional[Tuple[str, str]]:
+        """
+        Return user and group to set as owner of files written for ClickHouse.
+
+        None is returned if privileges are dropped, as files are created by ClickHouse user then.
+        """
+        if self._main_config["drop_privileges"]:
+            return None
+        return self._ch_ctl_config["user"], self._ch_ctl_config["group"]
 
     def attach_part(self, table: Table, part_name: str) -> None:
         """
@@ -656,6 +754,30 @@ class ClickhouseCTL:
 
         self._ch_client.query(query_sql)
 
+    def attach_partition(self, table: Table, partition_id: str) -> None:
+        """
+        Attach all detached data parts of the partition to the specified table.
+        """
+        query_sql = PARTITION_ATTACH_SQL.format(
+            db_name=escape(table.database),
+            table_name=escape(table.name),
+            partition_id=escape(partition_id),
+        )
+
+        self._ch_client.query(query_sql)
+
+    def get_detached_part_names(self, table: Table) -> List[str]:
+        """
+        Get names of entries in detached directories of the specified table on all disks.
+        """
+        result: List[str] = []
+        for _, disk in table.paths_with_disks:
+            with suppress(FileNotFoundError):
+                result.extend(
+                    os.listdir(self._get_table_detached_path(table, disk.name))
+                )
+        return result
+
     def attach_table(self, table: Union[TableMetadata, Table]) -> None:
         """
         Attach data part to the specified table.
@@ -665,6 +787,7 @@ class ClickhouseCTL:
         )
 
         self._ch_client.query(query_sql)
+        self._invalidate_table(table.database, table.name)
 
     def kill_old_freeze_queries(self):
         """
@@ -682,6 +805,7 @@ class ClickhouseCTL:
         parallelize_freeze_in_ch: bool,
         freeze_partition_threads: int,
         clickhouse_query_max_threads: int,
+        partitions: Optional[Sequence[str]] = None,
     ) -> None:
         """
         Make snapshot of the specified table.
@@ -690,10 +814,11 @@ class ClickhouseCTL:
         Inside ch-backup: We can perform several `ALTER TABLE FREEZE PARTITION` queries.
         2) parallelize_freeze_in_ch = True
         Inside clickhouse(preferable): Since 25.11 clickhouse can parallelize `ALTER TABLE FREEZE` queries. https://github.com/ClickHouse/ClickHouse/pull/71743
+        If partitions are specified, only they are frozen by `ALTER TABLE FREEZE PARTITION` queries.
         """
         # Table has no partitions or created with deprecated syntax.
         # FREEZE PARTITION ID with deprecated syntax throws segmentation fault in CH.
-        freeze_by_partitions = (
+        freeze_by_partitions = partitions is not None or (
             not parallelize_freeze_in_ch
             and freeze_partition_threads > 0
             and "PARTITION BY" in table.create_statement
@@ -707,7 +832,9 @@ class ClickhouseCTL:
 
         if freeze_by_partitions:
             with ThreadExecPool(max(1, freeze_partition_threads)) as pool:
-                partitions_to_freeze = self.list_partitions(table)
+                partitions_to_freeze = (
+                    self.list_partitions(table) if partitions is None else partitions
+                )
                 for partition in partitions_to_freeze:
                     query_sql = FREEZE_PARTITION_SQL.format(
                         db_name=escape(table.database),
@@ -762,6 +889,16 @@ class ClickhouseCTL:
         result = self._ch_client.query(query_sql, should_retry=False)["data"]
         return [partition[0] for partition in result]
 
+    def get_table_data_size(self, table: Table) -> int:
+        """
+        Get total size of active data parts of the table in bytes.
+        """
+        query_sql = GET_TABLE_DATA_SIZE_SQL.format(
+            db_name=escape(table.database),
+            table_name=escape(table.name),
+        )
+        return int(self._ch_client.query(query_sql) or 0)
+
     def system_unfreeze(self, backup_name: str) -> None:
         """
         Unfreeze all partitions from all disks.
@@ -864,12 +1001,41 @@ class ClickhouseCTL:
         A short query does not access the source of table if it was built from an external source.
         Example: CREATE ... AS postgresql() or CREATE ... AS s3().
         """
-        db_condition = f"database = '{escape(db_name)}'" if db_name else "1"
-        tables_condition = (
-            f"has(cast({_format_string_array(tables)}, 'Array(String)'), name)"
-            if tables
-            else "1"
+        if self._catalog is not None:
+            return self._catalog.get_tables(db_name, tables, short_query)
+
+        return self._query_tables(db_name, tables, short_query)
+
+    @contextmanager
+    def catalog_snapshot(self) -> Iterator[None]:
+        """
+        Serve lookups of tables and disks from a snapshot of system tables within the context.
+
+        It's intended for restore, when the catalog is changed by DDL of ch-backup only.
+        """
+        self._catalog = CatalogSnapshot(
+            self._query_tables,
+            partial(self._query_tables, tables_condition="engine LIKE '%MergeTree%'"),
+            self._query_detached_tables,
+            self._query_disk,
         )
+        try:
+            yield
+        finally:
+            self._catalog = None
+
+    def _query_tables(
+        self,
+        db_name: Optional[str] = None,
+        tables: Optional[Sequence[str]] = None,
+        short_query: bool = False,
+        tables_condition: str = "1",
+    ) -> Sequence[Table]:
+        db_condition = f"database = '{escape(db_name)}'" if db_name else "1"
+        if tables:
+            tables_condition = (
+                f"has(cast({_format_string_array(tables)}, 'Array(String)'), name)"
+            )
 
         base_query_sql = ""
         if short_query:
@@ -907,11 +1073,18 @@ class ClickhouseCTL:
 
         with open(metadata_file_path, "w", encoding="utf-8") as f:
             f.write(attach_statement)
+        self._invalidate_tables()
 
     def get_detached_tables(self) -> Sequence[Table]:
         """
         Get detached tables.
         """
+        if self._catalog is not None:
+            return self._catalog.get_detached_tables()
+
+        return self._query_detached_tables()
+
+    def _query_detached_tables(self) -> Sequence[Table]:
         result: List[Table] = []
 
         if not self.ch_version_ge("24.8"):
@@ -974,6 +1147,9 @@ class ClickhouseCTL:
         """
         Return True if the specified table exists.
         """
+        if self._catalog is not None:
+            return bool(self._catalog.get_tables(db_name, [table_name], True))
+
         query_sql = CHECK_TABLE_SQL.format(
             db_name=escape(db_name), table_name=escape(table_name)
         )
@@ -984,12 +1160,14 @@ class ClickhouseCTL:
         Restore database.
         """
         self._ch_client.query(DATABASE_ATTACH_SQL.format(db_name=escape(db.name)))
+        self._invalidate_tables()
 
     def restore_database(self, database_schema: str) -> None:
         """
         Restore database.
         """
         self._ch_client.query(database_schema)
+        self._invalidate_tables()
 
     def restore_udf(self, udf_statement):
         """
@@ -1014,6 +1192,7 @@ class ClickhouseCTL:
         Restore table.
         """
         self._ch_client.query(table.create_statement)
+        self._invalidate_table(table.database, table.name)
 
     def restore_replica(self, table: Table) -> None:
         """
@@ -1037,6 +1216,7 @@ class ClickhouseCTL:
                     db_name=escape(table.database), table_name=escape(table.name)
                 )
             )
+        self._invalidate_table(table.database, table.name)
 
     def drop_dictionary_if_exists(self, table: Table) -> None:
         """
@@ -1047,6 +1227,7 @@ class ClickhouseCTL:
                 db_name=escape(table.database), table_name=escape(table.name)
             )
         )
+        self._invalidate_table(table.database, table.name)
 
     def drop_database_if_exists(self, db_name: str) -> None:
         """
@@ -1056,6 +1237,7 @@ class ClickhouseCTL:
             self._ch_client.query(
                 DROP_DATABASE_IF_EXISTS_SQL.format(db_name=escape(db_name))
             )
+        self._invalidate_tables()
 
     def drop_udf(self, udf_name: str) -> None:
         """
@@ -1130,6 +1312,63 @@ class ClickhouseCTL:
         assert len(data) == 1
         return data[0]["metadata_path"]
 
+    def link_local_part(
+        self, table: Table, part: PartMetadata, fs_part_path: str
+    ) -> bool:
+        """
+        Hardlink the data part from shadow directory of a local backup instead of downloading it.
+
+        The part is looked up on the local disk of the part among data frozen for all backups kept in shadow.
+        It's linked only if its checksum and files match the metadata. Return True if the part is linked.
+        """
+        if os.path.exists(os.path.join(fs_part_path, PROGRESS_FILE_NAME)):
+            logging.debug(
+                f"Part {part.name} is not linked from local backup as its download is resumed"
+            )
+            return False
+
+        for source_path in self._get_local_part_paths(table, part):
+            try:
+                if _get_part_checksum(source_path) != part.checksum:
+                    continue
+                files = [file for file, _ in scan_dir_file_sizes(source_path)]
+            except OSError:
+                continue
+            if part.files and set(files) != set(part.files):
+                continue
+
+            try:
+                # Remove files left by interrupted restore
+                shutil.rmtree(fs_part_path, ignore_errors=True)
+                link_dir_files(source_path, fs_part_path, files)
+            except OSError as e:
+                logging.warning(
+                    f"Failed to link part {part.name} from {source_path}: {e!r}"
+                )
+                shutil.rmtree(fs_part_path, ignore_errors=True)
+                return False
+
+            logging.debug(f"Part {part.name} is linked from {source_path}")
+            return True
+
+        return False
+
+    def _get_local_part_paths(self, table: Table, part: PartMetadata) -> List[str]:
+        for data_path, disk in table.paths_with_disks:
+            if disk.name != part.disk_name or disk.type != "local":
+                continue
+            backup_names: List[str] = []
+            with suppress(FileNotFoundError):
+                backup_names = os.listdir(os.path.join(disk.path, "shadow"))
+            return [
+                os.path.join(
+                    self._get_frozen_data_path(disk, data_path, backup_name),
+                    part.name,
+                )
+                for backup_name in backup_names
+            ]
+        return []
+
     def get_detached_part_path(
         self, table: Table, disk_name: str, part_name: str
     ) -> str:
@@ -1176,45 +1415,54 @@ class ClickhouseCTL:
         result = self._ch_client.query(GET_ZOOKEEPER_ADMIN_UUID).get("data", [])
         return {item["name"]: item["value"] for item in result}
 
-    @staticmethod
     def scan_frozen_parts(
+        self,
         table: Table,
         disk: Disk,
         data_path: str,
         backup_name: str,
+        exclude_parts: Container[str] = (),
     ) -> Iterable[FrozenPart]:
         """
         Yield frozen parts from specific disk and path.
+
+        Parts are scanned by several threads, but yielded in the order of directory entries.
+        Parts with names from exclude_parts are skipped without scanning.
         """
-        table_relative_path = os.path.relpath(data_path, disk.path)
-        path = os.path.join(disk.path, "shadow", backup_name, table_relative_path)
+        path = self._get_frozen_data_path(disk, data_path, backup_name)
 
         if not os.path.exists(path):
             logging.debug("Shadow path {} is empty", path)
             return
 
-        for dir_entry in os.scandir(path):
-            part = dir_entry.name
-            part_path = dir_entry.path
-            checksum = _get_part_checksum(part_path)
-            rel_paths = list_dir_files(part_path)
-            abs_paths = [Path(part_path) / file for file in rel_paths]
+        with os.scandir(path) as scan:
+            part_paths = [
+                dir_entry.path
+                for dir_entry in scan
+                if dir_entry.name not in exclude_parts
+            ]
 
-            size = calc_aligned_files_size(abs_paths, alignment=BLOCKSIZE)
-            logging.debug(
-                f"scan_freezed_parts: {table.name} -> {escape(table.name)} \n {part}"
-            )
+        yield from parallel_map(
+            partial(_scan_frozen_part, table, disk),
+            part_paths,
+            self._backup_config.get("scan_frozen_parts_threads", 1),
+        )
 
-            yield FrozenPart(
-                table.database,
-                table.name,
-                part,
-                disk.name,
-                part_path,
-                checksum,
-                size,
-                rel_paths,
-            )
+    def get_frozen_part_names(
+        self, disk: Disk, data_path: str, backup_name: str
+    ) -> List[str]:
+        """
+        Get names of frozen parts on specific disk and path without scanning them.
+        """
+        path = self._get_frozen_data_path(disk, data_path, backup_name)
+        if not os.path.exists(path):
+            return []
+        return os.listdir(path)
+
+    @staticmethod
+    def _get_frozen_data_path(disk: Disk, data_path: str, backup_name: str) -> str:
+        table_relative_path = os.path.relpath(data_path, disk.path)
+        return os.path.join(disk.path, "shadow", backup_name, table_relative_path)
 
     @staticmethod
     def _get_table_detached_path(table: Table, disk_name: str) -> str:
@@ -1352,6 +1600,12 @@ class ClickhouseCTL:
         """
         Get disk by name.
         """
+        if self._catalog is not None:
+            return self._catalog.get_disk(disk_name)
+
+        return self._query_disk(disk_name)
+
+    def _query_disk(self, disk_name: str) -> Disk:
         if self.ch_version_ge("24.3"):
             resp = resp = self._ch_client.query(
                 GET_DISK_SQL_24_3.format(disk_name=disk_name)
@@ -1452,6 +1706,8 @@ class ClickhouseCTL:
         Reload ClickHouse configuration query.
         """
         self._ch_client.query(RELOAD_CONFIG_SQL, timeout=self._timeout)
+        if self._catalog is not None:
+            self._catalog.invalidate_disks()
 
     def create_deduplication_table(self):
         """
@@ -1492,6 +1748,60 @@ class ClickhouseCTL:
         """
         Get deduplication info for given frozen parts of a table
         """
+        return self._get_deduplication_info(
+            GET_DEDUPLICATED_PARTS_SQL,
+            database,
+            table,
+            {part.name: part.checksum for part in frozen_parts.values()},
+        )
+
+    def get_deduplication_info_by_hash(
+        self, database: str, table: str, part_hashes: Dict[str, str]
+    ) -> List[Dict]:
+        """
+        Get deduplication info for given parts of a table by hashes of all files from system.parts
+        """
+        return self._get_deduplication_info(
+            GET_DEDUPLICATED_PARTS_BY_HASH_SQL, database, table, part_hashes
+        )
+
+    def get_part_hashes(self, table: Table) -> Dict[str, str]:
+        """
+        Get hashes of all files of data parts of the table from system.parts.
+        """
+        result_json = self._ch_client.query(
+            GET_PART_HASHES_SQL.format(
+                db_name=escape(table.database), table_name=escape(table.name)
+            )
+        )
+        return {row["name"]: row["hash_of_all_files"] for row in result_json["data"]}
+
+    def get_active_part_hashes(self, table: Table) -> Dict[str, Tuple[str, str]]:
+        """
+        Get partition IDs and hashes of all files of active data parts of the table from system.parts.
+        """
+        result_json = self._ch_client.query(
+            GET_ACTIVE_PART_HASHES_SQL.format(
+                db_name=escape(table.database), table_name=escape(table.name)
+            )
+        )
+        return {
+            row["name"]: (row["partition_id"], row["hash_of_all_files"])
+            for row in result_json["data"]
+        }
+
+    def _get_deduplication_info(
+        self, query: str, database: str, table: str, part_checksums: Dict[str, str]
+    ) -> List[Dict]:
+        # The table with current parts is shared, so lookups from several threads are serialized
+        with self._deduplication_lock:
+            return self._query_deduplication_info(
+                query, database, table, part_checksums
+            )
+
+    def _query_deduplication_info(
+        self, query: str, database: str, table: str, part_checksums: Dict[str, str]
+    ) -> List[Dict]:
         self._ch_client.query(
             TRUNCATE_TABLE_IF_EXISTS_SQL.format(
                 db_name=escape(self._backup_config["system_database"]),
@@ -1504,7 +1814,9 @@ class ClickhouseCTL:
             )
         )
 
-        batch = [f"('{part.name}','{part.checksum}')" for part in frozen_parts.values()]
+        batch = [
+            f"('{name}','{checksum}')" for name, checksum in part_checksums.items()
+        ]
         self._ch_client.query(
             INSERT_DEDUP_INFO_BATCH_SQL.format(
                 system_db=escape(self._backup_config["system_database"]),
@@ -1513,7 +1825,7 @@ class ClickhouseCTL:
             ),
         )
         result_json = self._ch_client.query(
-            GET_DEDUPLICATED_PARTS_SQL.format(
+            query.format(
                 system_db=escape(self._backup_config["system_database"]),
                 database=escape(database),
                 table=escape(table),
@@ -1552,6 +1864,35 @@ class ClickhouseCTL:
                 new_table_name=new_table_name,
             ),
         )
+        self._invalidate_table(table.database, table.name)
+        self._invalidate_table(table.database, new_table_name)
+
+    def _invalidate_table(self, db_name: str, table_name: str) -> None:
+        if self._catalog is not None:
+            self._catalog.invalidate_table(db_name, table_name)
+
+    def _invalidate_tables(self) -> None:
+        if self._catalog is not None:
+            self._catalog.invalidate_tables()
+
+
+def _scan_frozen_part(table: Table, disk: Disk, part_path: str) -> FrozenPart:
+    part = os.path.basename(part_path)
+    checksum = _get_part_checksum(part_path)
+    files = scan_dir_file_sizes(part_path)
+    size = calc_aligned_sizes((size for _, size in files), alignment=BLOCKSIZE)
+    logging.debug(f"scan_freezed_parts: {table.name} -> {escape(table.name)} \n {part}")
+
+    return FrozenPart(
+        table.database,
+        table.name,
+        part,
+        disk.name,
+        part_path,
+        checksum,
+        size,
+        [file for file, _ in files],
+    )
 
 
 def _get_part_checksum(part_path: str) -> str:
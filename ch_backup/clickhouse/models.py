@@ -304,6 +304,7 @@ class FrozenPart(Slotted):
         "checksum",
         "size",
         "files",
+        "hash_of_all_files",
     )
 
     # pylint: disable=too-many-positional-arguments
@@ -317,6 +318,7 @@ class FrozenPart(Slotted):
         checksum: str,
         size: int,
         files: List[str],
+        hash_of_all_files: Optional[str] = None,
     ):
         super().__init__()
         self.database = database
@@ -327,3 +329,4 @@ class FrozenPart(Slotted):
         self.checksum = checksum
         self.size = size
         self.files = files
+        self.hash_of_all_files = hash_of_all_files
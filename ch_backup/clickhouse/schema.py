@@ -3,6 +3,7 @@ Utilities for schema manipulation.
 """
 
 import re
+from typing import List, Optional, Set, Tuple
 
 from ch_backup import logging
 from ch_backup.clickhouse.models import Database, Table
@@ -133,6 +134,83 @@ def _add_uuid(table: Table, inner_uuid: str = None) -> None:
         )
 
 
+# Unquoted or backquoted identifier
+_IDENTIFIER = r"(?:`(?:[^`\\]|\\.)*`|[A-Za-z_][A-Za-z0-9_]*)"
+# Table references in queries of views and TO clause of materialized views
+_TABLE_REFERENCE_RE = re.compile(
+    rf"\b(?:FROM|JOIN|TO)\s+(?!INNER\b)(?P<first>{_IDENTIFIER})(?:\s*\.\s*(?P<second>{_IDENTIFIER}))?",
+    re.IGNORECASE,
+)
+# Tables and dictionaries referenced by functions, e.g. joinGet('db.table', ...)
+_FUNCTION_REFERENCE_RE = re.compile(
+    r"\b(?:joinGet\w*|dictGet\w*|dictHas|dictIsIn|dictGetHierarchy)\s*\(\s*'(?P<name>[^']+)'"
+)
+# Source table of dictionaries with ClickHouse source
+_DICTIONARY_SOURCE_RE = re.compile(
+    r"SOURCE\s*\(\s*CLICKHOUSE\s*\((?P<params>[^)]*)\)", re.IGNORECASE
+)
+# Underlying table of Distributed and Buffer tables
+_ENGINE_ARGS_RE = re.compile(
+    r"ENGINE\s*=\s*(?P<engine>Distributed|Buffer)\s*\((?P<args>[^)]*)\)"
+)
+
+
+def get_table_dependencies(table: Table) -> Set[Tuple[str, str]]:
+    """
+    Return databases and names of tables and dictionaries the table depends on according to its create statement.
+
+    Dependencies are found heuristically: materialized view target tables, tables of view queries, source tables
+    of dictionaries, underlying tables of Distributed and Buffer tables and tables referenced by joinGet and
+    dictGet functions. Unqualified names are resolved in the database of the table. False positives are possible.
+    """
+    statement = table.create_statement
+    dependencies: Set[Tuple[str, str]] = set()
+
+    def add(database: Optional[str], name: Optional[str]) -> None:
+        if name:
+            dependencies.add((database or table.database, name))
+
+    for match in _TABLE_REFERENCE_RE.finditer(statement):
+        first, second = match.group("first"), match.group("second")
+        if second is None:
+            add(None, _unquote(first))
+        else:
+            add(_unquote(first), _unquote(second))
+
+    for match in _FUNCTION_REFERENCE_RE.finditer(statement):
+        database, _, name = match.group("name").rpartition(".")
+        add(database, name)
+
+    source_match = _DICTIONARY_SOURCE_RE.search(statement)
+    if source_match:
+        params = source_match.group("params")
+        db_match = re.search(r"\bDB\s+'([^']*)'", params, re.IGNORECASE)
+        table_match = re.search(r"\bTABLE\s+'([^']*)'", params, re.IGNORECASE)
+        if table_match:
+            add(db_match.group(1) if db_match else None, table_match.group(1))
+
+    engine_match = _ENGINE_ARGS_RE.search(statement)
+    if engine_match:
+        args = _split_engine_args(engine_match.group("args"))
+        # Distributed(cluster, database, table, ...), Buffer(database, table, ...)
+        offset = 1 if engine_match.group("engine") == "Distributed" else 0
+        if len(args) >= offset + 2:
+            add(args[offset], args[offset + 1])
+
+    dependencies.discard((table.database, table.name))
+    return dependencies
+
+
+def _unquote(identifier: str) -> str:
+    if identifier.startswith("`"):
+        return re.sub(r"\\(.)", r"\1", identifier[1:-1])
+    return identifier
+
+
+def _split_engine_args(args: str) -> List[str]:
+    return [_unquote(arg.strip().strip("'")) for arg in args.split(",")]
+
+
 def embedded_schema_db_sql(db: Database) -> str:
     """
     Returns create statement for db with embedded schema.
@@ -53,6 +53,16 @@ DEFAULT_CONFIG = {
             "days": 7,
         },
         "deduplication_batch_size": 500,
+        # Deduplicate data parts by hashes of their files from system.parts before scanning frozen parts,
+        # so parts found in previous backups are not read on disk. Hashes are stored in backup metadata,
+        # so only parts of backups created with this option enabled can be deduplicated this way.
+        "deduplicate_parts_by_hash": False,
+        # Freeze only partitions having parts that are not found in previous backups by hashes from system.parts,
+        # parts of the other partitions are linked to previous backups without freezing. It requires
+        # deduplicate_parts_by_hash and is used for tables with PARTITION BY clause on local disks only.
+        "freeze_new_partitions_only": False,
+        # The number of threads scanning frozen data parts (reading checksums and sizes of files) on backup
+        "scan_frozen_parts_threads": 8,
         "min_interval": {
             "minutes": 0,
         },
@@ -80,6 +90,18 @@ DEFAULT_CONFIG = {
         "use_inplace_cloud_restore": False,
         # Max table name length. Actually it is just a result of the getMaxTableNameLengthForDatabase(<atomic_db>) ch function.
         "max_table_name": 206,
+        # Attach a partition by single ATTACH PARTITION query instead of attaching its parts one by one,
+        # if the detached directory of the table contains exactly the restored parts of the partition.
+        "attach_whole_partitions": False,
+        # Hardlink data parts from shadow directories of backups kept on local disks (e.g. with
+        # keep_freezed_data_on_failure) instead of downloading them, if their checksums match.
+        "link_local_parts": False,
+        # Directory of the local cache of restored data parts. Parts are kept unpacked and are hardlinked
+        # into detached directories of tables instead of downloading, so it should be on the same filesystem
+        # as ClickHouse data. If set to None, the cache is disabled.
+        "part_cache_path": None,
+        # The limit of total size of the local part cache, least recently used parts are evicted above it.
+        "part_cache_max_size": parse_size("100 GiB"),
     },
     "storage": {
         "type": "s3",
@@ -109,6 +131,16 @@ DEFAULT_CONFIG = {
         # chunk_size will be multiplied on a required number of times
         # to satisfy the limit.
         "max_chunk_count": 10000,
+        # Tune chunk size for multipart uploading by measured upload throughput of each worker process.
+        # The chunk size is chosen so that uploading of a single chunk takes about target_chunk_upload_time
+        # seconds, but not less than min_chunk_size and not greater than max_chunk_size.
+        "adaptive_chunk_size": False,
+        "min_chunk_size": parse_size("5 MiB"),
+        "max_chunk_size": parse_size("256 MiB"),
+        "target_chunk_upload_time": 2,
+        # Send Content-MD5 of uploaded objects and parts, so corrupted in transit data is rejected by
+        # the storage and re-sent as a single part rather than failing the whole upload.
+        "upload_checksum": True,
         # Enable bulk delete (DeleteObjects in S3 API)
         "bulk_delete_enabled": True,
         # How many files we can delete by bulk delete operation in one call
@@ -126,6 +158,18 @@ DEFAULT_CONFIG = {
         #          Total upload rate = 400 bytes/sec.
         # If the value is 0, then the traffic rate is unlimited.
         "max_upload_rate": 0,
+        # Upper bound of total network loading per second of all workers (bytes/sec). Unlike
+        # max_upload_rate, the limit doesn't depend on the number of workers and concurrent pipelines.
+        # Uploading and downloading have separate budgets. If the value is 0, then the traffic rate is unlimited.
+        "max_total_upload_rate": 0,
+        "max_total_download_rate": 0,
+        # Upper bound of network loading per second on the downloading stage for each worker (bytes/sec).
+        # If the value is 0, then the traffic rate is unlimited.
+        "max_download_rate": 0,
+        # Upper bound of writing restored data to local disk per second for each worker and in total
+        # (bytes/sec). If the value is 0, then the rate is unlimited.
+        "max_write_rate": 0,
+        "max_total_write_rate": 0,
         # The wait time for the next attempt upload the chunk to the storage. The value in seconds.
         "retry_interval": 0.01,
     },
@@ -159,15 +203,43 @@ DEFAULT_CONFIG = {
         "buffer_size": parse_size("32 MiB"),
         # The maximum number of objects the stage's input queue can hold simultaneously, `0`is unbounded
         "queue_size": 50,
+        # Preallocate restored files to their sizes before writing, so they are allocated contiguously.
+        # Filesystems without native support of fallocate (e.g. NFS) fall back to writing zeros, keep it off there.
+        "preallocate_files": False,
+        # Size of data downloaded between checkpoints of download progress of a data part. Interrupted download
+        # of the part is resumed from the last checkpoint on the next restore. 0 disables checkpoints.
+        "resume_checkpoint_size": 0,
     },
     "multiprocessing": {
         # The number of processes allocating for data processing. If set to 0, all processing will be performed
         # in the main process.
         "workers": 4,
+        # Start method of worker processes: "forkserver" or "spawn". With "forkserver" the workers are forked
+        # from a server process with pipeline modules preloaded, so they don't import the whole package on start.
+        "start_method": "forkserver",
+        # Run worker processes with idle IO scheduling class (ioprio_set), so their disk IO doesn't
+        # compete with ClickHouse merges and queries. Takes effect with IO schedulers supporting priorities only.
+        "idle_io_priority": False,
+        # Data parts are uploaded and downloaded by workers largest first. The limit of total size of parts
+        # processed by workers at once, smaller parts fill the remaining budget. If set to 0, it's unlimited.
+        "max_in_flight_size": 0,
+        # The limit of total size of parts waiting for workers. Scheduling of new parts waits while it's exceeded,
+        # so parts are not frozen and scanned too far ahead of their upload. If set to 0, it's unlimited.
+        "max_pending_size": 0,
+        # Data parts smaller than this size are processed before larger ones, after metadata. If set to 0,
+        # all data parts are processed largest first.
+        "small_part_size": 0,
+        # Uncompressed data parts larger than this size are uploaded by several workers in parallel, each
+        # worker uploads a range of that size as parts of one multipart upload. If set to 0, it's disabled.
+        "upload_range_size": 0,
         # The number of processes for parts restoring from S3 disks.
         "cloud_storage_restore_workers": 4,
         # The number of threads for parallel freeze of tables
         "freeze_threads": 4,
+        # Tables are frozen just in time: freezing of a table waits while the total size of frozen but not uploaded
+        # data exceeds this limit. Frozen data of a table is removed as soon as its parts are uploaded. Tables of
+        # the next database are frozen while the current one is uploaded. If set to 0, it's unlimited.
+        "max_frozen_data_size": parse_size("100 GiB"),
         # To execute freeze efficiently, we should parallelize freeze operations. We have two options where we can parallelize:
         # 1) Inside ch-backup: We can perform several `ALTER TABLE FREEZE PARTITION` queries. Then freeze_partition_threads are used.
         # 2) Inside clickhouse(preferable): Since 25.11 clickhouse can parallelize `ALTER TABLE FREEZE` queries. Then freeze_table_query_max_threads are used.
@@ -176,12 +248,25 @@ DEFAULT_CONFIG = {
         # The number of threads for parallel freeze of partitions. If set to 0, will freeze table in one query.
         "freeze_partition_threads": 16,
         "freeze_table_query_max_threads": 16,
+        # The number of threads for parallel restore of tables. Tables are restored level by level of the graph
+        # of their dependencies found in create statements, tables of each level are restored in parallel.
+        "restore_table_threads": 4,
+        # The number of threads for attaching restored data parts of a table. Parts of different partitions
+        # are attached in parallel, parts of the same partition are attached one after another.
+        "attach_part_threads": 4,
         # The number of threads for parallel drop replica
         "drop_replica_threads": 8,
+        # The number of threads for server-side copy of backup files to another bucket
+        "copy_threads": 16,
     },
     "pipeline": {
         # Is asynchronous pipelines used (based on Pypeln library)
         "async": True,
+        # Runtime of pipeline stages: "threads" runs each stage of each pipeline in its own thread (Pypeln),
+        # "asyncio" runs stages of all pipelines of a process as coroutines of one event loop.
+        "runtime": "threads",
+        # The number of threads executing stage handlers of all pipelines of a process with "asyncio" runtime.
+        "asyncio_threads": 16,
     },
     "main": {
         "user": "clickhouse",
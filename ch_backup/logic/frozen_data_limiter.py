@@ -0,0 +1,147 @@
+"""Frozen data limiter."""
+
+import threading
+from typing import Callable, Dict, Hashable, Optional
+
+
+class FrozenDataLimiter:
+    """
+    Limit total size of frozen but not uploaded data.
+
+    Tables are frozen just in time: freezing of a table waits while the frozen data exceeds max_size.
+    The size of a table is reserved on its freeze by an estimate, replaced with the actual size
+    of its parts to upload after scanning and released part by part as they are uploaded.
+
+    Databases are uploaded one after another, while tables of the next database are frozen in advance.
+    Freezing of a table of the database being uploaded waits for upload of the database data only,
+    so it can't be blocked by data frozen in advance. If nothing is frozen, a table of any size is frozen.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max_size
+        self._size = 0
+        self._db_sizes: Dict[int, int] = {}
+        self._reserved: Dict[Hashable, int] = {}
+        self._current_db_index = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Return True if the size of frozen data is limited.
+        """
+        return bool(self._max_size)
+
+    def acquire(self, db_index: int, key: Hashable, size: int) -> None:
+        """
+        Wait until the table with specified key and estimated size can be frozen and reserve its size.
+        """
+        with self._cond:
+            while self._must_wait(db_index, size):
+                self._cond.wait()
+
+            self._reserved[key] = size
+            self._update(db_index, size)
+
+    def commit(self, db_index: int, key: Hashable, size: int) -> None:
+        """
+        Replace the reserved size of the table with the actual size of its data to upload.
+        """
+        with self._cond:
+            self._update(db_index, size - self._reserved.pop(key, 0))
+
+    def free(self, db_index: int, size: int) -> None:
+        """
+        Account the data of specified size as uploaded.
+        """
+        with self._cond:
+            self._update(db_index, -size)
+
+    def release(self, db_index: int) -> None:
+        """
+        Account the database with specified index as uploaded.
+        """
+        with self._cond:
+            self._size -= self._db_sizes.pop(db_index, 0)
+            self._current_db_index = db_index + 1
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """
+        Unblock all waiting freezes, e.g. on backup failure.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _must_wait(self, db_index: int, size: int) -> bool:
+        if self._closed or not self._max_size:
+            return False
+
+        frozen_size = self._size
+        if db_index <= self._current_db_index:
+            frozen_size = self._db_sizes.get(db_index, 0)
+        return frozen_size > 0 and frozen_size + size > self._max_size
+
+    def _update(self, db_index: int, size_delta: int) -> None:
+        self._size += size_delta
+        self._db_sizes[db_index] = self._db_sizes.get(db_index, 0) + size_delta
+        if size_delta < 0:
+            self._cond.notify_all()
+
+
+class FrozenTableTracker:
+    """
+    Track upload of frozen parts of a table.
+
+    Frozen data of uploaded parts is freed in the limiter. on_uploaded is called once after all parts
+    of the table are scanned and uploaded. Parts are uploaded in other threads, and upload completion
+    is handled in the thread of the upload pool, so on_uploaded must not block.
+    """
+
+    def __init__(
+        self,
+        limiter: FrozenDataLimiter,
+        db_index: int,
+        key: Hashable,
+        on_uploaded: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self._limiter = limiter
+        self._db_index = db_index
+        self._key = key
+        self._on_uploaded = on_uploaded
+        self._size = 0
+        self._parts = 0
+        self._scanned = False
+        self._lock = threading.Lock()
+
+    def add_part(self, size: int) -> None:
+        """
+        Account the part of specified size submitted for upload.
+        """
+        with self._lock:
+            self._parts += 1
+            self._size += size
+
+    def part_uploaded(self, size: int) -> None:
+        """
+        Account the part of specified size as uploaded.
+        """
+        self._limiter.free(self._db_index, size)
+        with self._lock:
+            self._parts -= 1
+            uploaded = self._scanned and not self._parts
+        if uploaded and self._on_uploaded:
+            self._on_uploaded()
+
+    def scanned(self) -> None:
+        """
+        Account all parts of the table as submitted for upload.
+        """
+        with self._lock:
+            self._limiter.commit(self._db_index, self._key, self._size)
+            self._scanned = True
+            uploaded = not self._parts
+        if uploaded and self._on_uploaded:
+            self._on_uploaded()
@@ -3,7 +3,9 @@ Clickhouse partial restore helper
 """
 
 import fnmatch
-from typing import List
+from typing import List, Set, Tuple
+
+from ch_backup.backup.metadata import split_part_name
 
 
 class PartialRestorePattern:
@@ -74,3 +76,51 @@ class PartialRestoreFilter:
         Is filter accepting all tables
         """
         return len(self.patterns) == 0
+
+
+class PartitionFilter:
+    """
+    Filter of restoring data parts by their partitions
+    """
+
+    def __init__(self, items: List[str]):
+        """
+        @param items: partition IDs or inclusive ranges of partition IDs in format min_id..max_id.
+            Bounds of ranges are compared as numbers if both of them are numeric (e.g. 20240101..20240131
+            for toYYYYMMDD(date) partition expression), otherwise as strings.
+        """
+        self.partition_ids: Set[str] = set()
+        self.ranges: List[Tuple[str, str]] = []
+        for item in items or []:
+            if ".." in item:
+                min_id, max_id = item.split("..", 1)
+                self.ranges.append((min_id, max_id))
+            else:
+                self.partition_ids.add(item)
+
+    def accept_part(self, part_name: str) -> bool:
+        """
+        Checks if data part belongs to the partitions of filter.
+        """
+        if self.is_empty():
+            return True
+
+        partition_id = split_part_name(part_name).partition_id
+        if partition_id in self.partition_ids:
+            return True
+
+        return any(
+            _in_range(partition_id, min_id, max_id) for min_id, max_id in self.ranges
+        )
+
+    def is_empty(self) -> bool:
+        """
+        Is filter accepting all parts
+        """
+        return not self.partition_ids and not self.ranges
+
+
+def _in_range(partition_id: str, min_id: str, max_id: str) -> bool:
+    if partition_id.isdigit() and min_id.isdigit() and max_id.isdigit():
+        return int(min_id) <= int(partition_id) <= int(max_id)
+    return min_id <= partition_id <= max_id
@@ -15,8 +15,11 @@ from string import ascii_lowercase
 from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 from ch_backup import logging
-from ch_backup.backup.deduplication import deduplicate_parts
-from ch_backup.backup.metadata import PartMetadata, TableMetadata
+from ch_backup.backup.deduplication import (
+    deduplicate_parts,
+    deduplicate_parts_by_hash,
+)
+from ch_backup.backup.metadata import PartMetadata, TableMetadata, split_part_name
 from ch_backup.backup.restore_context import PartState
 from ch_backup.backup_context import BackupContext
 from ch_backup.clickhouse.client import ClickhouseError
@@ -24,17 +27,20 @@ from ch_backup.clickhouse.disks import ClickHouseTemporaryDisks
 from ch_backup.clickhouse.metadata_cleaner import MetadataCleaner
 from ch_backup.clickhouse.models import Database, FrozenPart, Table
 from ch_backup.clickhouse.schema import (
+    get_table_dependencies,
     rewrite_table_schema,
     to_attach_query,
     to_create_query,
 )
 from ch_backup.exceptions import ClickhouseBackupError
 from ch_backup.logic.backup_manager import BackupManager
+from ch_backup.logic.frozen_data_limiter import FrozenDataLimiter, FrozenTableTracker
+from ch_backup.logic.partial_restore import PartitionFilter
 from ch_backup.logic.upload_part_observer import UploadPartObserver
 from ch_backup.storage.async_pipeline.base_pipeline.exec_pool import (
     ThreadExecPool,
 )
-from ch_backup.util import compare_schema
+from ch_backup.util import chunked, compare_schema
 
 RANDOM_TABLE_NAME_LENGTH = 16
 
@@ -93,16 +99,51 @@ class TableBackup(BackupManager):
             context, databases, db_tables
         )
 
-        for db in databases:
-            self._backup(
-                context,
-                db,
-                db_tables[db.name],
-                backup_name,
-                schema_only,
-                multiprocessing_config,
-                change_times,
-            )
+        # Create shadow/increment.txt if not exists manually to avoid
+        # race condition with parallel freeze
+        context.ch_ctl.create_shadow_increment()
+
+        # Tables are frozen just in time to bound disk usage by frozen data, tables of the next database
+        # are frozen while the current one is uploaded
+        limiter = FrozenDataLimiter(
+            multiprocessing_config.get("max_frozen_data_size", 0)
+        )
+        freeze_pools: Dict[int, ThreadExecPool] = {}
+        try:
+            for db_index, db in enumerate(databases):
+                # Start freezing of the current database if it's not started yet and of the next one
+                for index in (db_index, db_index + 1):
+                    if index < len(databases) and index not in freeze_pools:
+                        freeze_pools[index] = self._freeze_tables(
+                            context,
+                            databases[index],
+                            index,
+                            db_tables[databases[index].name],
+                            backup_name,
+                            schema_only,
+                            multiprocessing_config,
+                            change_times,
+                            limiter,
+                        )
+
+                self._backup(
+                    context,
+                    db,
+                    db_index,
+                    freeze_pools[db_index],
+                    limiter,
+                    backup_name,
+                    schema_only,
+                    change_times,
+                )
+                freeze_pools.pop(db_index).shutdown()
+                limiter.release(db_index)
+        finally:
+            limiter.close()
+            for pool in freeze_pools.values():
+                pool.shutdown()
+
+        context.ch_ctl.remove_freezed_data()
 
     def _collect_local_metadata_change_times(
         self,
@@ -134,55 +175,70 @@ class TableBackup(BackupManager):
         return res
 
     # pylint: disable=too-many-positional-arguments
-    def _backup(
-        self,
+    @staticmethod
+    def _freeze_tables(
         context: BackupContext,
         db: Database,
+        db_index: int,
         tables: Sequence[str],
         backup_name: str,
         schema_only: bool,
         multiprocessing_config: Dict,
         change_times: Dict[Table, TableMetadataChangeTime],
-    ) -> None:
+        limiter: FrozenDataLimiter,
+    ) -> ThreadExecPool:
         """
-        Backup single database tables.
+        Start freezing of single database tables.
         """
-        if not db.is_external_db_engine():
-            tables_ = [
-                table
-                for table in context.ch_ctl.get_tables(db.name, tables)
-                if table in change_times
-            ]
+        pool = ThreadExecPool(multiprocessing_config.get("freeze_threads", 1))
+        if db.is_external_db_engine():
+            return pool
 
-            create_statements_to_backup = []
+        for table in context.ch_ctl.get_tables(db.name, tables):
+            if table not in change_times:
+                continue
+            pool.submit(
+                f'Freeze table "{table.database}"."{table.name}"',
+                TableBackup._freeze_table,
+                context,
+                db,
+                table,
+                backup_name,
+                schema_only,
+                multiprocessing_config.get("parallelize_freeze_in_clickhouse", False),
+                multiprocessing_config.get("freeze_partition_threads", 0),
+                multiprocessing_config.get("freeze_table_query_max_threads", 0),
+                limiter,
+                db_index,
+            )
+        return pool
 
-            # Create shadow/increment.txt if not exists manually to avoid
-            # race condition with parallel freeze
-            context.ch_ctl.create_shadow_increment()
-            try:
-                with ThreadExecPool(
-                    multiprocessing_config.get("freeze_threads", 1)
-                ) as pool:
-                    for table in tables_:
-                        pool.submit(
-                            f'Freeze table "{table.database}"."{table.name}"',
-                            TableBackup._freeze_table,
-                            context,
-                            db,
-                            table,
-                            backup_name,
-                            schema_only,
-                            multiprocessing_config.get(
-                                "parallelize_freeze_in_clickhouse", False
-                            ),
-                            multiprocessing_config.get("freeze_partition_threads", 0),
-                            multiprocessing_config.get(
-                                "freeze_table_query_max_threads", 0
-                            ),
-                        )
+    # pylint: disable=too-many-positional-arguments
+    def _backup(
+        self,
+        context: BackupContext,
+        db: Database,
+        db_index: int,
+        freeze_pool: ThreadExecPool,
+        limiter: FrozenDataLimiter,
+        backup_name: str,
+        schema_only: bool,
+        change_times: Dict[Table, TableMetadataChangeTime],
+    ) -> None:
+        """
+        Backup single database tables frozen by the pool.
 
-                    for freezed_table in pool.as_completed(keep_going=False):
-                        if freezed_table is not None:
+        Frozen data of a table is removed by the cleanup pool after upload of all its parts,
+        as upload completion is handled in the thread of the upload pool.
+        """
+        if not db.is_external_db_engine():
+            create_statements_to_backup = []
+            upload_observer = UploadPartObserver(context)
+            with ThreadExecPool(1) as cleanup_pool:
+                try:
+                    for freeze_result in freeze_pool.as_completed(keep_going=False):
+                        if freeze_result is not None:
+                            freezed_table, linked_parts = freeze_result
                             if self._check_metadata_change_time(
                                 context,
                                 freezed_table,
@@ -205,18 +261,35 @@ class TableBackup(BackupManager):
                                         context,
                                         freezed_table,
                                         backup_name,
+                                        upload_observer,
+                                        linked_parts,
+                                        FrozenTableTracker(
+                                            limiter,
+                                            db_index,
+                                            _table_key(freezed_table),
+                                            partial(
+                                                cleanup_pool.submit,
+                                                f'Remove frozen data of "{freezed_table.database}"."{freezed_table.name}"',
+                                                context.ch_ctl.remove_freezed_data,
+                                                backup_name,
+                                                freezed_table,
+                                            ),
+                                        ),
                                     )
                                     self._backup_cloud_storage_metadata(
                                         context, freezed_table
                                     )
-            finally:
-                if create_statements_to_backup:
-                    context.backup_layout.upload_create_statements(
-                        context.backup_meta, db, create_statements_to_backup
-                    )
+                            else:
+                                limiter.commit(db_index, _table_key(freezed_table), 0)
+                finally:
+                    if create_statements_to_backup:
+                        context.backup_layout.upload_create_statements(
+                            context.backup_meta, db, create_statements_to_backup
+                        )
 
-            context.backup_layout.wait()
-            context.ch_ctl.remove_freezed_data()
+                context.backup_layout.wait()
+                cleanup_pool.wait_all()
+            self._validate_uploaded_parts(context, upload_observer.uploaded_parts)
 
         context.backup_layout.upload_backup_metadata(context.backup_meta)
 
@@ -231,9 +304,11 @@ class TableBackup(BackupManager):
         parallelize_freeze_in_ch: bool,
         freeze_partition_threads: int,
         freeze_table_query_max_threads: int,
-    ) -> Optional[Table]:
+        limiter: FrozenDataLimiter,
+        db_index: int,
+    ) -> Optional[Tuple[Table, List[PartMetadata]]]:
         """
-        Freeze table and return it's create statement
+        Freeze table and return it with parts linked to previous backups without freezing
         """
         logging.debug('Trying to freeze "{}"."{}"', table.database, table.name)
         create_statement = TableBackup._load_create_statement_from_disk(table)
@@ -246,8 +321,20 @@ class TableBackup(BackupManager):
             )
             return None
 
+        linked_parts: List[PartMetadata] = []
         # Freeze only MergeTree tables
         if not schema_only and table.is_merge_tree():
+            if limiter.enabled:
+                limiter.acquire(
+                    db_index,
+                    _table_key(table),
+                    context.ch_ctl.get_table_data_size(table),
+                )
+            partitions = None
+            if TableBackup._can_freeze_new_partitions_only(context, table):
+                partitions, linked_parts = TableBackup._link_cold_partitions(
+                    context, table
+                )
             try:
                 context.ch_ctl.freeze_table(
                     backup_name,
@@ -255,6 +342,7 @@ class TableBackup(BackupManager):
                     parallelize_freeze_in_ch,
                     freeze_partition_threads,
                     freeze_table_query_max_threads,
+                    partitions,
                 )
             except ClickhouseError:
                 if context.ch_ctl.does_table_exist(table.database, table.name):
@@ -270,9 +358,68 @@ class TableBackup(BackupManager):
                     table.database,
                     table.name,
                 )
+                limiter.commit(db_index, _table_key(table), 0)
                 return None
 
-        return table
+        return table, linked_parts
+
+    @staticmethod
+    def _can_freeze_new_partitions_only(context: BackupContext, table: Table) -> bool:
+        """
+        Check if only partitions with parts missing in previous backups can be frozen.
+
+        Parts are matched by hashes from system.parts, so deduplication by hashes must be enabled.
+        Data of Cloud Storage disks is backed up by frozen metadata files, so the whole table is frozen.
+        """
+        return (
+            context.config.get("freeze_new_partitions_only", False)
+            and context.config.get("deduplicate_parts_by_hash", False)
+            # FREEZE PARTITION ID with deprecated syntax throws segmentation fault in CH.
+            and "PARTITION BY" in table.create_statement
+            and all(disk.type == "local" for _, disk in table.paths_with_disks)
+        )
+
+    @staticmethod
+    def _link_cold_partitions(
+        context: BackupContext, table: Table
+    ) -> Tuple[List[str], List[PartMetadata]]:
+        """
+        Find partitions with parts missing in previous backups and link parts of the other ones.
+
+        Return partitions to freeze and parts of partitions all parts of which are found in previous backups.
+        """
+        part_hashes = context.ch_ctl.get_active_part_hashes(table)
+        deduplicated_parts: Dict[str, PartMetadata] = {}
+        for batch in chunked(
+            part_hashes.items(), context.config["deduplication_batch_size"]
+        ):
+            deduplicated_parts.update(
+                deduplicate_parts_by_hash(
+                    context,
+                    table.database,
+                    table.name,
+                    {name: hash_of_all_files for name, (_, hash_of_all_files) in batch},
+                )
+            )
+
+        hot_partitions = {
+            partition
+            for name, (partition, _) in part_hashes.items()
+            if name not in deduplicated_parts
+        }
+        linked_parts = [
+            deduplicated_parts[name]
+            for name, (partition, _) in part_hashes.items()
+            if partition not in hot_partitions
+        ]
+        logging.debug(
+            'Table "{}"."{}": {} partitions with new parts to freeze, {} parts of the other partitions are linked',
+            table.database,
+            table.name,
+            len(hot_partitions),
+            len(linked_parts),
+        )
+        return sorted(hot_partitions), linked_parts
 
     @staticmethod
     def _load_create_statement_from_disk(table: Table) -> Optional[str]:
@@ -332,6 +479,7 @@ class TableBackup(BackupManager):
         skip_cloud_storage: bool,
         keep_going: bool,
         restore_tables_in_replicated_database: bool,
+        partition_filter: Optional[PartitionFilter] = None,
     ) -> None:
         """
         Restore tables and MergeTree data.
@@ -451,6 +599,7 @@ class TableBackup(BackupManager):
                 disks=disks,
                 skip_cloud_storage=skip_cloud_storage,
                 keep_going=keep_going,
+                partition_filter=partition_filter,
             )
 
     def _check_metadata_change_time(
@@ -480,9 +629,16 @@ class TableBackup(BackupManager):
         context: BackupContext,
         table: Table,
         backup_name: str,
+        upload_observer: UploadPartObserver,
+        linked_parts: List[PartMetadata],
+        tracker: FrozenTableTracker,
     ) -> None:
         """
         Backup table with data opposed to schema only.
+
+        Parts are uploaded asynchronously, the caller waits for their upload. The tracker is notified
+        about upload of every part to release frozen data as soon as possible. Linked parts are
+        found in previous backups on freeze and added to the backup as is.
         """
 
         def deduplicate_parts_in_batch(
@@ -504,18 +660,25 @@ class TableBackup(BackupManager):
 
             for part_name in frozen_parts:
                 if part_name in deduplicated_parts:
-                    context.ch_ctl.remove_freezed_part(frozen_parts[part_name])
-                    context.backup_meta.add_part(deduplicated_parts[part_name])
+                    fpart = frozen_parts[part_name]
+                    part = deduplicated_parts[part_name]
+                    if fpart.hash_of_all_files:
+                        part.raw_metadata.hash_of_all_files = fpart.hash_of_all_files
+                    context.ch_ctl.remove_freezed_part(fpart)
+                    context.backup_meta.add_part(part)
                 else:
+                    fpart = frozen_parts[part_name]
+                    tracker.add_part(fpart.size)
                     context.backup_layout.upload_data_part(
                         context.backup_meta,
-                        frozen_parts[part_name],
+                        fpart,
                         partial(
                             upload_observer,
                             PartMetadata.from_frozen_part(
-                                frozen_parts[part_name], context.backup_meta.encrypted
+                                fpart, context.backup_meta.encrypted
                             ),
                         ),
+                        partial(tracker.part_uploaded, fpart.size),
                     )
             frozen_parts.clear()
 
@@ -533,18 +696,44 @@ class TableBackup(BackupManager):
 
         logging.debug('Uploading table data for "{}"."{}"', table.database, table.name)
 
-        upload_observer = UploadPartObserver(context)
+        for linked_part in linked_parts:
+            context.backup_meta.add_part(linked_part)
 
-        frozen_parts_batch: Dict[str, FrozenPart] = {}
         dedup_batch_size = context.config["deduplication_batch_size"]
+
+        # Parts found in previous backups by hashes from system.parts are not scanned on disk
+        part_hashes: Dict[str, str] = {}
+        hash_deduplicated_parts: Dict[str, PartMetadata] = {}
+        if context.config.get("deduplicate_parts_by_hash"):
+            part_hashes = context.ch_ctl.get_part_hashes(table)
+            for batch in chunked(part_hashes.items(), dedup_batch_size):
+                hash_deduplicated_parts.update(
+                    deduplicate_parts_by_hash(
+                        context, table.database, table.name, dict(batch)
+                    )
+                )
+
+        frozen_parts_batch: Dict[str, FrozenPart] = {}
         for data_path, disk in table.paths_with_disks:
+            excluded_parts: Set[str] = set()
+            if disk.type != "s3" and hash_deduplicated_parts:
+                for part_name in context.ch_ctl.get_frozen_part_names(
+                    disk, data_path, backup_name
+                ):
+                    part = hash_deduplicated_parts.pop(part_name, None)
+                    if part:
+                        context.backup_meta.add_part(part)
+                        excluded_parts.add(part_name)
+
             for fpart in context.ch_ctl.scan_frozen_parts(
                 table,
                 disk,
                 data_path,
                 backup_name,
+                excluded_parts,
             ):
                 logging.debug("Working on {}", fpart)
+                fpart.hash_of_all_files = part_hashes.get(fpart.name)
                 if disk.type == "s3":
                     context.backup_meta.add_part(
                         PartMetadata.from_frozen_part(
@@ -566,12 +755,7 @@ class TableBackup(BackupManager):
                 upload_observer,
                 frozen_parts_batch,
             )
-
-        context.backup_layout.wait()
-
-        self._validate_uploaded_parts(context, upload_observer.uploaded_parts)
-
-        context.ch_ctl.remove_freezed_data(backup_name, table)
+        tracker.scanned()
 
     @staticmethod
     def _validate_uploaded_parts(context: BackupContext, uploaded_parts: list) -> None:
@@ -1035,6 +1219,7 @@ class TableBackup(BackupManager):
         disks: ClickHouseTemporaryDisks,
         skip_cloud_storage: bool,
         keep_going: bool,
+        partition_filter: Optional[PartitionFilter] = None,
     ) -> None:
         # pylint: disable=too-many-branches
         logging.info("Restoring tables data")
@@ -1074,8 +1259,20 @@ class TableBackup(BackupManager):
                 table: Table = context.ch_ctl.get_table(
                     table_meta.database, table_meta.name
                 )  # type: ignore
+                owner = context.ch_ctl.get_file_owner()
+                link_local_parts = context.config_root["restore"].get(
+                    "link_local_parts", False
+                )
                 attach_parts = []
+                # Parts having files not created with the owner set
+                chown_parts = []
                 for part in table_meta.get_parts():
+                    if partition_filter and not partition_filter.accept_part(part.name):
+                        logging.debug(
+                            f"{table.database}.{table.name} part {part.name} doesn't match partition filter, skipping it"
+                        )
+                        continue
+
                     if context.restore_context.part_restored(part):
                         logging.debug(
                             f"{table.database}.{table.name} part {part.name} already restored, skipping it"
@@ -1087,9 +1284,12 @@ class TableBackup(BackupManager):
                             f"{table.database}.{table.name} part {part.name} already downloading, only attach it"
                         )
                         attach_parts.append(part)
+                        chown_parts.append(part)
                         continue
 
                     try:
+                        # Files of parts downloaded as tarball are created with the owner set
+                        created_with_owner = False
                         if part.disk_name in context.backup_meta.cloud_storage.disks:
                             if skip_cloud_storage:
                                 logging.debug(
@@ -1102,6 +1302,16 @@ class TableBackup(BackupManager):
                             fs_part_path = context.ch_ctl.get_detached_part_path(
                                 table, part.disk_name, part.name
                             )
+                            if link_local_parts and context.ch_ctl.link_local_part(
+                                table, part, fs_part_path
+                            ):
+                                context.restore_context.change_part_state(
+                                    PartState.DOWNLOADED, part
+                                )
+                                attach_parts.append(part)
+                                chown_parts.append(part)
+                                continue
+
                             context.backup_layout.download_data_part(
                                 context.backup_meta,
                                 part,
@@ -1110,9 +1320,13 @@ class TableBackup(BackupManager):
                                     context.restore_context.change_part_state,
                                     PartState.DOWNLOADED,
                                 ),
+                                owner=owner,
                             )
+                            created_with_owner = part.tarball and bool(owner)
 
                         attach_parts.append(part)
+                        if not created_with_owner:
+                            chown_parts.append(part)
                     except Exception:
                         if keep_going:
                             logging.exception(
@@ -1145,39 +1359,77 @@ class TableBackup(BackupManager):
                             PartState.DOWNLOADED, part
                         )
 
-                context.ch_ctl.chown_detached_table_parts(
-                    table, context.restore_context
+                context.ch_ctl.chown_detached_parts(
+                    table, chown_parts, context.restore_context
                 )
-                for part in attach_parts:
-                    logging.debug(
-                        'Attaching "{}.{}" part: {}',
-                        table.database,
-                        table.name,
-                        part.name,
-                    )
-                    try:
-                        context.ch_ctl.attach_part(table, part.name)
-                        context.restore_context.change_part_state(
-                            PartState.RESTORED, part
-                        )
-                    except Exception as e:
-                        logging.warning(
-                            'Attaching "{}.{}" part {} failed: {}',
-                            table.database,
-                            table.name,
-                            part.name,
-                            repr(e),
-                        )
-                        context.restore_context.add_failed_part(part, e)
-                        # if part failed to attach due to corrupted data during download
-                        context.restore_context.change_part_state(
-                            PartState.INVALID, part
-                        )
+                TableBackup._attach_parts(context, table, attach_parts)
             finally:
                 context.restore_context.dump_state()
 
         logging.info("Restoring tables data completed")
 
+    @staticmethod
+    def _attach_parts(
+        context: BackupContext, table: Table, parts: List[PartMetadata]
+    ) -> None:
+        """
+        Attach downloaded parts to the table and record the results in the restore context.
+
+        Parts of different partitions are attached in parallel. If enabled, a partition whose detached parts
+        are exactly the parts to attach is attached by a single ATTACH PARTITION query.
+        """
+        partitions: Dict[str, List[PartMetadata]] = {}
+        for part in parts:
+            partitions.setdefault(split_part_name(part.name).partition_id, []).append(
+                part
+            )
+
+        whole_partitions: Set[str] = set()
+        if context.config_root["restore"].get("attach_whole_partitions", False):
+            detached: Dict[str, Set[str]] = {}
+            unknown: List[str] = []
+            for part_name in context.ch_ctl.get_detached_part_names(table):
+                try:
+                    partition_id = split_part_name(part_name).partition_id
+                except ValueError:
+                    # Not a part name, e.g. a duplicate with "_tryN" suffix
+                    unknown.append(part_name)
+                    continue
+                detached.setdefault(partition_id, set()).add(part_name)
+            # ATTACH PARTITION would also attach unknown entries of the partition, so such partitions
+            # are attached by parts
+            whole_partitions = {
+                partition_id
+                for partition_id, partition_parts in partitions.items()
+                if detached.get(partition_id) == {part.name for part in partition_parts}
+                and not any(name.startswith(f"{partition_id}_") for name in unknown)
+            }
+
+        threads = context.config_root["multiprocessing"].get("attach_part_threads", 1)
+        with ThreadExecPool(max(threads, 1)) as pool:
+            for partition_id, partition_parts in partitions.items():
+                pool.submit(
+                    f'Attach partition "{partition_id}"',
+                    _attach_partition_parts,
+                    context,
+                    table,
+                    partition_id,
+                    partition_parts,
+                    partition_id in whole_partitions,
+                )
+
+            # The restore context is not thread-safe, so it's updated by the current thread only
+            for results in pool.as_completed(keep_going=False):
+                for part, error in results:
+                    if error is None:
+                        context.restore_context.change_part_state(
+                            PartState.RESTORED, part
+                        )
+                        continue
+                    context.restore_context.add_failed_part(part, error)
+                    # if part failed to attach due to corrupted data during download
+                    context.restore_context.change_part_state(PartState.INVALID, part)
+
     def _rewrite_table_schema(
         self,
         context: BackupContext,
@@ -1212,34 +1464,35 @@ class TableBackup(BackupManager):
         tables: Iterable[Table],
         keep_going: bool = False,
     ) -> List[Table]:
+        """
+        Restore tables level by level of their dependency graph, tables of each level are restored in parallel.
+
+        Dependencies are found in create statements heuristically, so failed tables are retried one by one
+        after all levels are restored.
+        """
         logging.info("Restoring tables")
-        errors: List[Tuple[Table, Exception]] = []
-        unprocessed = deque(table for table in tables)
-        while unprocessed:
-            table = unprocessed.popleft()
-            try:
-                logging.debug(
-                    "Trying to restore table object for table {}",
-                    f"{table.database}.{table.name}",
-                )
-                self._restore_table_object(context, databases[table.database], table)
-            except Exception as e:
-                errors.append((table, e))
-                unprocessed.append(table)
-                logging.debug(f"Errors {len(errors)}, unprocessed {len(unprocessed)}")
-                if len(errors) > len(unprocessed):
-                    logging.error(
-                        f'Failed to restore "{table.database}"."{table.name}" with "{repr(e)}",'
-                        " no retries anymore"
+        tables = list(tables)
+        threads = context.config_root["multiprocessing"].get("restore_table_threads", 1)
+        retry_tables: List[Table] = []
+        with ThreadExecPool(max(1, threads)) as pool:
+            for level in _group_by_dependency_levels(tables):
+                for table in level:
+                    pool.submit(
+                        f'Restore table "{table.database}"."{table.name}"',
+                        self._try_restore_table_object,
+                        context,
+                        databases[table.database],
+                        table,
                     )
-                    break
-                logging.warning(
-                    f'Failed to restore "{table.database}"."{table.name}" with "{repr(e)}",'
-                    " will retry after restoring other tables"
-                )
-            else:
-                errors.clear()
+                for table, error in pool.as_completed():
+                    if error is not None:
+                        retry_tables.append(table)
+                        logging.warning(
+                            f'Failed to restore "{table.database}"."{table.name}" with "{repr(error)}",'
+                            " will retry after restoring other tables"
+                        )
 
+        errors = self._retry_restore_table_objects(context, databases, retry_tables)
         self._check_readonly_restored_tables(context, tables, errors)
 
         logging.info("Restoring tables completed")
@@ -1267,6 +1520,59 @@ class TableBackup(BackupManager):
 
         return []
 
+    def _retry_restore_table_objects(
+        self,
+        context: BackupContext,
+        databases: Dict[str, Database],
+        tables: Iterable[Table],
+    ) -> List[Tuple[Table, Exception]]:
+        """
+        Restore tables one by one re-queueing failed tables until no progress is made.
+        """
+        errors: List[Tuple[Table, Exception]] = []
+        unprocessed = deque(table for table in tables)
+        while unprocessed:
+            table = unprocessed.popleft()
+            try:
+                logging.debug(
+                    "Trying to restore table object for table {}",
+                    f"{table.database}.{table.name}",
+                )
+                self._restore_table_object(context, databases[table.database], table)
+            except Exception as e:
+                errors.append((table, e))
+                unprocessed.append(table)
+                logging.debug(f"Errors {len(errors)}, unprocessed {len(unprocessed)}")
+                if len(errors) > len(unprocessed):
+                    logging.error(
+                        f'Failed to restore "{table.database}"."{table.name}" with "{repr(e)}",'
+                        " no retries anymore"
+                    )
+                    break
+                logging.warning(
+                    f'Failed to restore "{table.database}"."{table.name}" with "{repr(e)}",'
+                    " will retry after restoring other tables"
+                )
+            else:
+                errors.clear()
+
+        return errors
+
+    @staticmethod
+    def _try_restore_table_object(
+        context: BackupContext,
+        db: Database,
+        table: Table,
+    ) -> Tuple[Table, Optional[Exception]]:
+        """
+        Restore table object and return it with the error occurred if any.
+        """
+        try:
+            TableBackup._restore_table_object(context, db, table)
+            return table, None
+        except Exception as e:
+            return table, e
+
     @staticmethod
     def _check_readonly_restored_tables(
         context: BackupContext,
@@ -1335,3 +1641,95 @@ class TableBackup(BackupManager):
             raise ClickhouseBackupError(
                 f"Failed to restore table: {table.database}.{table.name}"
             )
+
+
+def _group_by_dependency_levels(tables: List[Table]) -> List[List[Table]]:
+    """
+    Split tables into levels, so tables of each level depend only on tables of previous levels.
+
+    The order of tables is kept within levels. Tables with cyclic dependencies are put to the last level.
+    """
+    keys = {(table.database, table.name) for table in tables}
+    dependencies = {
+        (table.database, table.name): get_table_dependencies(table) & keys
+        for table in tables
+    }
+
+    levels = []
+    restored: Set[Tuple[str, str]] = set()
+    remaining = tables
+    while remaining:
+        level = [
+            table
+            for table in remaining
+            if dependencies[(table.database, table.name)] <= restored
+        ]
+        if not level:
+            logging.warning(
+                "Tables {} have cyclic dependencies",
+                ", ".join(f"{t.database}.{t.name}" for t in remaining),
+            )
+            level = remaining
+        levels.append(level)
+        restored.update((table.database, table.name) for table in level)
+        remaining = [
+            table for table in remaining if (table.database, table.name) not in restored
+        ]
+
+    return levels
+
+
+def _table_key(table: Table) -> Tuple[str, str]:
+    """
+    Return key of the table in the frozen data limiter.
+    """
+    return table.database, table.name
+
+
+def _attach_partition_parts(
+    context: BackupContext,
+    table: Table,
+    partition_id: str,
+    parts: List[PartMetadata],
+    whole_partition: bool,
+) -> List[Tuple[PartMetadata, Optional[Exception]]]:
+    """
+    Attach parts of single partition and return errors of attaching by parts.
+    """
+    if whole_partition:
+        logging.debug(
+            'Attaching "{}.{}" partition: {}', table.database, table.name, partition_id
+        )
+        try:
+            context.ch_ctl.attach_partition(table, partition_id)
+            return [(part, None) for part in parts]
+        except Exception as e:
+            logging.warning(
+                'Attaching "{}.{}" partition {} failed, attaching its parts one by one: {}',
+                table.database,
+                table.name,
+                partition_id,
+                repr(e),
+            )
+
+    results: List[Tuple[PartMetadata, Optional[Exception]]] = []
+    for part in parts:
+        logging.debug(
+            'Attaching "{}.{}" part: {}',
+            table.database,
+            table.name,
+            part.name,
+        )
+        try:
+            context.ch_ctl.attach_part(table, part.name)
+            results.append((part, None))
+        except Exception as e:
+            logging.warning(
+                'Attaching "{}.{}" part {} failed: {}',
+                table.database,
+                table.name,
+                part.name,
+                repr(e),
+            )
+            results.append((part, e))
+    return results
@@ -0,0 +1,272 @@
+"""
+Asyncio runtime of pipelines.
+
+It's an alternative to pypeln thread stages: stages of all pipelines of the process are run as coroutines
+of one event loop, and the blocking handler calls are executed by a thread pool shared by all pipelines.
+So the number of threads doesn't depend on the number of concurrent pipelines and their stages.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from functools import partial
+from itertools import count
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+)
+
+from ch_backup.storage.async_pipeline.base_pipeline.handler import (
+    Handler,
+    InputHandler,
+    IterableHandler,
+)
+
+# Marks the end of values passed between stages
+_END = object()
+
+
+class StageKind(Enum):
+    """
+    Kind of asyncio stage, it defines how handler results are passed to the next stage.
+    """
+
+    ITERABLE = "iterable"
+    INPUT = "input"
+    MAP = "map"
+    FLAT_MAP = "flat_map"
+
+
+@dataclass
+class AsyncStage:
+    """
+    Stage of asyncio pipeline.
+
+    Each of workers calls on_start and on_done of the handler, as pypeln stages do.
+    """
+
+    kind: StageKind
+    handler: Any
+    maxsize: int = 0
+    workers: int = 1
+
+
+def async_from_iterable(iterable: Iterable[Any]) -> AsyncStage:
+    """
+    Create stage producing values of arbitrary iterable.
+    """
+    return AsyncStage(StageKind.ITERABLE, iterable)
+
+
+def async_input(f: InputHandler, maxsize: int = 0, workers: int = 1) -> AsyncStage:
+    """
+    Create input stage.
+    """
+    return AsyncStage(StageKind.INPUT, f, maxsize, workers)
+
+
+def async_map(f: Handler, maxsize: int = 0, workers: int = 1) -> AsyncStage:
+    """
+    Create map stage.
+    """
+    return AsyncStage(StageKind.MAP, f, maxsize, workers)
+
+
+def async_flat_map(
+    f: IterableHandler, maxsize: int = 0, workers: int = 1
+) -> AsyncStage:
+    """
+    Create flat map stage.
+    """
+    return AsyncStage(StageKind.FLAT_MAP, f, maxsize, workers)
+
+
+Call = Callable[..., Awaitable[Any]]
+
+
+class AsyncPipeline:
+    """
+    Pipeline of asyncio stages.
+
+    Iteration runs the pipeline to completion in the asyncio runtime of the process and yields its results.
+    Results are kept in memory until the pipeline is complete, so pipelines whose results are not needed
+    must be run with complete().
+    """
+
+    def __init__(self, stages: List[AsyncStage], threads: int) -> None:
+        self._stages = stages
+        self._threads = threads
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(get_asyncio_runtime(self._threads).run(self, collect_results=True))
+
+    def complete(self) -> None:
+        """
+        Run the pipeline to completion discarding its results.
+        """
+        get_asyncio_runtime(self._threads).run(self, collect_results=False)
+
+    async def run(
+        self, executor: ThreadPoolExecutor, collect_results: bool = False
+    ) -> List[Any]:
+        """
+        Run the pipeline and return results of its last stage if collect_results is True.
+        """
+        loop = asyncio.get_running_loop()
+        call: Call = partial(loop.run_in_executor, executor)
+
+        input_queue: Optional[asyncio.Queue] = None
+        tasks = []
+        for stage in self._stages:
+            output_queue: asyncio.Queue = asyncio.Queue(stage.maxsize)
+            tasks.append(
+                asyncio.create_task(_run_stage(stage, input_queue, output_queue, call))
+            )
+            input_queue = output_queue
+        assert input_queue is not None, "Pipeline must not be empty"
+
+        results: List[Any] = []
+        collect = asyncio.create_task(
+            _collect(input_queue, results if collect_results else None)
+        )
+        try:
+            await asyncio.gather(*tasks, collect)
+        except BaseException:
+            for task in [*tasks, collect]:
+                task.cancel()
+            await asyncio.gather(*tasks, collect, return_exceptions=True)
+            raise
+
+        return results
+
+
+class AsyncioRuntime:
+    """
+    Event loop running in a background thread and thread pool for blocking handler calls.
+
+    Pipelines can be run from any thread, all of them share the loop and the pool.
+    """
+
+    def __init__(self, threads: int) -> None:
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix="pipeline")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="pipeline-loop", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, pipeline: AsyncPipeline, collect_results: bool = False) -> List[Any]:
+        """
+        Run pipeline to completion and return its results if collect_results is True.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            pipeline.run(self._executor, collect_results), self._loop
+        ).result()
+
+
+_RUNTIME: Optional[AsyncioRuntime] = None
+_RUNTIME_LOCK = threading.Lock()
+
+
+def get_asyncio_runtime(threads: int) -> AsyncioRuntime:
+    """
+    Return asyncio runtime of the current process.
+    """
+    global _RUNTIME  # pylint: disable=global-statement
+
+    with _RUNTIME_LOCK:
+        if _RUNTIME is None:
+            _RUNTIME = AsyncioRuntime(threads)
+        return _RUNTIME
+
+
+async def _run_stage(
+    stage: AsyncStage,
+    input_queue: Optional[asyncio.Queue],
+    output_queue: asyncio.Queue,
+    call: Call,
+) -> None:
+    await asyncio.gather(
+        *(
+            _run_worker(stage, input_queue, output_queue, call)
+            for _ in range(stage.workers)
+        )
+    )
+    await output_queue.put(_END)
+
+
+async def _run_worker(
+    stage: AsyncStage,
+    input_queue: Optional[asyncio.Queue],
+    output_queue: asyncio.Queue,
+    call: Call,
+) -> None:
+    index = count()
+
+    async def emit(values: AsyncIterator[Any]) -> None:
+        async for value in values:
+            # Flat map stages pass None values as is, the others skip them
+            if value is not None or stage.kind == StageKind.FLAT_MAP:
+                await output_queue.put((next(index), value))
+
+    if stage.kind == StageKind.ITERABLE:
+        await emit(_iterate(call, stage.handler))
+        return
+
+    handler = stage.handler
+    wrap = _iterate if stage.kind == StageKind.FLAT_MAP else _single
+
+    await emit(wrap(call, await call(handler.on_start)))
+
+    if stage.kind == StageKind.INPUT:
+        await emit(_iterate(call, await call(handler)))
+    elif input_queue is not None:
+        while True:
+            item = await input_queue.get()
+            if item is _END:
+                # Let other workers of the stage know about the end
+                await input_queue.put(_END)
+                break
+            value_index, value = item
+            await emit(wrap(call, await call(handler, value, value_index)))
+
+    await emit(wrap(call, await call(handler.on_done)))
+
+
+async def _collect(queue: asyncio.Queue, results: Optional[List[Any]]) -> None:
+    """
+    Drain results of the last stage, they are discarded if results is None.
+    """
+    while True:
+        item = await queue.get()
+        if item is _END:
+            return
+        if results is not None:
+            results.append(item[1])
+
+
+async def _single(_call: Call, value: Any) -> AsyncIterator[Any]:
+    yield value
+
+
+async def _iterate(call: Call, iterable: Optional[Iterable[Any]]) -> AsyncIterator[Any]:
+    """
+    Iterate over iterable in the thread pool, as iteration of generators executes handler code.
+    """
+    if iterable is None:
+        return
+
+    iterator = await call(iter, iterable)
+    while True:
+        value = await call(next, iterator, _END)
+        if value is _END:
+            return
+        yield value
@@ -0,0 +1,111 @@
+"""
+Chunk size tuner module.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+from ch_backup import logging
+from ch_backup.formatting import format_size
+
+# Chunk sizes are rounded to this value.
+CHUNK_SIZE_ALIGNMENT = 1024 * 1024
+
+
+class ChunkSizeTuner:
+    """
+    Adaptive chunk size of multipart uploads based on measured throughput of upload requests.
+
+    The chunk size is chosen so that uploading of a single chunk takes about the target time:
+    small chunks waste request overhead on fast links, large ones increase retry cost on flaky links.
+    Measurements are smoothed with exponential moving average. Thread safe.
+    """
+
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        min_chunk_size: int,
+        max_chunk_size: int,
+        target_upload_time: float,
+        smoothing: float = 0.3,
+        get_time_func: Callable = time.monotonic,
+    ) -> None:
+        assert 0 < min_chunk_size <= max_chunk_size
+        self._min_chunk_size = min_chunk_size
+        self._max_chunk_size = max_chunk_size
+        self._target_upload_time = target_upload_time
+        self._smoothing = smoothing
+        self._get_time_func = get_time_func
+        self._lock = threading.Lock()
+
+        self._throughput: Optional[float] = None
+        self._last_chunk_size: Optional[int] = None
+
+    def now(self) -> float:
+        """
+        Return current time used for measurements.
+        """
+        return self._get_time_func()
+
+    def observe(self, size: int, duration: float) -> None:
+        """
+        Account the upload request of specified size and duration.
+        """
+        if size <= 0 or duration <= 0:
+            return
+
+        throughput = size / duration
+        with self._lock:
+            if self._throughput is None:
+                self._throughput = throughput
+            else:
+                self._throughput += self._smoothing * (throughput - self._throughput)
+
+    def chunk_size(self, default_chunk_size: int) -> int:
+        """
+        Return chunk size for the next upload.
+
+        The default chunk size is used until the first measurement is made.
+        """
+        with self._lock:
+            if self._throughput is None:
+                return default_chunk_size
+
+            chunk_size = int(self._throughput * self._target_upload_time)
+            chunk_size -= chunk_size % CHUNK_SIZE_ALIGNMENT
+            chunk_size = max(
+                self._min_chunk_size, min(self._max_chunk_size, chunk_size)
+            )
+
+            if chunk_size != self._last_chunk_size:
+                logging.info(
+                    "Upload chunk size is set to {} (measured throughput {}/s)",
+                    format_size(chunk_size),
+                    format_size(int(self._throughput)),
+                )
+                self._last_chunk_size = chunk_size
+
+            return chunk_size
+
+
+_TUNER: Optional[ChunkSizeTuner] = None
+_TUNER_LOCK = threading.Lock()
+
+
+def get_chunk_size_tuner(config: dict) -> ChunkSizeTuner:
+    """
+    Return chunk size tuner of the current process.
+
+    The tuner is shared by all pipelines of the process, so the measurements are kept during the whole run.
+    """
+    global _TUNER  # pylint: disable=global-statement
+
+    with _TUNER_LOCK:
+        if _TUNER is None:
+            _TUNER = ChunkSizeTuner(
+                min_chunk_size=config["min_chunk_size"],
+                max_chunk_size=config["max_chunk_size"],
+                target_upload_time=config["target_chunk_upload_time"],
+            )
+        return _TUNER
@@ -6,16 +6,32 @@ import os
 import signal
 import threading
 import time
+from bisect import bisect_right
 from concurrent.futures import (
+    FIRST_COMPLETED,
     Executor,
     Future,
     ProcessPoolExecutor,
     ThreadPoolExecutor,
-    as_completed,
 )
-from dataclasses import dataclass
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import count
 from multiprocessing import get_context
-from typing import Any, Callable, Dict, Iterable, Optional
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from ch_backup import logging
 from ch_backup.util import exhaust_iterator
@@ -28,11 +44,111 @@ class Job:
     """
     Job submitted to ExecPool.
 
-    Callback is executed after job completion.
+    Callback is executed after job completion on waiting for it. Done callback is executed
+    right after successful job completion in the thread completing the job. Error callback is
+    executed after job failure on waiting for it.
     """
 
     id_: str
     callback: Optional[Callable]
+    size: int = 0
+    done_callback: Optional[Callable] = None
+    error_callback: Optional[Callable] = None
+
+
+@dataclass
+class PendingJob:
+    """
+    Sized job waiting in ExecPool for its turn to be submitted to the executor.
+    """
+
+    job: Job
+    func: Callable
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+class PendingJobQueue:
+    """
+    Queue of pending jobs ordered by priority and size.
+
+    Jobs smaller than small_job_size have higher priority than the others. Within the same priority larger
+    jobs go first. The queue is full when the total size of its jobs exceeds max_size.
+    """
+
+    def __init__(self, max_size: int = 0, small_job_size: int = 0) -> None:
+        # Keys are (priority, size, -sequence number), so jobs of equal size are taken in order of submission
+        self._keys: List[Tuple[int, int, int]] = []
+        self._jobs: List[PendingJob] = []
+        self._sequence = count()
+        self._max_size = max_size
+        self._small_job_size = small_job_size
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __iter__(self) -> Iterator[PendingJob]:
+        return iter(self._jobs)
+
+    @property
+    def size(self) -> int:
+        """
+        Return total size of pending jobs.
+        """
+        return self._size
+
+    def is_full(self, job_size: int) -> bool:
+        """
+        Return True if the job of specified size doesn't fit in the queue.
+
+        A job of any size fits in the empty queue.
+        """
+        return bool(
+            self._max_size and self._jobs and self._size + job_size > self._max_size
+        )
+
+    def push(self, pending: PendingJob) -> None:
+        """
+        Add job to the queue.
+        """
+        size = pending.job.size
+        priority = int(bool(self._small_job_size) and size < self._small_job_size)
+        key = (priority, size, -next(self._sequence))
+        index = bisect_right(self._keys, key)
+        self._keys.insert(index, key)
+        self._jobs.insert(index, pending)
+        self._size += size
+
+    def pop(self, max_size: Optional[int] = None) -> Optional[PendingJob]:
+        """
+        Remove and return the job of the highest priority, the largest one not exceeding max_size.
+        """
+        if max_size is None:
+            return self._pop(len(self._keys) - 1)
+
+        for priority in (1, 0):
+            index = bisect_right(self._keys, (priority, max_size, 0)) - 1
+            if index >= 0 and self._keys[index][0] == priority:
+                return self._pop(index)
+        return None
+
+    def clear(self) -> None:
+        """
+        Remove all jobs from the queue.
+        """
+        self._keys.clear()
+        self._jobs.clear()
+        self._size = 0
+
+    def _pop(self, index: int) -> Optional[PendingJob]:
+        if index < 0:
+            return None
+
+        del self._keys[index]
+        pending = self._jobs.pop(index)
+        self._size -= pending.job.size
+        return pending
 
 
 class ExecPool:
@@ -40,11 +156,39 @@ class ExecPool:
     Submit tasks on provided executor.
 
     Encapsulate collecting of futures and waiting all submitted tasks.
+
+    Jobs submitted with size are scheduled by the pool itself: at most max_in_flight_jobs of them are executed
+    at once, the largest pending job goes first and, if it doesn't fit in the remaining max_in_flight_size
+    budget, the largest one that fits fills the gap. Executing the largest jobs first minimizes the time when
+    only a few workers are busy with the last big jobs while the others are idle.
+
+    Jobs without size (e.g. metadata uploads) are submitted to the executor immediately, so they go before all
+    pending sized jobs. Sized jobs smaller than small_job_size go before larger ones. Submission of a sized job
+    blocks while the total size of pending jobs exceeds max_pending_size.
     """
 
-    def __init__(self, executor: Executor) -> None:
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        executor: Executor,
+        max_in_flight_jobs: int = 0,
+        max_in_flight_size: int = 0,
+        max_pending_size: int = 0,
+        small_job_size: int = 0,
+    ) -> None:
         self._future_to_job: Dict[Future, Job] = {}
+        # Pending jobs and futures of submitted ones by job ids
+        self._jobs: Dict[str, Union[PendingJob, Future]] = {}
         self._pool = executor
+        self._lock = threading.RLock()
+        self._dispatched = threading.Condition(self._lock)
+
+        self._max_in_flight_jobs = max_in_flight_jobs
+        self._max_in_flight_size = max_in_flight_size
+        self._in_flight_jobs = 0
+        self._in_flight_size = 0
+        self._pending_jobs = PendingJobQueue(max_pending_size, small_job_size)
+
         # It is necessary to start all processes while there are no running threads
         # Used to freeze and backup tables at the same time
         self._start_processes()
@@ -53,24 +197,109 @@ class ExecPool:
         """
         Wait workers for complete jobs and shutdown workers
         """
+        self._drop_pending_jobs()
         self._pool.shutdown(wait=graceful, cancel_futures=True)
 
+    # pylint: disable=too-many-positional-arguments
     def submit(
         self,
         job_id: str,
         func: Callable,
         *args: Any,
         callback: Optional[Callable] = None,
+        job_size: Optional[int] = None,
+        done_callback: Optional[Callable] = None,
+        error_callback: Optional[Callable] = None,
         **kwargs: Any,
     ) -> None:
         """
-        Schedule job for execution
+        Schedule job for execution.
+
+        Jobs with specified size are submitted to the executor in order of their priorities and sizes according
+        to the in-flight limits, submission blocks while the pending jobs queue is full. Other jobs are submitted
+        immediately.
+
+        Callback is executed on waiting for completion of jobs, while done callback is executed as soon as
+        the job is successfully completed in the thread completing it. Error callback is executed on waiting
+        for completion of the failed job.
+        """
+        with self._lock:
+            if job_size is not None:
+                while self._pending_jobs.is_full(job_size):
+                    self._dispatched.wait()
+
+            if job_id in self._jobs:
+                raise RuntimeError("Duplicate")
+
+            if job_size is None:
+                job = Job(
+                    job_id,
+                    callback,
+                    done_callback=done_callback,
+                    error_callback=error_callback,
+                )
+                self._submit(job, func, args, kwargs)
+                return
+
+            pending = PendingJob(
+                Job(job_id, callback, job_size, done_callback, error_callback),
+                func,
+                args,
+                kwargs,
+            )
+            self._jobs[job_id] = pending
+            self._pending_jobs.push(pending)
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """
+        Submit pending jobs to the executor while in-flight limits allow.
         """
-        if job_id in [job.id_ for job in self._future_to_job.values()]:
-            raise RuntimeError("Duplicate")
+        with self._lock:
+            while self._pending_jobs:
+                if (
+                    self._max_in_flight_jobs
+                    and self._in_flight_jobs >= self._max_in_flight_jobs
+                ):
+                    return
+
+                max_size = None
+                if self._max_in_flight_size and self._in_flight_jobs:
+                    max_size = self._max_in_flight_size - self._in_flight_size
+                pending = self._pending_jobs.pop(max_size)
+                if pending is None:
+                    return
+
+                self._in_flight_jobs += 1
+                self._in_flight_size += pending.job.size
+                future = self._submit(
+                    pending.job, pending.func, pending.args, pending.kwargs
+                )
+                future.add_done_callback(partial(self._on_done, pending.job.size))
+                self._dispatched.notify_all()
 
+    def _submit(
+        self, job: Job, func: Callable, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> Future:
         future = self._pool.submit(func, *args, **kwargs)
-        self._future_to_job[future] = Job(job_id, callback)
+        self._future_to_job[future] = job
+        self._jobs[job.id_] = future
+        if job.done_callback:
+            future.add_done_callback(partial(_call_on_success, job.done_callback))
+        return future
+
+    def _on_done(self, job_size: int, _future: Future) -> None:
+        with self._lock:
+            self._in_flight_jobs -= 1
+            self._in_flight_size -= job_size
+            self._dispatch()
+
+    def _drop_pending_jobs(self) -> None:
+        with self._lock:
+            for pending in self._pending_jobs:
+                del self._jobs[pending.job.id_]
+            self._pending_jobs.clear()
+            self._dispatched.notify_all()
 
     @staticmethod
     def _start():
@@ -89,31 +318,48 @@ class ExecPool:
         Args:
             keep_going - skip exceptions raised by futures instead of propagating it.
         """
-        for future in as_completed(self._future_to_job, timeout):
-            job = self._future_to_job[future]
-            logging.debug("Future {} completed", job.id_)
-
-            try:
-                result = future.result()
-            except Exception:
-                if keep_going:
-                    logging.warning(
-                        'Job "{}" generated an exception, skipping due to keep_going flag',
-                        job.id_,
-                        exc_info=True,
-                    )
-                    continue
-                logging.error(
-                    'Job "{}" generated an exception:', job.id_, exc_info=True
-                )
-                raise
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                # Pending jobs are dispatched by done callbacks of completed ones
+                while not self._future_to_job and self._pending_jobs:
+                    self._dispatched.wait()
+                futures = list(self._future_to_job)
+            if not futures:
+                break
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            done, _ = wait(futures, remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                raise FutureTimeoutError(f"{len(futures)} futures unfinished")
+
+            for future in done:
+                with self._lock:
+                    job = self._future_to_job.pop(future)
+                    del self._jobs[job.id_]
+                logging.debug("Future {} completed", job.id_)
 
-            if job.callback:
-                job.callback()
+                try:
+                    result = future.result()
+                except Exception:
+                    if job.error_callback:
+                        job.error_callback()
+                    if keep_going:
+                        logging.warning(
+                            'Job "{}" generated an exception, skipping due to keep_going flag',
+                            job.id_,
+                            exc_info=True,
+                        )
+                        continue
+                    logging.error(
+                        'Job "{}" generated an exception:', job.id_, exc_info=True
+                    )
+                    raise
 
-            yield result
+                if job.callback:
+                    job.callback()
 
-        self._future_to_job = {}
+                yield result
 
     def wait_all(
         self, keep_going: bool = False, timeout: Optional[float] = None
@@ -146,6 +392,14 @@ class ExecPool:
         return False
 
 
+def _call_on_success(callback: Callable, future: Future) -> None:
+    """
+    Call callback if the future is successfully completed.
+    """
+    if not future.cancelled() and future.exception() is None:
+        callback()
+
+
 class ThreadExecPool(ExecPool):
     """
     Submit tasks on ThreadPoolExecutor.
@@ -153,8 +407,8 @@ class ThreadExecPool(ExecPool):
     Encapsulate collecting of futures and waiting all submitted tasks.
     """
 
-    def __init__(self, workers: int) -> None:
-        super().__init__(ThreadPoolExecutor(workers))
+    def __init__(self, workers: int, max_in_flight_size: int = 0) -> None:
+        super().__init__(ThreadPoolExecutor(workers), workers, max_in_flight_size)
 
 
 def _init_logger(logger_: Any) -> None:
@@ -187,12 +441,16 @@ def _init_terminate_thread() -> None:
     terminate_thread.start()
 
 
-def _init_process(logger: Any) -> None:
+def _init_process(
+    logger: Any, initializer: Optional[Callable], initargs: Tuple[Any, ...]
+) -> None:
     """
     Initialize processes in pool.
     """
     _init_logger(logger)
     _init_terminate_thread()
+    if initializer:
+        initializer(*initargs)
 
 
 class ProcessExecPool(ExecPool):
@@ -204,20 +462,65 @@ class ProcessExecPool(ExecPool):
 
     _pool: ProcessPoolExecutor
 
-    def __init__(self, workers: int) -> None:
+    def __init__(
+        self,
+        workers: int,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple[Any, ...] = (),
+        max_in_flight_size: int = 0,
+        max_pending_size: int = 0,
+        small_job_size: int = 0,
+        start_method: str = "spawn",
+        preload: Sequence[str] = (),
+    ) -> None:
+        """
+        Optional initializer is called with initargs in each worker process after its start.
+
+        With "forkserver" start method, the preload modules are imported once by the fork server,
+        and worker processes are forked from it with these modules already imported.
+        """
+        # pylint: disable=too-many-positional-arguments
+        mp_context = get_context(start_method)
+        if start_method == "forkserver" and preload:
+            mp_context.set_forkserver_preload(list(preload))
+
         super().__init__(
             ProcessPoolExecutor(
                 max_workers=workers,
-                mp_context=get_context("spawn"),
+                mp_context=mp_context,
                 initializer=_init_process,
-                initargs=(logging.logger,),
-            )
+                initargs=(logging.logger, initializer, initargs),
+            ),
+            workers,
+            max_in_flight_size,
+            max_pending_size,
+            small_job_size,
+        )
+
+    def _start_processes(self) -> None:
+        """
+        Start all worker processes at once and log the time spent.
+
+        Processes are started on demand by the executor, so submit a job for each of them.
+        """
+        start_time = time.monotonic()
+        futures = [
+            self._pool.submit(ExecPool._start) for _ in range(self._max_in_flight_jobs)
+        ]
+        for future in futures:
+            future.result()
+        logging.info(
+            "Started {} worker processes in {:.2f} s",
+            self._max_in_flight_jobs,
+            time.monotonic() - start_time,
         )
 
     def shutdown(self, graceful: bool = True) -> None:
         """
         Wait workers for complete jobs and shutdown workers
         """
+        self._drop_pending_jobs()
+
         # Try to shutdown gracefully
         if graceful:
             self._pool.shutdown(wait=True, cancel_futures=True)
@@ -2,8 +2,10 @@
 Rate limiter module.
 """
 
+import threading
 import time
-from typing import Callable
+from multiprocessing import get_context
+from typing import Callable, Dict, Optional
 
 
 class RateLimiter:
@@ -56,3 +58,85 @@ class RateLimiter:
             return True
 
         return False
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    Rate limiter with the bucket state kept in shared memory.
+
+    The limiter can be passed to processes on their spawning (e.g. as initializer arguments of a process pool),
+    then all these processes draw tokens from the same bucket.
+    """
+
+    def __init__(self, limit_per_sec: int, get_time_func: Callable = time.time):
+        super().__init__(limit_per_sec, get_time_func)
+        self._state = get_context("spawn").Array(
+            "d", [self._bucket_tokens, self._bucket_last_update]
+        )
+
+    def extract_tokens(self, desired_quantity):
+        with self._state.get_lock():
+            self._load_state()
+            extracted = super().extract_tokens(desired_quantity)
+            self._store_state()
+        return extracted
+
+    def grant(self, tokens=1):
+        with self._state.get_lock():
+            self._load_state()
+            granted = super().grant(tokens)
+            self._store_state()
+        return granted
+
+    def _load_state(self) -> None:
+        self._bucket_tokens = int(self._state[0])
+        self._bucket_last_update = self._state[1]
+
+    def _store_state(self) -> None:
+        self._state[0] = self._bucket_tokens
+        self._state[1] = self._bucket_last_update
+
+
+_GLOBAL_RATE_LIMITERS: Optional[Dict[str, SharedRateLimiter]] = None
+_GLOBAL_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def init_global_rate_limiters(config: dict) -> Dict[str, SharedRateLimiter]:
+    """
+    Create rate limiters shared by the current process and all worker processes the limiters are passed to.
+
+    Limiters are created once per process, subsequent calls return already created ones.
+    """
+    global _GLOBAL_RATE_LIMITERS  # pylint: disable=global-statement
+
+    with _GLOBAL_RATE_LIMITERS_LOCK:
+        if _GLOBAL_RATE_LIMITERS is None:
+            _GLOBAL_RATE_LIMITERS = {}
+            for name, option in (
+                ("upload", "max_total_upload_rate"),
+                ("download", "max_total_download_rate"),
+                ("write", "max_total_write_rate"),
+            ):
+                if config.get(option):
+                    _GLOBAL_RATE_LIMITERS[name] = SharedRateLimiter(config[option])
+        return _GLOBAL_RATE_LIMITERS
+
+
+def set_global_rate_limiters(limiters: Dict[str, SharedRateLimiter]) -> None:
+    """
+    Set rate limiters shared with the parent process. Used on worker process initialization.
+    """
+    global _GLOBAL_RATE_LIMITERS  # pylint: disable=global-statement
+
+    with _GLOBAL_RATE_LIMITERS_LOCK:
+        _GLOBAL_RATE_LIMITERS = limiters
+
+
+def get_global_rate_limiter(name: str) -> Optional[RateLimiter]:
+    """
+    Return shared rate limiter with specified name ("upload", "download" or "write") if it's configured.
+    """
+    with _GLOBAL_RATE_LIMITERS_LOCK:
+        if _GLOBAL_RATE_LIMITERS is None:
+            return None
+        return _GLOBAL_RATE_LIMITERS.get(name)
@@ -2,10 +2,23 @@
 Pipeline builder.
 """
 
+import threading
 from functools import reduce
 from math import ceil
 from pathlib import Path
-from typing import Any, BinaryIO, Iterable, List, Optional, Sequence, Union
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
 
 from pypeln import utils as pypeln_utils
 from pypeln.thread.api.from_iterable import from_iterable
@@ -13,8 +26,23 @@ from pypeln.thread.api.from_iterable import from_iterable
 from ch_backup.compression import get_compression
 from ch_backup.encryption import get_encryption
 from ch_backup.storage.async_pipeline import thread_flat_map
+from ch_backup.storage.async_pipeline.base_pipeline.asyncio_runtime import (
+    AsyncPipeline,
+    AsyncStage,
+    async_flat_map,
+    async_from_iterable,
+    async_input,
+    async_map,
+)
+from ch_backup.storage.async_pipeline.base_pipeline.chunk_size_tuner import (
+    get_chunk_size_tuner,
+)
 from ch_backup.storage.async_pipeline.base_pipeline.input import thread_input
 from ch_backup.storage.async_pipeline.base_pipeline.map import thread_map
+from ch_backup.storage.async_pipeline.base_pipeline.rate_limiter import (
+    RateLimiter,
+    get_global_rate_limiter,
+)
 from ch_backup.storage.async_pipeline.stages import (
     ChunkingStage,
     CollectDataStage,
@@ -30,6 +58,7 @@ from ch_backup.storage.async_pipeline.stages import (
     RateLimiterStage,
     ReadDataTarballStage,
     ReadFileStage,
+    ReadFilesTarballRangeStage,
     ReadFilesTarballScanStage,
     ReadFilesTarballStage,
     StartMultipartUploadStage,
@@ -38,11 +67,34 @@ from ch_backup.storage.async_pipeline.stages import (
     WriteFilesStage,
     WriteFileStage,
 )
+from ch_backup.storage.async_pipeline.stages.filesystem.download_progress import (
+    DownloadProgress,
+)
 from ch_backup.storage.engine import get_storage_engine
+from ch_backup.storage.engine.base import PipeLineCompatibleStorageEngine
 
 # Union here is a workaround according to https://github.com/python/mypy/issues/7866
 PypelnStage = Union[pypeln_utils.BaseStage]
 
+# Storage engines of the current process by identity of their config. The config is kept referenced to not reuse its id.
+_STORAGE_ENGINES: Dict[int, Tuple[dict, PipeLineCompatibleStorageEngine]] = {}
+_STORAGE_ENGINES_LOCK = threading.Lock()
+
+
+def _get_storage_engine(config: dict) -> PipeLineCompatibleStorageEngine:
+    """
+    Return storage engine for the config.
+
+    The engine is created once per process and reused by all pipelines, so worker processes keep S3 sessions
+    and connection pools between jobs.
+    """
+    with _STORAGE_ENGINES_LOCK:
+        cached = _STORAGE_ENGINES.get(id(config))
+        if cached is None:
+            cached = (config, get_storage_engine(config))
+            _STORAGE_ENGINES[id(config)] = cached
+        return cached[1]
+
 
 class PipelineBuilder:
     """
@@ -55,11 +107,23 @@ class PipelineBuilder:
         self._config = config
         self._stages: List[PypelnStage] = []
 
+        # Stages are created by pypeln thread stage functions or their asyncio counterparts
+        self._asyncio = config["pipeline"].get("runtime") == "asyncio"
+        self._from_iterable: Callable = from_iterable
+        self._input: Callable = thread_input
+        self._map: Callable = thread_map
+        self._flat_map: Callable = thread_flat_map
+        if self._asyncio:
+            self._from_iterable = async_from_iterable
+            self._input = async_input
+            self._map = async_map
+            self._flat_map = async_flat_map
+
     def build_iterable_stage(self, iterable: Iterable[Any]) -> "PipelineBuilder":
         """
         Build stage from arbitrary iterable.
         """
-        self.append(from_iterable(iterable))
+        self.append(self._from_iterable(iterable))
         return self
 
     def build_read_file_stage(self, file_path: Path) -> "PipelineBuilder":
@@ -70,7 +134,7 @@ class PipelineBuilder:
         queue_size = stage_config["queue_size"]
 
         self.append(
-            thread_input(ReadFileStage(stage_config, file_path), maxsize=queue_size)
+            self._input(ReadFileStage(stage_config, file_path), maxsize=queue_size)
         )
 
         return self
@@ -84,7 +148,7 @@ class PipelineBuilder:
         queue_size = stage_config["queue_size"]
 
         self.append(
-            thread_map(
+            self._map(
                 CompressStage(
                     compressor,
                 ),
@@ -103,7 +167,7 @@ class PipelineBuilder:
         queue_size = stage_config["queue_size"]
 
         self.append(
-            thread_map(
+            self._map(
                 DecompressStage(
                     compressor,
                 ),
@@ -126,7 +190,7 @@ class PipelineBuilder:
         queue_size = stage_config["queue_size"]
 
         self.append(
-            thread_input(
+            self._input(
                 ReadFilesTarballScanStage(
                     stage_config, dir_path, tar_base_dir, exclude_file_names
                 ),
@@ -146,7 +210,7 @@ class PipelineBuilder:
         queue_size = stage_config["queue_size"]
 
         self.append(
-            thread_input(
+            self._input(
                 ReadFilesTarballStage(stage_config, dir_path, file_relative_paths),
                 maxsize=queue_size,
             )
@@ -154,6 +218,27 @@ class PipelineBuilder:
 
         return self
 
+    # pylint: disable=too-many-positional-arguments
+    def build_read_files_tarball_range_stage(
+        self, dir_path: Path, file_relative_paths: List[Path], start: int, end: int
+    ) -> "PipelineBuilder":
+        """
+        Build reading byte range of files tarball stage.
+        """
+        stage_config = self._config[ReadFilesTarballRangeStage.stype]
+        queue_size = stage_config["queue_size"]
+
+        self.append(
+            self._input(
+                ReadFilesTarballRangeStage(
+                    stage_config, dir_path, file_relative_paths, start, end
+                ),
+                maxsize=queue_size,
+            )
+        )
+
+        return self
+
     def build_read_data_tarball_stage(
         self, file_names: List[str], data_list: List[bytes]
     ) -> "PipelineBuilder":
@@ -164,7 +249,7 @@ class PipelineBuilder:
         queue_size = stage_config["queue_size"]
 
         self.append(
-            thread_input(
+            self._input(
                 ReadDataTarballStage(stage_config, file_names, data_list),
                 maxsize=queue_size,
             )
@@ -184,8 +269,8 @@ class PipelineBuilder:
         crypto = get_encryption(stage_config["type"], stage_config)
 
         self.append(
-            thread_flat_map(ChunkingStage(chunk_size, buffer_size), maxsize=queue_size),
-            thread_map(EncryptStage(crypto), maxsize=queue_size),
+            self._flat_map(ChunkingStage(chunk_size, buffer_size), maxsize=queue_size),
+            self._map(EncryptStage(crypto), maxsize=queue_size),
         )
 
         return self
@@ -204,8 +289,8 @@ class PipelineBuilder:
         chunk_size += crypto.metadata_size()
 
         self.append(
-            thread_flat_map(ChunkingStage(chunk_size, buffer_size), maxsize=queue_size),
-            thread_map(DecryptStage(crypto), maxsize=queue_size),
+            self._flat_map(ChunkingStage(chunk_size, buffer_size), maxsize=queue_size),
+            self._map(DecryptStage(crypto), maxsize=queue_size),
         )
 
         return self
@@ -223,12 +308,14 @@ class PipelineBuilder:
         chunk_size = stage_config["chunk_size"]
         queue_size = stage_config["queue_size"]
 
-        rate_limiter_config = self._config["rate_limiter"]
-
-        max_upload_rate = rate_limiter_config["max_upload_rate"]
-        retry_interval = rate_limiter_config["retry_interval"]
+        storage = _get_storage_engine(stage_config)
 
-        storage = get_storage_engine(stage_config)
+        tuner = None
+        if stage_config.get("adaptive_chunk_size"):
+            tuner = get_chunk_size_tuner(stage_config)
+            tuned_chunk_size = tuner.chunk_size(chunk_size)
+            buffer_size = ceil(buffer_size * tuned_chunk_size / chunk_size)
+            chunk_size = tuned_chunk_size
 
         if source_size > chunk_size:
             # Adjust chunk size for multipart uploading if needed
@@ -239,30 +326,63 @@ class PipelineBuilder:
                 chunk_size *= multiplier
 
         stages = [
-            thread_map(
+            self._map(
                 StartMultipartUploadStage(
                     stage_config, chunk_size, storage, remote_path
                 ),
                 maxsize=queue_size,
             ),
-            thread_map(
-                StorageUploadingStage(stage_config, storage, remote_path),
+            self._map(
+                StorageUploadingStage(stage_config, storage, remote_path, tuner),
                 maxsize=queue_size,
                 workers=stage_config["uploading_threads"],
             ),
-            thread_map(
+            self._map(
                 CompleteMultipartUploadStage(stage_config, storage, remote_path),
                 maxsize=queue_size,
             ),
         ]
 
         self.append(
-            thread_flat_map(
-                RateLimiterStage(max_upload_rate, retry_interval),
+            *self._rate_limiter_stages("max_upload_rate", "upload", queue_size),
+            self._flat_map(ChunkingStage(chunk_size, buffer_size), maxsize=queue_size),
+            *stages,
+        )
+        return self
+
+    # pylint: disable=too-many-positional-arguments
+    def build_multipart_range_uploading_stage(
+        self, remote_path: str, upload_id: str, first_part_num: int, chunk_size: int
+    ) -> "PipelineBuilder":
+        """
+        Build stage uploading data as a range of parts of already initiated multipart upload.
+        """
+        stage_config = self._config[StorageUploadingStage.stype]
+
+        buffer_size = max(stage_config["buffer_size"], chunk_size)
+        queue_size = stage_config["queue_size"]
+
+        storage = _get_storage_engine(stage_config)
+
+        self.append(
+            *self._rate_limiter_stages("max_upload_rate", "upload", queue_size),
+            self._flat_map(ChunkingStage(chunk_size, buffer_size), maxsize=queue_size),
+            self._map(
+                StartMultipartUploadStage(
+                    stage_config, chunk_size, storage, remote_path, upload_id
+                ),
                 maxsize=queue_size,
             ),
-            thread_flat_map(ChunkingStage(chunk_size, buffer_size), maxsize=queue_size),
-            *stages,
+            self._map(
+                StorageUploadingStage(
+                    stage_config,
+                    storage,
+                    remote_path,
+                    first_part_num=first_part_num,
+                ),
+                maxsize=queue_size,
+                workers=stage_config["uploading_threads"],
+            ),
         )
         return self
 
@@ -275,9 +395,7 @@ class PipelineBuilder:
         stage_config = self._config[DeleteFilesStage.stype]
 
         self.append(
-            thread_map(
-                DeleteFilesScanStage(stage_config, base_path, exclude_file_names)
-            )
+            self._map(DeleteFilesScanStage(stage_config, base_path, exclude_file_names))
         )
         return self
 
@@ -287,28 +405,41 @@ class PipelineBuilder:
         """
         stage_config = self._config[DeleteFilesStage.stype]
 
-        self.append(thread_map(DeleteFilesStage(stage_config, files)))
+        self.append(self._map(DeleteFilesStage(stage_config, files)))
         return self
 
-    def build_download_storage_stage(self, remote_path: str) -> "PipelineBuilder":
+    def build_download_storage_stage(
+        self, remote_path: str, range_start: int = 0
+    ) -> "PipelineBuilder":
         """
         Build downloading from storage stage.
         """
         stage_config = self._config[DownloadStorageStage.stype]
-        storage = get_storage_engine(stage_config)
+        storage = _get_storage_engine(stage_config)
         queue_size = stage_config["queue_size"]
 
         self.append(
-            thread_input(
-                DownloadStorageStage(stage_config, storage, remote_path),
+            self._input(
+                DownloadStorageStage(stage_config, storage, remote_path, range_start),
                 maxsize=queue_size,
             )
         )
+        self.append(
+            *self._rate_limiter_stages("max_download_rate", "download", queue_size)
+        )
         return self
 
-    def build_write_files_stage(self, dir_path: Path) -> "PipelineBuilder":
+    def build_write_files_stage(
+        self,
+        dir_path: Path,
+        owner: Optional[Tuple[str, str]] = None,
+        progress: Optional[DownloadProgress] = None,
+    ) -> "PipelineBuilder":
         """
         Build writing files to local filesystem stage.
+
+        If owner (user and group) is specified, it's set to written files on their creation.
+        If download progress is specified, writing is continued from its offset.
         """
         stage_config = self._config[WriteFilesStage.stype]
 
@@ -317,13 +448,40 @@ class PipelineBuilder:
         queue_size = stage_config["queue_size"]
 
         self.append(
-            thread_flat_map(ChunkingStage(chunk_size, buffer_size), maxsize=queue_size),
-            thread_map(
-                WriteFilesStage(stage_config, dir_path, buffer_size), maxsize=queue_size
+            *self._rate_limiter_stages("max_write_rate", "write", queue_size),
+            self._flat_map(ChunkingStage(chunk_size, buffer_size), maxsize=queue_size),
+            self._map(
+                WriteFilesStage(stage_config, dir_path, buffer_size, owner, progress),
+                maxsize=queue_size,
             ),
         )
         return self
 
+    def make_download_progress(
+        self, remote_path: str, dir_path: Path, decrypt: bool
+    ) -> Optional[DownloadProgress]:
+        """
+        Load progress of download of the object to files, if checkpoints of download progress are enabled.
+        """
+        checkpoint_size = self._config[WriteFilesStage.stype].get(
+            "resume_checkpoint_size", 0
+        )
+        if not checkpoint_size:
+            return None
+
+        chunk_size = stored_chunk_size = 1
+        if decrypt:
+            stage_config = self._config[EncryptStage.stype]
+            crypto = get_encryption(stage_config["type"], stage_config)
+            chunk_size = stage_config["chunk_size"]
+            stored_chunk_size = chunk_size + crypto.metadata_size()
+
+        progress = DownloadProgress(
+            dir_path, remote_path, checkpoint_size, chunk_size, stored_chunk_size
+        )
+        progress.load()
+        return progress
+
     def build_unpack_data_tarball_stage(self) -> "PipelineBuilder":
         """
         Build unpacking data tarball stage.
@@ -333,9 +491,7 @@ class PipelineBuilder:
         queue_size = stage_config["queue_size"]
 
         self.append(
-            thread_map(
-                UnpackTarballStage(stage_config, buffer_size), maxsize=queue_size
-            )
+            self._map(UnpackTarballStage(stage_config, buffer_size), maxsize=queue_size)
         )
         return self
 
@@ -343,7 +499,7 @@ class PipelineBuilder:
         """
         Build collecting data stage.
         """
-        self.append(thread_map(CollectDataStage()))
+        self.append(self._map(CollectDataStage()))
         return self
 
     def build_write_file_stage(
@@ -352,7 +508,12 @@ class PipelineBuilder:
         """
         Build writing single file stage.
         """
-        self.append(thread_map(WriteFileStage(file_path)))
+        queue_size = self._config[WriteFileStage.stype]["queue_size"]
+
+        self.append(
+            *self._rate_limiter_stages("max_write_rate", "write", queue_size),
+            self._map(WriteFileStage(file_path)),
+        )
         return self
 
     def build_delete_multiple_storage_stage(
@@ -362,13 +523,36 @@ class PipelineBuilder:
         Build deleting objects from storage stage.
         """
         stage_config = self._config[DeleteMultipleStorageStage.stype]
-        storage = get_storage_engine(stage_config)
+        storage = _get_storage_engine(stage_config)
 
         self.append(
-            thread_map(DeleteMultipleStorageStage(stage_config, remote_paths, storage))
+            self._map(DeleteMultipleStorageStage(stage_config, remote_paths, storage))
         )
         return self
 
+    def _rate_limiter_stages(
+        self, rate_option: str, global_rate_limiter_name: str, queue_size: int
+    ) -> List[PypelnStage]:
+        """
+        Return stages limiting data rate of the pipeline and of all worker processes in total.
+        """
+        rate_limiter_config = self._config["rate_limiter"]
+        retry_interval = rate_limiter_config["retry_interval"]
+
+        rate_limiters: List[RateLimiter] = []
+        if rate_limiter_config.get(rate_option):
+            rate_limiters.append(RateLimiter(rate_limiter_config[rate_option]))
+        global_rate_limiter = get_global_rate_limiter(global_rate_limiter_name)
+        if global_rate_limiter:
+            rate_limiters.append(global_rate_limiter)
+
+        return [
+            self._flat_map(
+                RateLimiterStage(rate_limiter, retry_interval), maxsize=queue_size
+            )
+            for rate_limiter in rate_limiters
+        ]
+
     def append(self, *stages: PypelnStage) -> None:
         """
         Append new stage to pipeline that is being built.
@@ -385,6 +569,12 @@ class PipelineBuilder:
                 "Pipeline must not be empty. Please build at least one stage"
             )
 
+        if self._asyncio:
+            return AsyncPipeline(
+                cast(List[AsyncStage], self._stages),
+                self._config["pipeline"]["asyncio_threads"],
+            )
+
         # The pipeline must start with a pypeln iterable Stage object (pypeln library requirement),
         # but all helper functions, like flat_map, produce pypeln_utils.Partial wrapper.
         # Therefore, we add dummy_stage in that case
@@ -2,24 +2,35 @@
 New pipelines executor module.
 """
 
+import threading
 from functools import partial
 from pathlib import Path
+from tarfile import BLOCKSIZE
 from typing import (
     Any,
     AnyStr,
     BinaryIO,
     Callable,
+    Dict,
     List,
     Optional,
     Sequence,
     Tuple,
     Union,
+    cast,
 )
 
+from ch_backup import logging
+from ch_backup.calculators import calc_aligned_files_size, calc_tarball_size
 from ch_backup.profile import profile
 from ch_backup.storage.async_pipeline.base_pipeline.exec_pool import (
     ProcessExecPool,
 )
+from ch_backup.storage.async_pipeline.base_pipeline.rate_limiter import (
+    SharedRateLimiter,
+    init_global_rate_limiters,
+    set_global_rate_limiters,
+)
 from ch_backup.storage.async_pipeline.pipelines import (
     delete_multiple_storage_pipeline,
     download_data_pipeline,
@@ -30,10 +41,99 @@ from ch_backup.storage.async_pipeline.pipelines import (
     upload_data_tarball_pipeline,
     upload_file_pipeline,
     upload_files_tarball_pipeline,
+    upload_files_tarball_range_pipeline,
     upload_files_tarball_scan_pipeline,
 )
 from ch_backup.storage.async_pipeline.suppress_exceptions import suppress_exceptions
-from ch_backup.util import current_func_name
+from ch_backup.storage.async_pipeline.tarball_ranges import split_tarball
+from ch_backup.storage.engine import get_storage_engine
+from ch_backup.util import current_func_name, set_idle_io_priority
+
+_WORKER_CONFIG: Any = None
+
+
+def _init_worker(
+    config: Any,
+    rate_limiters: Dict[str, SharedRateLimiter],
+    idle_io_priority: bool,
+) -> None:
+    """
+    Initialize worker process of the pool.
+    """
+    global _WORKER_CONFIG  # pylint: disable=global-statement
+
+    _WORKER_CONFIG = config
+    set_global_rate_limiters(rate_limiters)
+    if idle_io_priority:
+        set_idle_io_priority()
+
+
+def _get_worker_config() -> Any:
+    """
+    Return config of the current worker process.
+    """
+    return _WORKER_CONFIG
+
+
+def _countdown(count: int, callback: Optional[Callable]) -> Callable[[], None]:
+    """
+    Return function calling the callback on its count-th call. The function is thread-safe.
+    """
+    remaining = count
+    lock = threading.Lock()
+
+    def _call() -> None:
+        nonlocal remaining
+        with lock:
+            remaining -= 1
+            if remaining:
+                return
+        if callback:
+            callback()
+
+    return _call
+
+
+def _once(callback: Callable) -> Callable[[], None]:
+    """
+    Return function calling the callback on its first call only. The function is thread-safe.
+    """
+    called = False
+    lock = threading.Lock()
+
+    def _call() -> None:
+        nonlocal called
+        with lock:
+            if called:
+                return
+            called = True
+        callback()
+
+    return _call
+
+
+class _JobConfig:
+    """
+    Config passed to pipelines.
+
+    It delegates to the config of the executor, but is pickled as a reference to the config of the worker process
+    executing the job. So the config is transferred to each worker once on its start rather than with every job.
+    """
+
+    def __init__(self, config: Any) -> None:
+        self._config = config
+
+    def __getitem__(self, item: str) -> Any:
+        return self._config[item]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Return value by key or default.
+        """
+        return self._config.get(key, default)
+
+    def __reduce__(self) -> Tuple[Callable, Tuple]:
+        return _get_worker_config, ()
 
 
 class PipelineExecutor:
@@ -46,11 +146,29 @@ class PipelineExecutor:
 
     def __init__(self, config: dict) -> None:
         self._config = config
+        self._job_config = cast(dict, _JobConfig(config))
         self._exec_pool: Optional[ProcessExecPool] = None
 
-        worker_count = self._config["multiprocessing"].get("workers")
+        # Rate limiters are shared by all worker processes to limit the total bandwidth
+        rate_limiters = init_global_rate_limiters(self._config["rate_limiter"])
+
+        multiprocessing_config = self._config["multiprocessing"]
+        worker_count = multiprocessing_config.get("workers")
         if worker_count:
-            self._exec_pool = ProcessExecPool(worker_count)
+            self._exec_pool = ProcessExecPool(
+                worker_count,
+                initializer=_init_worker,
+                initargs=(
+                    config,
+                    rate_limiters,
+                    multiprocessing_config.get("idle_io_priority", False),
+                ),
+                max_in_flight_size=multiprocessing_config.get("max_in_flight_size", 0),
+                max_pending_size=multiprocessing_config.get("max_pending_size", 0),
+                small_job_size=multiprocessing_config.get("small_part_size", 0),
+                start_method=multiprocessing_config.get("start_method", "spawn"),
+                preload=["ch_backup.storage.async_pipeline.pipelines"],
+            )
 
     def upload_data(
         self, data: AnyStr, remote_path: str, is_async: bool, encryption: bool
@@ -61,7 +179,7 @@ class PipelineExecutor:
         job_id = self._make_job_id(current_func_name(), "<data>", remote_path)
 
         pipeline = partial(
-            upload_data_pipeline, self._config, data, remote_path, encryption
+            upload_data_pipeline, self._job_config, data, remote_path, encryption
         )
         self._exec_pipeline(job_id, pipeline, is_async)
 
@@ -82,7 +200,7 @@ class PipelineExecutor:
 
         pipeline = partial(
             upload_data_tarball_pipeline,
-            self._config,
+            self._job_config,
             file_names,
             data_list,
             remote_path,
@@ -108,7 +226,7 @@ class PipelineExecutor:
 
         pipeline = partial(
             upload_file_pipeline,
-            self._config,
+            self._job_config,
             Path(local_path),
             remote_path,
             encryption,
@@ -141,7 +259,7 @@ class PipelineExecutor:
 
         pipeline = partial(
             upload_files_tarball_scan_pipeline,
-            self._config,
+            self._job_config,
             Path(dir_path),
             remote_path,
             encryption,
@@ -163,15 +281,37 @@ class PipelineExecutor:
         compression: bool,
         files: List[str],
         callback: Optional[Callable] = None,
+        size: Optional[int] = None,
+        done_callback: Optional[Callable] = None,
     ) -> None:
         """
         Archive to tarball and upload files from local filesystem.
+
+        Asynchronous uploads of large uncompressed tarballs are split into ranges uploaded by several workers.
         """
+        range_size = self._config["multiprocessing"].get("upload_range_size", 0)
+        if (
+            is_async
+            and self._exec_pool
+            and not compression
+            and 0 < range_size < (size or 0)
+        ):
+            self._upload_files_tarball_ranges(
+                Path(dir_path),
+                remote_path,
+                encryption,
+                delete,
+                files,
+                callback,
+                done_callback,
+            )
+            return
+
         job_id = self._make_job_id(current_func_name(), remote_path)
 
         pipeline = partial(
             upload_files_tarball_pipeline,
-            self._config,
+            self._job_config,
             Path(dir_path),
             files,
             remote_path,
@@ -179,7 +319,96 @@ class PipelineExecutor:
             delete_after=delete,
             compression=compression,
         )
-        self._exec_pipeline(job_id, pipeline, is_async, callback)
+        self._exec_pipeline(job_id, pipeline, is_async, callback, size, done_callback)
+
+    # pylint: disable=too-many-positional-arguments,too-many-locals
+    def _upload_files_tarball_ranges(
+        self,
+        base_path: Path,
+        remote_path: str,
+        encryption: bool,
+        delete: bool,
+        files: List[str],
+        callback: Optional[Callable],
+        done_callback: Optional[Callable],
+    ) -> None:
+        """
+        Upload tarball of files by ranges processed in parallel as parts of one multipart upload.
+
+        Done callback is called as soon as all ranges are uploaded, while the multipart upload is completed
+        and the files are deleted on waiting for completion of jobs. The multipart upload is aborted if any
+        of the ranges fails, so its uploaded parts are not left in the storage.
+        """
+        file_paths = [base_path / file for file in files]
+        tarball_size = calc_tarball_size(
+            files, calc_aligned_files_size(file_paths, alignment=BLOCKSIZE)
+        )
+        chunk_size, ranges = split_tarball(
+            self._config,
+            tarball_size,
+            encryption,
+            self._config["multiprocessing"]["upload_range_size"],
+        )
+
+        storage = get_storage_engine(self._config["storage"])
+        upload_id = storage.create_multipart_upload(remote_path)
+        logging.debug(
+            "Uploading tarball {} of size {} in {} ranges",
+            remote_path,
+            tarball_size,
+            len(ranges),
+        )
+
+        def abort() -> None:
+            logging.debug("Aborting upload of tarball {}", remote_path)
+            try:
+                storage.abort_multipart_upload(remote_path, upload_id)
+            except Exception as e:
+                logging.warning(
+                    f"Failed to abort multipart upload {upload_id} of {remote_path}: {e!r}"
+                )
+
+        on_failed = _once(abort)
+
+        def on_uploaded() -> None:
+            try:
+                storage.complete_multipart_upload(remote_path, upload_id)
+            except Exception:
+                on_failed()
+                raise
+            if delete:
+                for file_path in file_paths:
+                    file_path.unlink()
+            if callback:
+                callback()
+
+        on_range_uploaded = _countdown(len(ranges), on_uploaded)
+        on_range_done = _countdown(len(ranges), done_callback)
+
+        for tarball_range in ranges:
+            job_id = self._make_job_id(
+                "upload_files_tarball_range", remote_path, tarball_range.start
+            )
+            pipeline = partial(
+                upload_files_tarball_range_pipeline,
+                self._job_config,
+                base_path,
+                [Path(file) for file in files],
+                remote_path,
+                encryption,
+                upload_id,
+                tarball_range,
+                chunk_size,
+            )
+            self._exec_pipeline(
+                job_id,
+                pipeline,
+                True,
+                on_range_uploaded,
+                tarball_range.end - tarball_range.start,
+                on_range_done,
+                on_failed,
+            )
 
     def download_data(
         self, remote_path: str, is_async: bool, encryption: bool
@@ -189,7 +418,7 @@ class PipelineExecutor:
         """
         job_id = self._make_job_id(current_func_name(), remote_path)
         pipeline = partial(
-            download_data_pipeline, self._config, remote_path, encryption
+            download_data_pipeline, self._job_config, remote_path, encryption
         )
 
         return self._exec_pipeline(job_id, pipeline, is_async)
@@ -207,7 +436,7 @@ class PipelineExecutor:
         job_id = self._make_job_id(current_func_name(), remote_path)
         pipeline = partial(
             download_data_tarball_pipeline,
-            self._config,
+            self._job_config,
             remote_path,
             encryption,
             compression,
@@ -230,7 +459,7 @@ class PipelineExecutor:
 
         pipeline = partial(
             download_file_pipeline,
-            self._config,
+            self._job_config,
             remote_path,
             Path(local_path) if isinstance(local_path, str) else local_path,
             encryption,
@@ -247,6 +476,8 @@ class PipelineExecutor:
         encryption: bool,
         compression: bool,
         callback: Optional[Callable],
+        size: Optional[int] = None,
+        owner: Optional[Tuple[str, str]] = None,
     ) -> None:
         """
         Download and unarchive tarball to files on local filesystem.
@@ -255,13 +486,14 @@ class PipelineExecutor:
 
         pipeline = partial(
             download_files_pipeline,
-            self._config,
+            self._job_config,
             remote_path,
             Path(local_path),
             encryption,
             compression,
+            owner,
         )
-        self._exec_pipeline(job_id, pipeline, is_async, callback=callback)
+        self._exec_pipeline(job_id, pipeline, is_async, callback, size)
 
     # pylint: disable=unused-argument
     def delete_files(
@@ -272,7 +504,9 @@ class PipelineExecutor:
         """
         job_id = self._make_job_id("delete_files", remote_paths)
 
-        pipeline = partial(delete_multiple_storage_pipeline, self._config, remote_paths)
+        pipeline = partial(
+            delete_multiple_storage_pipeline, self._job_config, remote_paths
+        )
         self._exec_pipeline(job_id, pipeline, is_async)
 
     def wait(self, keep_going: bool = False) -> None:
@@ -286,23 +520,41 @@ class PipelineExecutor:
                 self._exec_pool.shutdown(graceful=False)
                 raise
 
+    # pylint: disable=too-many-positional-arguments
     def _exec_pipeline(
         self,
         job_id: str,
         pipeline: Callable,
         is_async: bool,
         callback: Optional[Callable] = None,
+        size: Optional[int] = None,
+        done_callback: Optional[Callable] = None,
+        error_callback: Optional[Callable] = None,
     ) -> Any:
         """
-        Run pipeline inplace or schedule for exec in process pool
+        Run pipeline inplace or schedule for exec in process pool.
+
+        Pipelines with specified size of processed data are scheduled by the pool largest first.
         """
 
         if is_async and self._exec_pool:
             return self._exec_pool.submit(
-                job_id, profile(10, 60)(pipeline), callback=callback
+                job_id,
+                profile(10, 60)(pipeline),
+                callback=callback,
+                job_size=size,
+                done_callback=done_callback,
+                error_callback=error_callback,
             )
 
-        result = pipeline()
+        try:
+            result = pipeline()
+        except Exception:
+            if error_callback:
+                error_callback()
+            raise
+        if done_callback:
+            done_callback()
         if callback:
             callback()
         return result
@@ -26,10 +26,12 @@ from ch_backup.calculators import (
     calc_tarball_size_scan,
 )
 from ch_backup.encryption import get_encryption
+from ch_backup.storage.async_pipeline.base_pipeline.asyncio_runtime import AsyncPipeline
 from ch_backup.storage.async_pipeline.pipeline_builder import (
     PipelineBuilder,
     PypelnStage,
 )
+from ch_backup.storage.async_pipeline.tarball_ranges import TarballRange
 from ch_backup.util import exhaust_iterator
 
 
@@ -177,6 +179,36 @@ def upload_files_tarball_pipeline(
     run(builder.pipeline())
 
 
+# pylint: disable=too-many-positional-arguments
+def upload_files_tarball_range_pipeline(
+    config: dict,
+    base_path: Path,
+    file_relative_paths: List[Path],
+    remote_path: str,
+    encrypt: bool,
+    upload_id: str,
+    tarball_range: TarballRange,
+    chunk_size: int,
+) -> None:
+    """
+    Entrypoint of upload files tarball range pipeline.
+
+    The range is uploaded as parts of already initiated multipart upload, the upload is completed by the caller.
+    """
+    builder = PipelineBuilder(config)
+
+    builder.build_read_files_tarball_range_stage(
+        base_path, file_relative_paths, tarball_range.start, tarball_range.end
+    )
+    if encrypt:
+        builder.build_encrypt_stage()
+    builder.build_multipart_range_uploading_stage(
+        remote_path, upload_id, tarball_range.first_part_num, chunk_size
+    )
+
+    run(builder.pipeline())
+
+
 def download_data_pipeline(config: dict, remote_path: str, decrypt: bool) -> bytes:
     """
     Entrypoint of download data pipeline.
@@ -235,20 +267,34 @@ def download_file_pipeline(
     run(builder.pipeline())
 
 
+# pylint: disable=too-many-positional-arguments
 def download_files_pipeline(
-    config: dict, remote_path: str, local_path: Path, decrypt: bool, decompress: bool
+    config: dict,
+    remote_path: str,
+    local_path: Path,
+    decrypt: bool,
+    decompress: bool,
+    owner: Optional[Tuple[str, str]] = None,
 ) -> None:
     """
     Entrypoint of download files pipeline.
+
+    Interrupted download is resumed from the last checkpoint of its progress, unless data is compressed.
     """
     builder = PipelineBuilder(config)
 
-    builder.build_download_storage_stage(remote_path)
+    progress = None
+    if not decompress:
+        progress = builder.make_download_progress(remote_path, local_path, decrypt)
+
+    builder.build_download_storage_stage(
+        remote_path, progress.source_offset if progress else 0
+    )
     if decrypt:
         builder.build_decrypt_stage()
     if decompress:
         builder.build_decompress_stage()
-    builder.build_write_files_stage(local_path)
+    builder.build_write_files_stage(local_path, owner, progress)
 
     run(builder.pipeline())
 
@@ -268,6 +314,10 @@ def run(pipeline: PypelnStage) -> None:
     """
     Run pipeline until it is complete.
     """
+    if isinstance(pipeline, AsyncPipeline):
+        pipeline.complete()
+        return
+
     try:
         itr = iter(pipeline)
         exhaust_iterator(itr)
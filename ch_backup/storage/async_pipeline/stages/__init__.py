@@ -12,6 +12,7 @@ from .filesystem.delete_files_stage import DeleteFilesScanStage, DeleteFilesStag
 from .filesystem.read_file_stage import ReadFileStage
 from .filesystem.read_files_tarball_stage import (
     ReadDataTarballStage,
+    ReadFilesTarballRangeStage,
     ReadFilesTarballScanStage,
     ReadFilesTarballStage,
 )
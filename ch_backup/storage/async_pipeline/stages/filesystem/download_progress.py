@@ -0,0 +1,141 @@
+"""
+Progress of download of TAR stream to files.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+from ch_backup import logging
+
+# Name of the file keeping the progress in the directory files are downloaded to
+PROGRESS_FILE_NAME = ".download_progress.json"
+
+
+class DownloadProgress:
+    """
+    Progress of download of TAR stream to files, persisted to resume interrupted download.
+
+    The progress is saved to the target directory every checkpoint_size bytes of the stream, at offsets
+    that are multiples of chunk_size. Stored data is split into independently decodable chunks of
+    stored_chunk_size bytes (e.g. encrypted ones), each of them is decoded to chunk_size bytes of the stream,
+    so download is resumed from the stored chunk of the last saved offset. Files written before the offset
+    are synced to disk prior to saving of the progress.
+    """
+
+    def __init__(
+        self,
+        dir_path: Path,
+        source: str,
+        checkpoint_size: int,
+        chunk_size: int = 1,
+        stored_chunk_size: int = 1,
+    ) -> None:
+        self._path = dir_path / PROGRESS_FILE_NAME
+        self._dir = dir_path
+        self._source = source
+        self._checkpoint_size = checkpoint_size
+        self._chunk_size = chunk_size
+        self._stored_chunk_size = stored_chunk_size
+        self.offset = 0
+        # State of TAR stream processing at the offset
+        self.state: Dict[str, Any] = {}
+        # Sizes of files completely written before the offset
+        self.files: Dict[str, int] = {}
+
+    @property
+    def source_offset(self) -> int:
+        """
+        Offset of the stored data to resume download from.
+        """
+        return self.offset // self._chunk_size * self._stored_chunk_size
+
+    def load(self) -> None:
+        """
+        Load the saved progress if it's left by interrupted download of the same source and files written
+        before its offset are in place.
+        """
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                progress = json.load(f)
+            if progress["source"] != self._source or not self._check_files(
+                progress["files"], progress["state"]
+            ):
+                return
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Failed to load download progress {self._path}: {e!r}")
+            return
+
+        self.offset = progress["offset"]
+        self.state = progress["state"]
+        self.files = progress["files"]
+        logging.debug(
+            f"Resuming download of {self._source} from offset {self.source_offset}"
+        )
+
+    def is_checkpoint(self, offset: int) -> bool:
+        """
+        Return True if the progress must be saved at the offset.
+        """
+        return (
+            offset - self.offset >= self._checkpoint_size
+            and offset % self._chunk_size == 0
+        )
+
+    def save(self, offset: int, state: Dict[str, Any], files: Dict[str, int]) -> None:
+        """
+        Save the progress, files written before the offset must be synced by the caller.
+        """
+        tmp_path = self._path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "source": self._source,
+                    "offset": offset,
+                    "state": state,
+                    "files": files,
+                },
+                f,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_path, self._path)
+        fsync_dirs([self._dir])
+
+        self.offset = offset
+        self.state = state
+        self.files = files
+
+    def remove(self) -> None:
+        """
+        Remove the saved progress on completion of download.
+        """
+        self._path.unlink(missing_ok=True)
+
+    def _check_files(self, files: Dict[str, int], state: Dict[str, Any]) -> bool:
+        for name, size in files.items():
+            if (self._dir / name).stat().st_size != size:
+                return False
+
+        if state.get("name"):
+            path = self._dir / state["name"]
+            if path.stat().st_size < state["written"]:
+                return False
+            # Drop data written after the offset
+            os.truncate(path, state["written"])
+        return True
+
+
+def fsync_dirs(dirs: List[Path]) -> None:
+    """
+    Sync entries of the directories to disk.
+    """
+    for dir_path in dirs:
+        fd = os.open(dir_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
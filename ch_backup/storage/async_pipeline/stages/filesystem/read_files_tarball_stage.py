@@ -119,6 +119,77 @@ class ReadFilesTarballStage(ReadFilesTarballStageBase):
         self._file_source = file_relative_paths
 
 
+class ReadFilesTarballRangeStage(ReadFilesTarballStage):
+    """
+    Read and archive files to TAR stream, but produce only the specified byte range [start, end) of it.
+
+    Files outside the range are not read, so the tarball can be processed by several independent pipelines.
+    """
+
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        config: dict,
+        base_path: Path,
+        file_relative_paths: List[Path],
+        start: int,
+        end: int,
+    ) -> None:
+        super().__init__(config, base_path, file_relative_paths)
+        self._start = start
+        self._end = end
+
+    def __call__(self) -> Iterator[bytes]:
+        position = 0
+        for file_relative_path in self._file_source:
+            if position >= self._end:
+                return
+
+            file_path = self._base_path / file_relative_path
+            header = _make_tar_header_from_file(str(file_relative_path), file_path)
+            yield from self._cut(header, position)
+            position += len(header)
+
+            size = file_path.stat().st_size
+            if position < self._end and position + size > self._start:
+                yield from self._read_file_range(
+                    file_path,
+                    max(self._start - position, 0),
+                    min(self._end - position, size),
+                )
+            position += size
+
+            remainder = size % tarfile.BLOCKSIZE
+            if remainder > 0:
+                padding = tarfile.NUL * (tarfile.BLOCKSIZE - remainder)
+                yield from self._cut(padding, position)
+                position += len(padding)
+
+    def _cut(self, data: bytes, position: int) -> Iterator[bytes]:
+        """
+        Produce the part of data located at the specified position of TAR stream that falls into the range.
+        """
+        data = data[max(self._start - position, 0) : max(self._end - position, 0)]
+        if data:
+            yield data
+
+    def _read_file_range(
+        self, file_path: Path, start: int, end: int
+    ) -> Iterator[bytes]:
+        """
+        Produce file content from start to end offsets by chunks.
+        """
+        with file_path.open(mode="rb") as file:
+            file.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                data = file.read(min(self._chunk_size, remaining))
+                if not data:
+                    raise RuntimeError(f"File {file_path} was truncated while reading")
+                remaining -= len(data)
+                yield data
+
+
 class ReadDataTarballStage(ReadFilesTarballStageBase):
     """
     Read in-memory data and archive it to TAR stream.
@@ -2,15 +2,26 @@
 Writing files from TAR stream stage.
 """
 
+import grp
+import os
+import pwd
 from enum import Enum
 from pathlib import Path
 from tarfile import BLOCKSIZE, ENCODING, GNUTYPE_LONGNAME, NUL, TarInfo
-from typing import IO, Any, Iterator, Optional
+from typing import IO, Any, Dict, Iterator, List, Optional, Set, Tuple
 
+from ch_backup import logging
 from ch_backup.storage.async_pipeline.base_pipeline.bytes_fifo import BytesFIFO
 from ch_backup.storage.async_pipeline.base_pipeline.handler import Handler
+from ch_backup.storage.async_pipeline.stages.filesystem.download_progress import (
+    DownloadProgress,
+    fsync_dirs,
+)
 from ch_backup.storage.async_pipeline.stages.types import StageType
 
+# Size of buffers of written files, it's a multiple of filesystem block sizes.
+WRITE_BUFFER_SIZE = 1024 * 1024
+
 
 class State(Enum):
     """
@@ -151,23 +162,148 @@ class TarStreamProcessorBase(Handler):
 class WriteFilesStage(TarStreamProcessorBase):
     """
     Unarchive and save files to the local filesystem from TAR stream.
+
+    If owner (user and group) is specified, it's set to the directory, created subdirectories and files
+    on their creation, so they don't have to be walked through to change the owner afterwards.
+    Files are written through large buffers, optionally preallocated to their sizes from TAR headers,
+    and get modification times from TAR headers.
+
+    If download progress is specified, the stage continues writing from its offset and saves it
+    at checkpoints, so interrupted download can be resumed.
     """
 
-    def __init__(self, config: dict, dir_path: Path, buffer_size: int) -> None:
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        config: dict,
+        dir_path: Path,
+        buffer_size: int,
+        owner: Optional[Tuple[str, str]] = None,
+        progress: Optional[DownloadProgress] = None,
+    ) -> None:
         super().__init__(config, buffer_size)
         self._dir: Path = dir_path
         self._fobj: Optional[IO] = None
+        self._owner_ids: Optional[Tuple[int, int]] = None
+        if owner:
+            user, group = owner
+            self._owner_ids = (pwd.getpwnam(user).pw_uid, grp.getgrnam(group).gr_gid)
+        # Directories known to exist with the owner set
+        self._dirs: Set[Path] = set()
+        self._preallocate = config.get("preallocate_files", False)
+        self._mtime = 0
+
+        self._progress = progress
+        self._offset = 0
+        # Sizes of completely written files
+        self._files: Dict[str, int] = {}
+        # Files completely written since the last checkpoint
+        self._unsynced: List[str] = []
+        if progress and progress.offset:
+            self._resume(progress)
+
+    def __call__(self, data: bytes, index: int) -> None:
+        super().__call__(data, index)
+        self._offset += len(data)
+        if (
+            self._progress
+            and self._progress.is_checkpoint(self._offset)
+            and not self._tarstream
+            and self._name_from_buffer is None
+        ):
+            self._save_progress(self._progress)
+
+    def on_done(self) -> Any:
+        super().on_done()
+        if self._progress:
+            self._progress.remove()
+
+    def _resume(self, progress: DownloadProgress) -> None:
+        state = progress.state
+        self._offset = progress.offset
+        self._files = dict(progress.files)
+        self._state = State(state["state"])
+        self._bytes_to_process = state["bytes_to_process"]
+        if state["name"]:
+            self._tarinfo = TarInfo(state["name"])
+            self._tarinfo.size = state["size"]
+            self._mtime = state["mtime"]
+            filepath = self._dir / state["name"]
+            self._fobj = filepath.open("r+b", buffering=WRITE_BUFFER_SIZE)
+            self._fobj.seek(state["written"])
+
+    def _save_progress(self, progress: DownloadProgress) -> None:
+        state: Dict[str, Any] = {
+            "state": self._state.value,
+            "bytes_to_process": self._bytes_to_process,
+            "name": None,
+        }
+        dirs = {(self._dir / name).parent for name in self._unsynced}
+        for name in self._unsynced:
+            fd = os.open(self._dir / name, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        if self._fobj:
+            assert self._tarinfo
+            self._fobj.flush()
+            os.fsync(self._fobj.fileno())
+            dirs.add((self._dir / self._tarinfo.name).parent)
+            state.update(
+                name=self._tarinfo.name,
+                size=self._tarinfo.size,
+                mtime=self._mtime,
+                written=self._fobj.tell(),
+            )
+        fsync_dirs(list(dirs))
+
+        progress.save(self._offset, state, dict(self._files))
+        self._unsynced = []
 
     def _on_file_complete(self) -> None:
         if self._fobj:
+            self._fobj.flush()
+            if self._mtime > 0:
+                os.utime(self._fobj.fileno(), (self._mtime, self._mtime))
             self._fobj.close()
             self._fobj = None
+            if self._progress:
+                assert self._tarinfo
+                self._files[self._tarinfo.name] = self._tarinfo.size
+                self._unsynced.append(self._tarinfo.name)
 
     def _on_file_start(self) -> None:
         assert self._tarinfo
         filepath = self._dir / self._tarinfo.name
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        self._fobj = filepath.open("wb")
+        self._make_dirs(filepath.parent)
+        self._fobj = filepath.open("wb", buffering=WRITE_BUFFER_SIZE)
+        self._mtime = int(self._tarinfo.mtime)
+        if self._owner_ids:
+            os.fchown(self._fobj.fileno(), *self._owner_ids)
+        if self._preallocate and self._tarinfo.size > 0:
+            try:
+                os.posix_fallocate(self._fobj.fileno(), 0, self._tarinfo.size)
+            except OSError as e:
+                logging.debug("Preallocation of {} failed: {!r}", filepath, e)
+                self._preallocate = False
+
+    def _make_dirs(self, dir_path: Path) -> None:
+        if dir_path in self._dirs:
+            return
+
+        dir_path.mkdir(parents=True, exist_ok=True)
+        if self._owner_ids:
+            # Change owner of created directories up to the root directory of the stage
+            path = dir_path
+            while path not in self._dirs and (
+                path == self._dir or self._dir in path.parents
+            ):
+                os.chown(path, *self._owner_ids)
+                self._dirs.add(path)
+                path = path.parent
+        self._dirs.add(dir_path)
 
     def _write_data(self, data: bytes) -> None:
         assert self._fobj
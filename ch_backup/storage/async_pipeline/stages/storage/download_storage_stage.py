@@ -11,21 +11,28 @@ from ch_backup.storage.engine.base import PipeLineCompatibleStorageEngine
 
 class DownloadStorageStage(InputHandler):
     """
-    Download object from the storage as a set of parts.
+    Download object from the storage as a set of parts, starting from the specified offset.
     """
 
     stype = StageType.STORAGE
 
     def __init__(
-        self, config: dict, loader: PipeLineCompatibleStorageEngine, remote_path: str
+        self,
+        config: dict,
+        loader: PipeLineCompatibleStorageEngine,
+        remote_path: str,
+        range_start: int = 0,
     ) -> None:
         self._chunk_size = config["chunk_size"]
         self._loader = loader
         self._remote_path = remote_path
+        self._range_start = range_start
         self._download_id: Optional[str] = None
 
     def on_start(self) -> None:
-        self._download_id = self._loader.create_multipart_download(self._remote_path)
+        self._download_id = self._loader.create_multipart_download(
+            self._remote_path, self._range_start
+        )
 
     def __call__(self) -> Iterable[bytes]:
         while True:
@@ -5,6 +5,9 @@ Multipart uploading to storage stage.
 from dataclasses import dataclass
 from typing import Optional
 
+from ch_backup.storage.async_pipeline.base_pipeline.chunk_size_tuner import (
+    ChunkSizeTuner,
+)
 from ch_backup.storage.async_pipeline.base_pipeline.handler import Handler
 from ch_backup.storage.async_pipeline.stages.types import StageType
 from ch_backup.storage.engine.base import PipeLineCompatibleStorageEngine
@@ -28,22 +31,25 @@ class StartMultipartUploadStage(Handler):
     """
     Initiate multipart storage uploading and mark all passing blocks in pipeline with upload_id.
 
+    If upload_id is specified, the blocks are uploaded as parts of already initiated multipart upload.
     This stage must be started in a single worker.
     """
 
     stype = StageType.STORAGE
 
+    # pylint: disable=too-many-positional-arguments
     def __init__(
         self,
         config: dict,
         chunk_size: int,
         loader: PipeLineCompatibleStorageEngine,
         remote_path: str,
+        upload_id: Optional[str] = None,
     ) -> None:
         self._config = config
         self._loader = loader
         self._remote_path = remote_path
-        self._upload_id: Optional[str] = None
+        self._upload_id = upload_id
         self._chunk_size = chunk_size
 
     def __call__(self, data: bytes, index: int) -> UploadingPart:
@@ -65,23 +71,37 @@ class StorageUploadingStage(Handler):
     If upload_id is not set for the part than usual data uploading (not multipart)
     is performed.
     This stage can be started in parallel.
+
+    Duration of multipart uploading requests is reported to the chunk size tuner if it's specified.
+    Parts are numbered starting from first_part_num.
     """
 
     stype = StageType.STORAGE
 
+    # pylint: disable=too-many-positional-arguments
     def __init__(
-        self, config: dict, loader: PipeLineCompatibleStorageEngine, remote_path: str
+        self,
+        config: dict,
+        loader: PipeLineCompatibleStorageEngine,
+        remote_path: str,
+        tuner: Optional[ChunkSizeTuner] = None,
+        first_part_num: int = 1,
     ) -> None:
         self._config = config
         self._loader = loader
         self._remote_path = remote_path
+        self._tuner = tuner
+        self._first_part_num = first_part_num
 
     def __call__(self, part: UploadingPart, index: int) -> UploadingPart:
         if part.upload_id:
-            part_num = index + 1  # Loader expects counting from 1
+            part_num = index + self._first_part_num  # Loader expects counting from 1
+            start_time = self._tuner.now() if self._tuner else 0.0
             self._loader.upload_part(
                 part.data, self._remote_path, part.upload_id, part_num
             )
+            if self._tuner:
+                self._tuner.observe(len(part.data), self._tuner.now() - start_time)
         else:
             self._loader.upload_data(part.data, self._remote_path)
 
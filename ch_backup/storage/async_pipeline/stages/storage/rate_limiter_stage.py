@@ -18,11 +18,9 @@ class RateLimiterStage(Handler):
 
     stype = StageType.STORAGE
 
-    def __init__(
-        self, traffic_limit_per_sec: int, retry_interval: float = 0.01
-    ) -> None:
+    def __init__(self, rate_limiter: RateLimiter, retry_interval: float = 0.01) -> None:
         self._retry_interval = retry_interval
-        self._rate_limiter = RateLimiter(limit_per_sec=traffic_limit_per_sec)
+        self._rate_limiter = rate_limiter
 
     def __call__(self, value: bytes, index: int) -> Iterator[bytes]:
         while len(value) > 0:
@@ -0,0 +1,59 @@
+"""
+Splitting of tarball uploads into ranges processed by separate workers.
+"""
+
+from dataclasses import dataclass
+from math import ceil
+from typing import List, Tuple
+
+from ch_backup.encryption import get_encryption
+
+
+@dataclass
+class TarballRange:
+    """
+    Byte range [start, end) of tarball uploaded as a range of multipart upload parts starting from first_part_num.
+    """
+
+    start: int
+    end: int
+    first_part_num: int
+
+
+def split_tarball(
+    config: dict, tarball_size: int, encrypt: bool, range_size: int
+) -> Tuple[int, List[TarballRange]]:
+    """
+    Split tarball into ranges of about range_size bytes and return them along with upload chunk size.
+
+    Ranges are aligned on boundaries of encryption chunks and the data of each range except the last one
+    is uploaded as a whole number of chunks, so the ranges can be independently encrypted and uploaded as
+    consecutive parts of one multipart upload.
+    """
+    storage_config = config["storage"]
+
+    plain_unit_size, encrypted_unit_size = 1, 1
+    if encrypt:
+        encryption_config = config["encryption"]
+        crypto = get_encryption(encryption_config["type"], encryption_config)
+        plain_unit_size = encryption_config["chunk_size"]
+        encrypted_unit_size = plain_unit_size + crypto.metadata_size()
+
+    units_per_chunk = max(ceil(storage_config["chunk_size"] / encrypted_unit_size), 1)
+    chunk_count = ceil(tarball_size / (units_per_chunk * plain_unit_size))
+    if chunk_count > storage_config["max_chunk_count"]:
+        units_per_chunk *= ceil(chunk_count / storage_config["max_chunk_count"])
+
+    plain_chunk_size = units_per_chunk * plain_unit_size
+    chunks_per_range = max(range_size // plain_chunk_size, 1)
+    plain_range_size = chunks_per_range * plain_chunk_size
+
+    ranges = [
+        TarballRange(
+            start=start,
+            end=min(start + plain_range_size, tarball_size),
+            first_part_num=i * chunks_per_range + 1,
+        )
+        for i, start in enumerate(range(0, tarball_size, plain_range_size))
+    ]
+    return units_per_chunk * encrypted_unit_size, ranges
@@ -39,6 +39,13 @@ class StorageEngine(metaclass=ABCMeta):
         """
         pass
 
+    @abstractmethod
+    def copy_file(self, source_bucket: str, source_path: str, remote_path: str) -> str:
+        """
+        Copy file from another bucket of the same storage without transferring data locally.
+        """
+        pass
+
     def delete_file(self, remote_path: str) -> None:
         """
         Delete file from storage
@@ -95,9 +102,16 @@ class PipeLineCompatibleStorageEngine(StorageEngine):
         pass
 
     @abstractmethod
-    def create_multipart_download(self, remote_path):
+    def abort_multipart_upload(self, remote_path: str, upload_id: str) -> None:
+        """
+        Abort multipart upload.
+        """
+        pass
+
+    @abstractmethod
+    def create_multipart_download(self, remote_path, range_start=0):
         """
-        Start multipart download.
+        Start multipart download from the specified offset.
         """
         pass
 
@@ -17,9 +17,12 @@ from ch_backup.storage.engine.s3.s3_client_factory import (
     S3ClientCachedFactory,
     S3ClientFactory,
 )
-from ch_backup.storage.engine.s3.s3_multipart_uploader import S3MultipartUploader
+from ch_backup.storage.engine.s3.s3_multipart_uploader import (
+    S3MultipartUploader,
+    content_md5,
+)
 from ch_backup.storage.engine.s3.s3_retry import S3RetryMeta
-from ch_backup.type_hints.boto3.s3 import S3Client
+from ch_backup.type_hints.boto3.s3 import CopySourceTypeDef, S3Client
 
 
 class S3StorageEngine(PipeLineCompatibleStorageEngine, metaclass=S3RetryMeta):
@@ -28,13 +31,18 @@ class S3StorageEngine(PipeLineCompatibleStorageEngine, metaclass=S3RetryMeta):
     """
 
     DEFAULT_DOWNLOAD_PART_LEN = 128 * 1024 * 1024
+    # Objects larger than that can't be copied by single CopyObject request.
+    MAX_COPY_OBJECT_SIZE = 5 * 1024 * 1024 * 1024
+    COPY_PART_LEN = 512 * 1024 * 1024
 
     def __init__(self, config: dict) -> None:
         self._s3_client_factory = S3ClientCachedFactory(S3ClientFactory(config))
         self._s3_bucket_name = config["credentials"]["bucket"]
 
+        self._upload_checksum = config.get("upload_checksum", True)
+
         self._multipart_uploader = S3MultipartUploader(
-            self._s3_bucket_name, self._s3_client_factory
+            self._s3_bucket_name, self._s3_client_factory, self._upload_checksum
         )
         self._multipart_downloads: dict = {}
 
@@ -55,8 +63,11 @@ class S3StorageEngine(PipeLineCompatibleStorageEngine, metaclass=S3RetryMeta):
 
     def upload_data(self, data: bytes, remote_path: str) -> str:
         remote_path = remote_path.lstrip("/")
+        kwargs: dict = {}
+        if self._upload_checksum:
+            kwargs["ContentMD5"] = content_md5(data)
         self._s3_client.put_object(
-            Body=data, Bucket=self._s3_bucket_name, Key=remote_path
+            Body=data, Bucket=self._s3_bucket_name, Key=remote_path, **kwargs
         )
         return remote_path
 
@@ -72,6 +83,51 @@ class S3StorageEngine(PipeLineCompatibleStorageEngine, metaclass=S3RetryMeta):
             data = fileobj.read()
         return data
 
+    def copy_file(self, source_bucket: str, source_path: str, remote_path: str) -> str:
+        """
+        Copy object from the source bucket using server-side CopyObject or UploadPartCopy requests.
+        """
+        source_path = source_path.lstrip("/")
+        remote_path = remote_path.lstrip("/")
+        copy_source: CopySourceTypeDef = {"Bucket": source_bucket, "Key": source_path}
+
+        size = self._s3_client.head_object(Bucket=source_bucket, Key=source_path)[
+            "ContentLength"
+        ]
+        if size <= self.MAX_COPY_OBJECT_SIZE:
+            self._s3_client.copy_object(
+                CopySource=copy_source, Bucket=self._s3_bucket_name, Key=remote_path
+            )
+            return remote_path
+
+        upload_id = self._multipart_uploader.create_multipart_upload(remote_path)
+        try:
+            for part_num, range_start in enumerate(
+                range(0, size, self.COPY_PART_LEN), start=1
+            ):
+                range_end = min(range_start + self.COPY_PART_LEN, size) - 1
+                self._multipart_uploader.upload_part_copy(
+                    copy_source,
+                    f"bytes={range_start}-{range_end}",
+                    remote_path,
+                    upload_id,
+                    part_num,
+                )
+            self._multipart_uploader.complete_multipart_upload(remote_path, upload_id)
+        except Exception:
+            # The whole copy is retried, so the incomplete upload must not be left in the bucket
+            self._abort_multipart_upload(remote_path, upload_id)
+            raise
+        return remote_path
+
+    def _abort_multipart_upload(self, remote_path: str, upload_id: str) -> None:
+        try:
+            self._multipart_uploader.abort_multipart_upload(remote_path, upload_id)
+        except Exception as e:
+            logging.warning(
+                f"Failed to abort multipart upload {upload_id} of {remote_path}: {e!r}"
+            )
+
     def delete_file(self, remote_path: str) -> None:
         remote_path = remote_path.lstrip("/")
         try:
@@ -194,14 +250,17 @@ class S3StorageEngine(PipeLineCompatibleStorageEngine, metaclass=S3RetryMeta):
     def complete_multipart_upload(self, remote_path: str, upload_id: str) -> None:
         self._multipart_uploader.complete_multipart_upload(remote_path, upload_id)
 
-    def create_multipart_download(self, remote_path: str) -> str:
+    def abort_multipart_upload(self, remote_path: str, upload_id: str) -> None:
+        self._multipart_uploader.abort_multipart_upload(remote_path, upload_id)
+
+    def create_multipart_download(self, remote_path: str, range_start: int = 0) -> str:
         remote_path = remote_path.lstrip("/")
 
         resp = self._s3_client.head_object(Bucket=self._s3_bucket_name, Key=remote_path)
         download_id = f"{remote_path}_{time.time()}"
         self._multipart_downloads[download_id] = {
             "path": remote_path,
-            "range_start": 0,
+            "range_start": range_start,
             "total_size": resp["ContentLength"],
             "etag": resp["ETag"],
         }
@@ -2,13 +2,15 @@
 S3 multipart uploader.
 """
 
+import base64
+import hashlib
 import operator
 import threading
 import time
 from typing import Dict, Optional
 
 from ch_backup.storage.engine.s3.s3_client_factory import S3ClientCachedFactory
-from ch_backup.type_hints.boto3.s3 import S3Client
+from ch_backup.type_hints.boto3.s3 import CopySourceTypeDef, S3Client
 
 
 class S3MultipartUploader:
@@ -17,10 +19,14 @@ class S3MultipartUploader:
     """
 
     def __init__(
-        self, bucket_name: str, s3_client_factory: S3ClientCachedFactory
+        self,
+        bucket_name: str,
+        s3_client_factory: S3ClientCachedFactory,
+        upload_checksum: bool = False,
     ) -> None:
         self._bucket_name = bucket_name
         self._s3_client_factory = s3_client_factory
+        self._upload_checksum = upload_checksum
         self._lock = threading.Lock()
 
         self._uploads: Dict[str, dict] = {}
@@ -65,26 +71,64 @@ class S3MultipartUploader:
                 except IndexError:
                     part_num = 1
 
+        kwargs: dict = {}
+        if self._upload_checksum:
+            kwargs["ContentMD5"] = content_md5(data)
+
         resp = self._s3_client.upload_part(
             Body=data,
             Bucket=self._bucket_name,
             Key=remote_path,
             UploadId=upload_id,
             PartNumber=part_num,
+            **kwargs,
+        )
+
+        # save part metadata for complete upload, parts of uploads initiated in other processes are listed on completion
+        with self._lock:
+            if upload_id in self._uploads:
+                self._uploads[upload_id]["Parts"].append(
+                    {"ETag": resp["ETag"], "PartNumber": part_num}
+                )
+
+    # pylint: disable=too-many-positional-arguments
+    def upload_part_copy(
+        self,
+        copy_source: CopySourceTypeDef,
+        copy_source_range: str,
+        remote_path: str,
+        upload_id: str,
+        part_num: int,
+    ) -> None:
+        """
+        Copy the range of an existing object as a part of specified multipart upload.
+        """
+        resp = self._s3_client.upload_part_copy(
+            CopySource=copy_source,
+            CopySourceRange=copy_source_range,
+            Bucket=self._bucket_name,
+            Key=remote_path,
+            UploadId=upload_id,
+            PartNumber=part_num,
         )
 
-        # save part metadata for complete upload
         with self._lock:
             self._uploads[upload_id]["Parts"].append(
-                {"ETag": resp["ETag"], "PartNumber": part_num}
+                {"ETag": resp["CopyPartResult"]["ETag"], "PartNumber": part_num}
             )
 
     def complete_multipart_upload(self, remote_path: str, upload_id: str) -> None:
         """
         Complete multipart upload.
+
+        If no parts were uploaded by this uploader (e.g. they were uploaded by other processes),
+        the parts are listed from S3 storage.
         """
         with self._lock:
-            parts = self._uploads[upload_id]["Parts"]
+            parts: list = list(self._uploads.get(upload_id, {}).get("Parts", []))
+
+        if not parts:
+            parts = self._list_parts(remote_path, upload_id)
 
         self._s3_client.complete_multipart_upload(
             Bucket=self._bucket_name,
@@ -98,3 +142,34 @@ class S3MultipartUploader:
 
         with self._lock:
             self._uploads.pop(upload_id, None)
+
+    def abort_multipart_upload(self, remote_path: str, upload_id: str) -> None:
+        """
+        Abort multipart upload and discard its uploaded parts.
+        """
+        with self._lock:
+            self._uploads.pop(upload_id, None)
+
+        self._s3_client.abort_multipart_upload(
+            Bucket=self._bucket_name, Key=remote_path, UploadId=upload_id
+        )
+
+    def _list_parts(self, remote_path: str, upload_id: str) -> list:
+        """
+        List uploaded parts of multipart upload.
+        """
+        parts = []
+        paginator = self._s3_client.get_paginator("list_parts")
+        for page in paginator.paginate(
+            Bucket=self._bucket_name, Key=remote_path, UploadId=upload_id
+        ):
+            for part in page.get("Parts", []):
+                parts.append({"ETag": part["ETag"], "PartNumber": part["PartNumber"]})
+        return parts
+
+
+def content_md5(data: bytes) -> str:
+    """
+    Return value of Content-MD5 header for the data.
+    """
+    return base64.b64encode(hashlib.md5(data).digest()).decode()  # nosec
@@ -2,12 +2,13 @@
 S3 retry helper metaclass.
 """
 
+import threading
 from abc import ABCMeta
 from functools import wraps
 from http.client import HTTPException
 from inspect import isfunction
 from random import uniform
-from time import sleep
+from time import monotonic, sleep
 from typing import TYPE_CHECKING, Any, Callable, TypeVar, Union
 
 from botocore.exceptions import BotoCoreError, ClientError
@@ -22,6 +23,17 @@ if TYPE_CHECKING:
 
 RT = TypeVar("RT")
 
+# Error codes and HTTP statuses S3-compatible services use to signal request rate throttling.
+THROTTLING_ERROR_CODES = (
+    "SlowDown",
+    "Throttling",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "TooManyRequests",
+)
+THROTTLING_HTTP_STATUSES = (429, 503)
+
 
 class S3RetryingError(Exception):
     """
@@ -29,10 +41,105 @@ class S3RetryingError(Exception):
     """
 
 
+class ThrottlingBackoff:
+    """
+    Backoff state shared by all threads of the process to react on throttling of S3 requests.
+
+    Once any request is throttled, all requests of the process are paused for a jittered delay that grows
+    exponentially on consecutive throttling and decays on successful requests. It prevents threads
+    from hammering the endpoint with independent retries while it is overloaded.
+    """
+
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        initial_delay: float = 0.5,
+        max_delay: float = 30,
+        sleep_function: Callable = sleep,
+        get_time_func: Callable = monotonic,
+    ) -> None:
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+        self._sleep_function = sleep_function
+        self._get_time_func = get_time_func
+        self._lock = threading.Lock()
+
+        self._delay = 0.0
+        self._resume_time = 0.0
+
+    @property
+    def delay(self) -> float:
+        """
+        Current backoff delay, 0 if requests are not throttled.
+        """
+        return self._delay
+
+    def wait(self) -> None:
+        """
+        Block until the backoff period is over.
+        """
+        with self._lock:
+            time_to_sleep = self._resume_time - self._get_time_func()
+
+        if time_to_sleep > 0:
+            self._sleep_function(time_to_sleep)
+
+    def on_throttled(self) -> None:
+        """
+        Account throttled request.
+        """
+        with self._lock:
+            if self._delay:
+                self._delay = min(self._delay * 2, self._max_delay)
+            else:
+                self._delay = self._initial_delay
+            resume_time = self._get_time_func() + uniform(
+                self._delay / 2, self._delay
+            )  # nosec
+            self._resume_time = max(self._resume_time, resume_time)
+
+            logging.debug("S3 requests are throttled, backing off for {}", self._delay)
+
+    def on_success(self) -> None:
+        """
+        Account successful request.
+        """
+        if not self._delay:
+            return
+
+        with self._lock:
+            self._delay /= 2
+            if self._delay < self._initial_delay:
+                self._delay = 0.0
+
+
+_THROTTLING_BACKOFF = ThrottlingBackoff()
+
+
+def is_throttling_error(error: ClientError) -> bool:
+    """
+    Return True if the error means that S3 request was rejected due to throttling.
+    """
+    code = error.response.get("Error", {}).get("Code")
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in THROTTLING_ERROR_CODES or status in THROTTLING_HTTP_STATUSES
+
+
+def is_client_side_error(error: ClientError) -> bool:
+    """
+    Return True if the error is caused by the request (HTTP status 4xx), so it doesn't depend on the endpoint host.
+    """
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return status is not None and 400 <= status < 500
+
+
 class S3RetryMeta(ABCMeta):
     """
     Metaclass to wrap all methods of S3StorageEngine with retry mechanism in case of S3 endpoint errors.
-    S3 client instance is recreated in case of some errors.
+
+    S3 client instance is recreated in case of connection-level and server-side errors, so the endpoint
+    and the proxy are resolved again. Throttling and client-side (4xx) errors reuse the client and its
+    connection pool. Throttling errors pause requests of the whole process.
     """
 
     def __new__(mcs, name, bases, attrs):  # pylint: disable=arguments-differ
@@ -55,12 +162,24 @@ class S3RetryMeta(ABCMeta):
 
         @wraps(func)
         def wrapper(self: "S3StorageEngine", *args: Any, **kwargs: Any) -> RT:
+            _THROTTLING_BACKOFF.wait()
             try:
-                return func(self, *args, **kwargs)
-            except (ClientError, BotoCoreError, HTTPException, HTTPError) as e:
+                result = func(self, *args, **kwargs)
+            except ClientError as e:
+                if is_throttling_error(e):
+                    _THROTTLING_BACKOFF.on_throttled()
+                elif not is_client_side_error(e):
+                    # Server errors may be caused by the endpoint host, so the client is recreated
+                    # to resolve it (and the proxy) again
+                    self._s3_client_factory.reset()  # pylint: disable=protected-access
+                raise S3RetryingError(f"Failed to make S3 operation: {str(e)}") from e
+            except (BotoCoreError, HTTPException, HTTPError) as e:
                 self._s3_client_factory.reset()  # pylint: disable=protected-access
                 raise S3RetryingError(f"Failed to make S3 operation: {str(e)}") from e
 
+            _THROTTLING_BACKOFF.on_success()
+            return result
+
         return wrapper
 
 
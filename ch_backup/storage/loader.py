@@ -3,7 +3,7 @@ Module providing API for storage management (upload and download data, check
 remote path on existence, etc.).
 """
 
-from typing import BinaryIO, Callable, List, Optional, Sequence, Union
+from typing import BinaryIO, Callable, List, Optional, Sequence, Tuple, Union
 
 from ch_backup.storage.async_pipeline.pipeline_executor import PipelineExecutor
 from ch_backup.storage.engine import get_storage_engine
@@ -133,11 +133,15 @@ class StorageLoader:
         delete: bool = False,
         callback: Optional[Callable] = None,
         compression: bool = False,
+        size: Optional[int] = None,
+        done_callback: Optional[Callable] = None,
     ) -> str:
         """
         Upload multiple files as tarball.
 
-        If delete is True, the file will be deleted after upload.
+        If delete is True, the file will be deleted after upload. Asynchronous uploads with specified
+        size of files are scheduled largest first. Unlike callback executed on waiting for completion
+        of uploads, done callback is executed right after the upload in another thread.
         """
         self._ploader.upload_files_tarball(
             dir_path,
@@ -148,6 +152,8 @@ class StorageLoader:
             delete=delete,
             callback=callback,
             compression=compression,
+            size=size,
+            done_callback=done_callback,
         )
         return remote_path
 
@@ -213,9 +219,14 @@ class StorageLoader:
         encryption: bool = False,
         compression: bool = False,
         callback: Optional[Callable] = None,
+        size: Optional[int] = None,
+        owner: Optional[Tuple[str, str]] = None,
     ) -> None:
         """
         Download file to local filesystem.
+
+        Asynchronous downloads with specified size of data are scheduled largest first.
+        If owner (user and group) is specified, it's set to downloaded files on their creation.
         """
         self._ploader.download_files(
             remote_path,
@@ -224,6 +235,8 @@ class StorageLoader:
             encryption=encryption,
             compression=compression,
             callback=callback,
+            size=size,
+            owner=owner,
         )
 
     def delete_files(
@@ -239,6 +252,21 @@ class StorageLoader:
             remote_paths, is_async=is_async, encryption=encryption
         )
 
+    def copy_file(self, source_bucket: str, source_path: str, remote_path: str) -> str:
+        """
+        Copy file from another bucket on the storage side.
+
+        Data is neither downloaded nor re-encrypted.
+        """
+        return self._engine.copy_file(source_bucket, source_path, remote_path)
+
+    @property
+    def bucket(self) -> str:
+        """
+        Return name of the bucket the loader works with.
+        """
+        return self._config["storage"]["credentials"]["bucket"]
+
     def wait(self, keep_going: bool = False) -> None:
         """
         Wait for completion of async operations.
@@ -3,6 +3,7 @@ util module defines various auxiliary functions
 """
 
 import collections
+import errno
 import glob
 import grp
 import os
@@ -10,6 +11,7 @@ import pwd
 import re
 import shutil
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
 from dataclasses import fields as data_fields
 from datetime import datetime, timedelta, timezone
@@ -23,6 +25,8 @@ from typing import (
     Any,
     BinaryIO,
     Callable,
+    Deque,
+    Generator,
     Iterable,
     Iterator,
     List,
@@ -33,6 +37,7 @@ from typing import (
     Union,
 )
 
+import psutil
 import tenacity
 
 from ch_backup import logging
@@ -99,6 +104,45 @@ def list_dir_files(dir_path: str) -> List[str]:
     ]
 
 
+def scan_dir_file_sizes(dir_path: str) -> List[Tuple[str, int]]:
+    """
+    Returns paths of all files of directory (recursively), relative to its path, with their sizes
+
+    Sizes are taken from cached stat of directory entries, so each file is stat'ed once.
+    """
+
+    def scan_recursive(path: str, relative_prefix: str) -> Iterable[Tuple[str, int]]:
+        with os.scandir(path) as scan:
+            for dir_entry in scan:
+                if dir_entry.is_dir():
+                    yield from scan_recursive(
+                        dir_entry.path, relative_prefix + dir_entry.name + "/"
+                    )
+                elif dir_entry.is_file():
+                    yield relative_prefix + dir_entry.name, dir_entry.stat().st_size
+
+    return list(scan_recursive(dir_path, ""))
+
+
+def link_dir_files(source_dir: str, target_dir: str, files: Iterable[str]) -> None:
+    """
+    Hardlink files of source directory into target directory, creating subdirectories as needed
+
+    File paths are relative to the directories. Files are copied if the directories are on different
+    filesystems.
+    """
+    for file in files:
+        source_file = os.path.join(source_dir, file)
+        target_file = os.path.join(target_dir, file)
+        os.makedirs(os.path.dirname(target_file), exist_ok=True)
+        try:
+            os.link(source_file, target_file)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.copy2(source_file, target_file)
+
+
 def scan_dir_files(
     dir_path: Path, exclude_file_names: Optional[List[str]] = None
 ) -> Iterable[str]:
@@ -174,6 +218,17 @@ def demote_user(new_user: str) -> None:
     os.setuid(new_uid)
 
 
+def set_idle_io_priority() -> None:
+    """
+    Set idle IO scheduling class for the current process, so its disk IO is served only when
+    there is no other IO demand. Not supported platforms and IO schedulers are ignored.
+    """
+    try:
+        psutil.Process().ionice(psutil.IOPRIO_CLASS_IDLE)
+    except (AttributeError, OSError) as e:
+        logging.warning("Failed to set idle IO priority: {}", e)
+
+
 def escape(s: str, regex: bool = False) -> str:
     """
     Escaping special characters for SQL identifiers.
@@ -401,6 +456,36 @@ def chunked(iterable: Iterable, n: int) -> Iterator[list]:
         yield chunk
 
 
+def parallel_map(
+    func: Callable[[Any], T], iterable: Iterable[Any], threads: int
+) -> Generator[T, None, None]:
+    """
+    Lazily apply func to values of iterable by several threads and yield results in the order of values.
+
+    At most 2 * threads values are processed or wait for consuming at once. Closing of the generator
+    cancels processing of remaining values.
+
+    >>> list(parallel_map(lambda x: x * 2, range(5), 2))
+    [0, 2, 4, 6, 8]
+    """
+    if threads <= 1:
+        yield from map(func, iterable)
+        return
+
+    with ThreadPoolExecutor(threads) as executor:
+        futures: Deque[Future] = collections.deque()
+        try:
+            for value in iterable:
+                if len(futures) >= 2 * threads:
+                    yield futures.popleft().result()
+                futures.append(executor.submit(func, value))
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
 def read_by_chunks(file: BinaryIO, chunk_size: int) -> Iterator[bytes]:
     """
     Read and yield file-like object by chunks.
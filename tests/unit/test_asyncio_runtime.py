@@ -0,0 +1,151 @@
+"""
+Unit tests for asyncio runtime of pipelines.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, Iterable, List, Optional
+
+import pytest
+
+from ch_backup.config import DEFAULT_CONFIG
+from ch_backup.storage.async_pipeline.base_pipeline.asyncio_runtime import (
+    AsyncPipeline,
+    async_flat_map,
+    async_from_iterable,
+    async_map,
+    get_asyncio_runtime,
+)
+from ch_backup.storage.async_pipeline.base_pipeline.handler import (
+    Handler,
+    IterableHandler,
+)
+from ch_backup.storage.async_pipeline.pipeline_builder import PipelineBuilder
+from ch_backup.storage.async_pipeline.pipelines import run, run_and_collect_all
+from tests.unit.utils import parametrize
+
+
+class Indexing(Handler):
+    """
+    Pass values with their indexes and mark start and end of the stage.
+    """
+
+    def __call__(self, value: Any, index: int) -> Optional[Any]:
+        if value is None:
+            return None
+        return (index, value)
+
+    def on_start(self) -> Optional[Any]:
+        return "start"
+
+    def on_done(self) -> Optional[Any]:
+        return "done"
+
+
+class Repeating(IterableHandler):
+    """
+    Repeat each value by its count.
+    """
+
+    def __call__(self, value: Any, index: int) -> Optional[Iterable[Any]]:
+        return (value for _ in range(value))
+
+
+class Failing(Handler):
+    """
+    Fail on the specified value.
+    """
+
+    def __call__(self, value: Any, index: int) -> Optional[Any]:
+        if value == 3:
+            raise ValueError("failed")
+        return value
+
+
+def test_stages() -> None:
+    pipeline = AsyncPipeline(
+        [
+            async_from_iterable([1, 2, 0, 3]),
+            async_flat_map(Repeating(), maxsize=1),
+            async_map(Indexing(), maxsize=1),
+        ],
+        threads=2,
+    )
+
+    assert list(pipeline) == [
+        "start",
+        (0, 1),
+        (1, 2),
+        (2, 2),
+        (3, 3),
+        (4, 3),
+        (5, 3),
+        "done",
+    ]
+
+
+def test_stage_workers() -> None:
+    pipeline = AsyncPipeline(
+        [
+            async_from_iterable(range(100)),
+            async_map(Failing(), maxsize=1, workers=4),
+        ],
+        threads=4,
+    )
+
+    with pytest.raises(ValueError):
+        list(pipeline)
+
+
+def test_concurrent_pipelines() -> None:
+    def run_pipeline(values: List[int]) -> List[Any]:
+        return run_and_collect_all(
+            AsyncPipeline(
+                [async_from_iterable(values), async_flat_map(Repeating())],
+                threads=2,
+            )
+        )
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(run_pipeline, [[i] for i in range(1, 33)]))
+
+    assert results == [[i] * i for i in range(1, 33)]
+
+
+def test_results_are_not_collected_on_completion() -> None:
+    values: List[Any] = []
+
+    class Recording(Handler):
+        def __call__(self, value: Any, index: int) -> Optional[Any]:
+            values.append(value)
+            return value
+
+    pipeline = AsyncPipeline(
+        [async_from_iterable(range(10)), async_map(Recording())], threads=2
+    )
+
+    assert get_asyncio_runtime(2).run(pipeline) == []
+    assert values == list(range(10))
+
+
+@parametrize(
+    {"id": "threads", "args": {"runtime": "threads"}},
+    {"id": "asyncio", "args": {"runtime": "asyncio"}},
+)
+def test_pipeline_runtime(tmp_path: Path, runtime: str) -> None:
+    config: dict = deepcopy(DEFAULT_CONFIG)
+    config["pipeline"]["runtime"] = runtime
+    config["filesystem"]["chunk_size"] = 1000
+    data = os.urandom(10000)
+    (tmp_path / "source").write_bytes(data)
+
+    builder = PipelineBuilder(config)
+    builder.build_read_file_stage(tmp_path / "source")
+    builder.build_compress_stage()
+    builder.build_decompress_stage()
+    builder.build_write_file_stage(tmp_path / "target")
+    run(builder.pipeline())
+
+    assert (tmp_path / "target").read_bytes() == data
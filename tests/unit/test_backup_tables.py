@@ -5,10 +5,15 @@ from unittest.mock import MagicMock, Mock, patch
 import pytest
 
 from ch_backup.backup.metadata import BackupMetadata, PartMetadata
+from ch_backup.backup.restore_context import PartState
 from ch_backup.backup_context import BackupContext
-from ch_backup.clickhouse.models import Database, Table
+from ch_backup.clickhouse.models import Database, FrozenPart, Table
 from ch_backup.config import DEFAULT_CONFIG
-from ch_backup.logic.table import TableBackup
+from ch_backup.logic.table import (
+    TableBackup,
+    TableMetadataChangeTime,
+    _group_by_dependency_levels,
+)
 
 UUID = "fa8ff291-1922-4b7f-afa7-06633d5e16ae"
 
@@ -122,6 +127,7 @@ def test_backup_table_skipping_if_metadata_updated_during_backup(
         db_name
     ]
     clickhouse_ctl_mock.get_disks.return_value = {}
+    clickhouse_ctl_mock.get_table_data_size.return_value = 0
     context.ch_ctl = clickhouse_ctl_mock
 
     context.backup_layout = Mock()
@@ -142,8 +148,63 @@ def test_backup_table_skipping_if_metadata_updated_during_backup(
 
     assert len(context.backup_meta.get_tables(db1_name)) == backups_expected_db1
     assert len(context.backup_meta.get_tables(db2_name)) == backups_expected_db2
-    # One call after each table and one after each database is backed up
-    assert clickhouse_ctl_mock.remove_freezed_data.call_count == 4
+    # One call after each table and one after all databases are backed up
+    assert clickhouse_ctl_mock.remove_freezed_data.call_count == 3
+
+
+def test_backup_fails_on_failed_removal_of_frozen_table_data() -> None:
+    context = BackupContext(DEFAULT_CONFIG)  # type: ignore[arg-type]
+    db = Database("db1", "Atomic", "/var/lib/clickhouse/metadata/db1.sql", None, None)
+    context.backup_meta = BackupMetadata(
+        name="20181017T210300",
+        path="ch_backup/20181017T210300",
+        version="1.0.100",
+        ch_version="19.1.16",
+        time_format="%Y-%m-%dT%H:%M:%S%Z",
+        hostname="clickhouse01.test_net_711",
+    )
+    context.backup_meta.add_database(db)
+    table = Table(
+        "db1",
+        "table1",
+        "MergeTree",
+        [],
+        [],
+        "/var/lib/clickhouse/metadata/db1/table1.sql",
+        "",
+        UUID,
+    )
+    clickhouse_ctl_mock = Mock()
+    clickhouse_ctl_mock.get_tables.return_value = [table]
+    clickhouse_ctl_mock.get_disks.return_value = {}
+    clickhouse_ctl_mock.get_table_data_size.return_value = 0
+    clickhouse_ctl_mock.remove_freezed_data.side_effect = OSError("failed")
+    context.ch_ctl = clickhouse_ctl_mock
+    context.backup_layout = Mock()
+
+    with (
+        patch.object(
+            TableBackup,
+            "_get_change_time",
+            return_value=TableMetadataChangeTime(table.metadata_path, 0, 0),
+        ),
+        patch(
+            "ch_backup.logic.table.Path",
+            read_bytes=Mock(
+                return_value=b"ATTACH TABLE db1.table1 (date Date) ENGINE = MergeTree();"
+            ),
+        ),
+        pytest.raises(OSError, match="failed"),
+    ):
+        TableBackup().backup(
+            context,
+            [db],
+            {"db1": ["table1"]},
+            schema_only=False,
+            multiprocessing_config=DEFAULT_CONFIG["multiprocessing"],  # type: ignore
+        )
+
+    clickhouse_ctl_mock.remove_freezed_data.assert_any_call("20181017T210300", table)
 
 
 class TestValidateUploadedParts:
@@ -231,6 +292,180 @@ class TestValidateUploadedParts:
         assert check_mock.call_count == 3
 
 
+class TestDeduplicationByHash:
+    """
+    Tests for deduplication of parts by hashes from system.parts in TableBackup._backup_frozen_table_data.
+    """
+
+    # pylint: disable=protected-access
+
+    def test_deduplicated_parts_are_not_scanned(self):
+        deduplicated_part = PartMetadata(
+            database="db1",
+            table="table1",
+            name="all_1_1_0",
+            checksum="abc123",
+            size=1024,
+            files=["data.bin"],
+            tarball=True,
+            link="20181017T210300",
+            hash_of_all_files="hash1",
+        )
+        new_part = FrozenPart(
+            "db1", "table1", "all_2_2_0", "default", "/path", "def456", 1024, []
+        )
+
+        context = Mock(spec=BackupContext)
+        context.config = {
+            "deduplication_batch_size": 500,
+            "deduplicate_parts_by_hash": True,
+        }
+        context.backup_meta = MagicMock()
+        context.backup_layout = MagicMock()
+        context.ch_ctl = MagicMock()
+        context.ch_ctl.get_part_hashes.return_value = {
+            "all_1_1_0": "hash1",
+            "all_2_2_0": "hash2",
+        }
+        context.ch_ctl.get_frozen_part_names.return_value = ["all_1_1_0", "all_2_2_0"]
+        context.ch_ctl.scan_frozen_parts.return_value = [new_part]
+        disk = Mock(type="local")
+        table = MagicMock()
+        table.database = "db1"
+        table.name = "table1"
+        table.paths_with_disks = [("/data_path", disk)]
+        tracker = Mock()
+
+        with (
+            patch(
+                "ch_backup.logic.table.deduplicate_parts_by_hash",
+                return_value={"all_1_1_0": deduplicated_part},
+            ) as deduplicate_by_hash_mock,
+            patch("ch_backup.logic.table.deduplicate_parts", return_value={}),
+        ):
+            TableBackup()._backup_frozen_table_data(
+                context, table, "backup_name", Mock(), [], tracker
+            )
+
+        deduplicate_by_hash_mock.assert_called_once_with(
+            context, "db1", "table1", {"all_1_1_0": "hash1", "all_2_2_0": "hash2"}
+        )
+        context.backup_meta.add_part.assert_called_once_with(deduplicated_part)
+        context.ch_ctl.scan_frozen_parts.assert_called_once_with(
+            table, disk, "/data_path", "backup_name", {"all_1_1_0"}
+        )
+        uploaded_part = context.backup_layout.upload_data_part.call_args.args[1]
+        assert uploaded_part is new_part
+        assert uploaded_part.hash_of_all_files == "hash2"
+        tracker.scanned.assert_called_once()
+
+
+class TestFreezeNewPartitionsOnly:
+    """
+    Tests for freezing of partitions with new parts only in TableBackup._freeze_table.
+    """
+
+    # pylint: disable=protected-access
+
+    def test_cold_partitions_are_linked(self):
+        cold_part = PartMetadata(
+            database="db1",
+            table="table1",
+            name="2023_1_1_0",
+            checksum="abc123",
+            size=1024,
+            files=["data.bin"],
+            tarball=True,
+            link="20181017T210300",
+            hash_of_all_files="hash1",
+        )
+        hot_part = PartMetadata(
+            database="db1",
+            table="table1",
+            name="2024_2_2_0",
+            checksum="def456",
+            size=1024,
+            files=["data.bin"],
+            tarball=True,
+            link="20181017T210300",
+            hash_of_all_files="hash2",
+        )
+
+        context = Mock(spec=BackupContext)
+        context.config = {
+            "deduplication_batch_size": 500,
+            "deduplicate_parts_by_hash": True,
+            "freeze_new_partitions_only": True,
+        }
+        context.ch_ctl = MagicMock()
+        context.ch_ctl.get_active_part_hashes.return_value = {
+            "2023_1_1_0": ("2023", "hash1"),
+            "2024_2_2_0": ("2024", "hash2"),
+            "2024_3_3_0": ("2024", "hash3"),
+        }
+        table = Table(
+            "db1",
+            "table1",
+            "MergeTree",
+            [],
+            [],
+            "/var/lib/clickhouse/metadata/db1/table1.sql",
+            "",
+            UUID,
+        )
+        limiter = Mock(enabled=False)
+
+        with (
+            patch.object(
+                TableBackup,
+                "_load_create_statement_from_disk",
+                return_value="CREATE TABLE db1.table1 (date Date) ENGINE = MergeTree() PARTITION BY toYear(date)",
+            ),
+            patch(
+                "ch_backup.logic.table.deduplicate_parts_by_hash",
+                return_value={"2023_1_1_0": cold_part, "2024_2_2_0": hot_part},
+            ),
+        ):
+            result = TableBackup._freeze_table(
+                context,
+                Database("db1", "Atomic", None, None, None),
+                table,
+                "backup_name",
+                False,
+                False,
+                4,
+                0,
+                limiter,
+                0,
+            )
+
+        assert result == (table, [cold_part])
+        context.ch_ctl.freeze_table.assert_called_once_with(
+            "backup_name", table, False, 4, 0, ["2024"]
+        )
+
+
+def test_group_by_dependency_levels():
+    def table(name: str, create_statement: str) -> Table:
+        return Table("db1", name, "MergeTree", [], [], "", create_statement, UUID)
+
+    target = table("target", "CREATE TABLE db1.target (n Int32) ENGINE = MergeTree")
+    source = table("source", "CREATE TABLE db1.source (n Int32) ENGINE = MergeTree")
+    view = table(
+        "view",
+        "CREATE MATERIALIZED VIEW db1.view TO db1.target (n Int32) AS SELECT n FROM db1.source",
+    )
+    view_of_view = table(
+        "view_of_view", "CREATE VIEW db1.view_of_view (n Int32) AS SELECT n FROM view"
+    )
+    cycle_1 = table("cycle_1", "CREATE VIEW db1.cycle_1 AS SELECT n FROM cycle_2")
+    cycle_2 = table("cycle_2", "CREATE VIEW db1.cycle_2 AS SELECT n FROM cycle_1")
+
+    assert _group_by_dependency_levels(
+        [view_of_view, view, cycle_1, target, cycle_2, source]
+    ) == [[target, source], [view], [view_of_view], [cycle_1, cycle_2]]
+
+
 class TestRestorePreprocessing:
     @pytest.mark.parametrize(
         ("backup_uuid", "expected_detached_name"),
@@ -282,3 +517,152 @@ class TestRestorePreprocessing:
         attached_table = context.ch_ctl.attach_table.call_args.args[0]
         assert attached_table.name == expected_detached_name
         assert result == [backup_table]
+
+
+class TestAttachParts:
+    """
+    Tests for attaching of restored parts in TableBackup._attach_parts.
+    """
+
+    # pylint: disable=protected-access
+
+    @staticmethod
+    def _context(attach_whole_partitions: bool) -> Mock:
+        context = Mock(spec=BackupContext)
+        context.config_root = {
+            "restore": {"attach_whole_partitions": attach_whole_partitions},
+            "multiprocessing": {"attach_part_threads": 2},
+        }
+        context.ch_ctl = Mock()
+        context.restore_context = Mock()
+        return context
+
+    @staticmethod
+    def _part(name: str) -> PartMetadata:
+        return PartMetadata("db1", "table1", name, "", 0, [], True)
+
+    @staticmethod
+    def _states(context: Mock) -> dict:
+        return {
+            call.args[1].name: call.args[0]
+            for call in context.restore_context.change_part_state.call_args_list
+        }
+
+    def test_parts_are_attached_one_by_one(self):
+        context = self._context(attach_whole_partitions=False)
+
+        def attach_part(_table, part_name):
+            if part_name == "2_1_1_0":
+                raise RuntimeError("broken")
+
+        context.ch_ctl.attach_part.side_effect = attach_part
+        parts = [self._part(name) for name in ("1_1_1_0", "1_2_2_0", "2_1_1_0")]
+        table = Table("db1", "table1", "MergeTree", [], [], "", "", None)
+
+        TableBackup._attach_parts(context, table, parts)
+
+        assert sorted(
+            call.args[1] for call in context.ch_ctl.attach_part.call_args_list
+        ) == ["1_1_1_0", "1_2_2_0", "2_1_1_0"]
+        context.ch_ctl.attach_partition.assert_not_called()
+        assert self._states(context) == {
+            "1_1_1_0": PartState.RESTORED,
+            "1_2_2_0": PartState.RESTORED,
+            "2_1_1_0": PartState.INVALID,
+        }
+        context.restore_context.add_failed_part.assert_called_once()
+
+    def test_whole_partitions_are_attached(self):
+        context = self._context(attach_whole_partitions=True)
+        context.ch_ctl.get_detached_part_names.return_value = [
+            "1_1_1_0",
+            "1_2_2_0",
+            "2_1_1_0",
+            "2_2_2_0",
+        ]
+        parts = [self._part(name) for name in ("1_1_1_0", "1_2_2_0", "2_1_1_0")]
+        table = Table("db1", "table1", "MergeTree", [], [], "", "", None)
+
+        TableBackup._attach_parts(context, table, parts)
+
+        context.ch_ctl.attach_partition.assert_called_once_with(table, "1")
+        context.ch_ctl.attach_part.assert_called_once_with(table, "2_1_1_0")
+        assert set(self._states(context).values()) == {PartState.RESTORED}
+
+    def test_partition_with_unknown_detached_entries_is_attached_by_parts(self):
+        context = self._context(attach_whole_partitions=True)
+        context.ch_ctl.get_detached_part_names.return_value = [
+            "1_1_1_0",
+            "1_2_2_0",
+            "1_3_3_0_try1",
+            "2_1_1_0",
+            "2_2_2_0",
+        ]
+        parts = [self._part(name) for name in ("1_1_1_0", "1_2_2_0", "2_1_1_0")]
+        table = Table("db1", "table1", "MergeTree", [], [], "", "", None)
+
+        TableBackup._attach_parts(context, table, parts)
+
+        context.ch_ctl.attach_partition.assert_not_called()
+        assert sorted(
+            call.args[1] for call in context.ch_ctl.attach_part.call_args_list
+        ) == ["1_1_1_0", "1_2_2_0", "2_1_1_0"]
+        assert set(self._states(context).values()) == {PartState.RESTORED}
+
+    def test_failed_partition_is_attached_by_parts(self):
+        context = self._context(attach_whole_partitions=True)
+        context.ch_ctl.get_detached_part_names.return_value = ["1_1_1_0", "1_2_2_0"]
+        context.ch_ctl.attach_partition.side_effect = RuntimeError("broken")
+        parts = [self._part(name) for name in ("1_1_1_0", "1_2_2_0")]
+        table = Table("db1", "table1", "MergeTree", [], [], "", "", None)
+
+        TableBackup._attach_parts(context, table, parts)
+
+        assert context.ch_ctl.attach_part.call_count == 2
+        assert set(self._states(context).values()) == {PartState.RESTORED}
+
+
+class TestRestoreData:
+    """
+    Tests for TableBackup._restore_data.
+    """
+
+    # pylint: disable=protected-access
+
+    def test_cloud_storage_parts_are_chowned_with_owner_set(self):
+        context = Mock(spec=BackupContext)
+        context.config_root = {
+            "restore": {},
+            "multiprocessing": {"cloud_storage_restore_workers": 1},
+        }
+        context.ch_ctl = Mock()
+        context.ch_ctl.get_file_owner.return_value = ("clickhouse", "clickhouse")
+        context.restore_context = Mock()
+        context.restore_context.part_restored.return_value = False
+        context.restore_context.part_downloaded.return_value = False
+        context.backup_meta = Mock()
+        context.backup_meta.cloud_storage.disks = ["s3"]
+        context.backup_layout = Mock()
+        local_part = PartMetadata(
+            "db1", "table1", "1_1_1_0", "", 0, [], True, disk_name="default"
+        )
+        cloud_part = PartMetadata(
+            "db1", "table1", "2_1_1_0", "", 0, [], True, disk_name="s3"
+        )
+        table_meta = Mock()
+        table_meta.database = "db1"
+        table_meta.name = "table1"
+        table_meta.get_parts.return_value = [local_part, cloud_part]
+
+        with patch.object(TableBackup, "_attach_parts"):
+            TableBackup._restore_data(
+                context,
+                tables=[table_meta],
+                disks=Mock(),
+                skip_cloud_storage=False,
+                keep_going=False,
+            )
+
+        context.backup_layout.download_data_part.assert_called_once()
+        _, chown_parts, _ = context.ch_ctl.chown_detached_parts.call_args.args
+        assert chown_parts == [cloud_part]
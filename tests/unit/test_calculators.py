@@ -10,6 +10,7 @@ from ch_backup.calculators import (
     calc_aligned_data_size,
     calc_aligned_files_size,
     calc_aligned_files_size_scan,
+    calc_aligned_sizes,
     calc_encrypted_size,
     calc_tarball_size,
     calc_tarball_size_scan,
@@ -38,6 +39,24 @@ def test_calc_aligned_data_size(
     assert calc_aligned_data_size(data_list, alignment) == expected_size
 
 
+@pytest.mark.parametrize(
+    "sizes, alignment, expected_size",
+    [
+        ([1], 1, 1),
+        ([1, 1], 1, 2),
+        ([1], 512, 512),
+        ([512], 512, 512),
+        ([513], 512, 1024),
+        ([1, 512, 0], 512, 1024),
+        ([], 512, 0),
+    ],
+)
+def test_calc_aligned_sizes(
+    sizes: List[int], alignment: int, expected_size: int
+) -> None:
+    assert calc_aligned_sizes(sizes, alignment) == expected_size
+
+
 def test_calc_aligned_files_size_scan() -> None:
 
     with TemporaryDirectory() as tmpdir:
@@ -0,0 +1,126 @@
+"""
+Unit tests for CatalogSnapshot.
+"""
+
+from typing import List, Optional, Sequence
+from unittest.mock import Mock
+
+from ch_backup.clickhouse.catalog import CatalogSnapshot
+from ch_backup.clickhouse.models import Disk, Table
+
+
+class FakeClickhouse:
+    """
+    Catalog of tables with counting of queries.
+    """
+
+    def __init__(self, tables: List[Table]) -> None:
+        self.tables = tables
+        self.queries: List[tuple] = []
+
+    def query_tables(
+        self,
+        db_name: Optional[str],
+        tables: Optional[Sequence[str]],
+        short_query: bool,
+    ) -> Sequence[Table]:
+        self.queries.append((db_name, tuple(tables or ()), short_query))
+        return [
+            table
+            for table in self.tables
+            if (not db_name or table.database == db_name)
+            and (not tables or table.name in tables)
+        ]
+
+    def query_merge_tree_tables(self) -> Sequence[Table]:
+        self.queries.append(("MergeTree",))
+        return [table for table in self.tables if table.is_merge_tree()]
+
+
+def _table(database: str, name: str, engine: str = "MergeTree") -> Table:
+    return Table(database, name, engine, [], [], "", "", None)
+
+
+def _snapshot(clickhouse: FakeClickhouse) -> CatalogSnapshot:
+    return CatalogSnapshot(
+        clickhouse.query_tables,
+        clickhouse.query_merge_tree_tables,
+        Mock(return_value=[]),
+        Mock(side_effect=lambda name: Disk(name, f"/{name}", "local")),
+    )
+
+
+def test_lookups_are_served_from_snapshot() -> None:
+    clickhouse = FakeClickhouse([_table("db1", "t1"), _table("db2", "t2")])
+    snapshot = _snapshot(clickhouse)
+
+    assert [t.name for t in snapshot.get_tables("db1", ["t1"], True)] == ["t1"]
+    assert [t.name for t in snapshot.get_tables("db2", ["t2"])] == ["t2"]
+    assert not snapshot.get_tables("db1", ["t2"])
+    assert [t.name for t in snapshot.get_tables()] == ["t1", "t2"]
+
+    assert clickhouse.queries == [(None, (), True), ("MergeTree",)]
+
+
+def test_full_info_of_other_engines_is_queried_on_demand() -> None:
+    clickhouse = FakeClickhouse([_table("db1", "t1", "PostgreSQL")])
+    snapshot = _snapshot(clickhouse)
+
+    assert snapshot.get_tables("db1", ["t1"], True)
+    assert len(clickhouse.queries) == 2
+
+    assert snapshot.get_tables("db1", ["t1"])
+    assert snapshot.get_tables("db1", ["t1"])
+    assert clickhouse.queries[2:] == [("db1", ("t1",), False)]
+
+
+def test_changed_tables_are_refreshed() -> None:
+    clickhouse = FakeClickhouse([_table("db1", "t1")])
+    snapshot = _snapshot(clickhouse)
+    assert not snapshot.get_tables("db1", ["t2"])
+
+    clickhouse.tables.append(_table("db1", "t2"))
+    snapshot.invalidate_table("db1", "t2")
+
+    assert [t.name for t in snapshot.get_tables("db1", ["t1"])] == ["t1"]
+    assert len(clickhouse.queries) == 2
+
+    assert [t.name for t in snapshot.get_tables("db1")] == ["t1", "t2"]
+    assert clickhouse.queries[2:] == [("db1", ("t2",), True), ("db1", ("t2",), False)]
+
+    clickhouse.tables.pop(0)
+    snapshot.invalidate_table("db1", "t1")
+    assert [t.name for t in snapshot.get_tables(short_query=True)] == ["t2"]
+
+
+def test_invalidate_tables() -> None:
+    clickhouse = FakeClickhouse([_table("db1", "t1")])
+    snapshot = _snapshot(clickhouse)
+    snapshot.get_tables()
+
+    snapshot.invalidate_tables()
+    snapshot.get_tables()
+
+    assert clickhouse.queries == [(None, (), True), ("MergeTree",)] * 2
+
+
+def test_returned_tables_are_copies() -> None:
+    clickhouse = FakeClickhouse([_table("db1", "t1")])
+    snapshot = _snapshot(clickhouse)
+
+    snapshot.get_tables("db1", ["t1"])[0].name = "t2"
+
+    assert [t.name for t in snapshot.get_tables("db1")] == ["t1"]
+
+
+def test_disks_are_cached_until_invalidation() -> None:
+    snapshot = _snapshot(FakeClickhouse([]))
+    query_disk = snapshot._query_disk  # pylint: disable=protected-access
+
+    assert snapshot.get_disk("s3").path == "/s3"
+    assert snapshot.get_disk("s3").path == "/s3"
+    assert query_disk.call_count == 1  # type: ignore
+
+    snapshot.invalidate_disks()
+    snapshot.get_disk("s3")
+    assert query_disk.call_count == 2  # type: ignore
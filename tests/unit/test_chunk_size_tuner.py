@@ -0,0 +1,47 @@
+"""
+Unit test for ChunkSizeTuner.
+"""
+
+import pytest
+
+from ch_backup.storage.async_pipeline.base_pipeline.chunk_size_tuner import (
+    ChunkSizeTuner,
+)
+
+MiB = 1024 * 1024
+
+
+def test_default_chunk_size_without_measurements() -> None:
+    tuner = ChunkSizeTuner(5 * MiB, 256 * MiB, target_upload_time=2)
+
+    assert tuner.chunk_size(8 * MiB) == 8 * MiB
+
+
+@pytest.mark.parametrize(
+    "size, duration, expected_chunk_size",
+    [
+        # 40 MiB/s on target time 2 sec gives 80 MiB chunks
+        (8 * MiB, 0.2, 80 * MiB),
+        # Fast link is limited by max chunk size
+        (8 * MiB, 0.001, 256 * MiB),
+        # Slow link is limited by min chunk size
+        (8 * MiB, 10, 5 * MiB),
+        # Result is aligned to MiB
+        (int(8.3 * MiB), 2, 8 * MiB),
+    ],
+)
+def test_chunk_size_by_throughput(
+    size: int, duration: float, expected_chunk_size: int
+) -> None:
+    tuner = ChunkSizeTuner(5 * MiB, 256 * MiB, target_upload_time=2)
+    tuner.observe(size, duration)
+
+    assert tuner.chunk_size(8 * MiB) == expected_chunk_size
+
+
+def test_measurements_are_smoothed() -> None:
+    tuner = ChunkSizeTuner(1 * MiB, 256 * MiB, target_upload_time=1, smoothing=0.5)
+    tuner.observe(10 * MiB, 1)
+    tuner.observe(30 * MiB, 1)
+
+    assert tuner.chunk_size(8 * MiB) == 20 * MiB
@@ -1,6 +1,19 @@
+import os
+from hashlib import md5
+from pathlib import Path
+
 import pytest
 
-from ch_backup.clickhouse.control import _format_string_array, _parse_version
+from ch_backup.backup.metadata import PartMetadata
+from ch_backup.clickhouse.control import (
+    ClickhouseCTL,
+    _format_string_array,
+    _parse_version,
+)
+from ch_backup.clickhouse.models import Disk, Table
+from ch_backup.storage.async_pipeline.stages.filesystem.download_progress import (
+    PROGRESS_FILE_NAME,
+)
 from tests.unit.utils import parametrize
 
 
@@ -49,3 +62,91 @@ def test_format_string_array(value, result):
 )
 def test_parse_version(version: str, expected: list[int]) -> None:
     assert _parse_version(version) == expected
+
+
+class TestLinkLocalPart:
+    """
+    Tests for ClickhouseCTL.link_local_part.
+    """
+
+    @staticmethod
+    def _setup(tmp_path: Path, checksums: bytes) -> tuple:
+        disk = Disk("default", f"{tmp_path}/", "local")
+        data_path = f"{tmp_path}/store/abc/uuid/"
+        table = Table("db1", "table1", "MergeTree", [disk], [data_path], "", "", None)
+        frozen_part_path = tmp_path / "shadow" / "backup1" / "store/abc/uuid/all_1_1_0"
+        (frozen_part_path / "proj.proj").mkdir(parents=True)
+        (frozen_part_path / "checksums.txt").write_bytes(checksums)
+        (frozen_part_path / "proj.proj" / "data.bin").write_bytes(b"data")
+        (tmp_path / "shadow" / "increment.txt").write_text("1")
+        return table, frozen_part_path
+
+    @staticmethod
+    def _part(checksum: str, files: list) -> PartMetadata:
+        return PartMetadata(
+            "db1", "table1", "all_1_1_0", checksum, 0, files, True, disk_name="default"
+        )
+
+    def test_part_is_linked(self, tmp_path: Path) -> None:
+        table, frozen_part_path = self._setup(tmp_path, b"checksums")
+        part = self._part(
+            md5(b"checksums").hexdigest(), ["checksums.txt", "proj.proj/data.bin"]
+        )
+        target_path = tmp_path / "store/abc/uuid/detached/all_1_1_0"
+
+        ch_ctl = ClickhouseCTL.__new__(ClickhouseCTL)
+        assert ch_ctl.link_local_part(table, part, str(target_path))
+
+        target_file = target_path / "proj.proj" / "data.bin"
+        assert target_file.read_bytes() == b"data"
+        assert os.path.samefile(target_file, frozen_part_path / "proj.proj/data.bin")
+
+    @pytest.mark.parametrize(
+        "checksum,files",
+        [
+            ("other", []),
+            (md5(b"checksums").hexdigest(), ["checksums.txt", "data.bin"]),
+        ],
+    )
+    def test_mismatched_part_is_not_linked(
+        self, tmp_path: Path, checksum: str, files: list
+    ) -> None:
+        table, _ = self._setup(tmp_path, b"checksums")
+        target_path = tmp_path / "store/abc/uuid/detached/all_1_1_0"
+
+        ch_ctl = ClickhouseCTL.__new__(ClickhouseCTL)
+        assert not ch_ctl.link_local_part(
+            table, self._part(checksum, files), str(target_path)
+        )
+        assert not target_path.exists()
+
+    def test_files_left_by_interrupted_restore_are_replaced(
+        self, tmp_path: Path
+    ) -> None:
+        table, _ = self._setup(tmp_path, b"checksums")
+        part = self._part(
+            md5(b"checksums").hexdigest(), ["checksums.txt", "proj.proj/data.bin"]
+        )
+        target_path = tmp_path / "store/abc/uuid/detached/all_1_1_0"
+        (target_path / "proj.proj").mkdir(parents=True)
+        (target_path / "proj.proj" / "data.bin").write_bytes(b"partial")
+
+        ch_ctl = ClickhouseCTL.__new__(ClickhouseCTL)
+        assert ch_ctl.link_local_part(table, part, str(target_path))
+
+        assert (target_path / "proj.proj" / "data.bin").read_bytes() == b"data"
+
+    def test_part_with_resumed_download_is_not_linked(self, tmp_path: Path) -> None:
+        table, _ = self._setup(tmp_path, b"checksums")
+        part = self._part(
+            md5(b"checksums").hexdigest(), ["checksums.txt", "proj.proj/data.bin"]
+        )
+        target_path = tmp_path / "store/abc/uuid/detached/all_1_1_0"
+        target_path.mkdir(parents=True)
+        (target_path / PROGRESS_FILE_NAME).write_text("{}")
+
+        ch_ctl = ClickhouseCTL.__new__(ClickhouseCTL)
+        assert not ch_ctl.link_local_part(table, part, str(target_path))
+
+        assert not (target_path / "checksums.txt").exists()
+        assert (target_path / PROGRESS_FILE_NAME).exists()
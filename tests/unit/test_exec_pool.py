@@ -0,0 +1,154 @@
+"""
+Unit tests for ExecPool.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, List
+
+import pytest
+
+from ch_backup.storage.async_pipeline.base_pipeline.exec_pool import (
+    ExecPool,
+    ThreadExecPool,
+)
+from tests.unit.utils import parametrize
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    """
+    Executor recording arguments of submitted jobs.
+    """
+
+    def __init__(self, workers: int) -> None:
+        super().__init__(workers)
+        self.submitted: List[Any] = []
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        if args:
+            self.submitted.append(args[0])
+        return super().submit(fn, *args, **kwargs)
+
+
+@parametrize(
+    {
+        "id": "largest first",
+        "args": {
+            "workers": 1,
+            "max_in_flight_size": 0,
+            "sizes": [1, 5, 3, 4],
+            "result": [1, 5, 4, 3],
+        },
+    },
+    {
+        "id": "small job fills in-flight budget",
+        "args": {
+            "workers": 2,
+            "max_in_flight_size": 10,
+            "sizes": [8, 9, 2, 1],
+            "result": [8, 2, 1, 9],
+        },
+    },
+    {
+        "id": "job larger than in-flight budget",
+        "args": {
+            "workers": 2,
+            "max_in_flight_size": 10,
+            "sizes": [20, 30, 1],
+            "result": [20, 30, 1],
+        },
+    },
+)
+def test_sized_jobs_order(
+    workers: int, max_in_flight_size: int, sizes: List[int], result: List[int]
+) -> None:
+    release = threading.Event()
+
+    def job(size: int) -> int:
+        release.wait()
+        return size
+
+    executor = RecordingExecutor(workers)
+    with ExecPool(executor, workers, max_in_flight_size) as pool:
+        for i, size in enumerate(sizes):
+            pool.submit(f"job {i}", job, size, job_size=size)
+        release.set()
+        assert sorted(pool.as_completed()) == sorted(sizes)
+
+    assert executor.submitted == result
+
+
+def test_duplicate_job() -> None:
+    with ThreadExecPool(1) as pool:
+        pool.submit("job", threading.Event().wait, 0.1, job_size=1)
+        with pytest.raises(RuntimeError):
+            pool.submit("job", threading.Event().wait, 0.1)
+        pool.wait_all()
+
+
+def test_small_jobs_priority() -> None:
+    release = threading.Event()
+
+    def job(size: int) -> int:
+        release.wait()
+        return size
+
+    executor = RecordingExecutor(1)
+    with ExecPool(executor, 1, small_job_size=4) as pool:
+        for i, size in enumerate([1, 8, 2, 5, 3]):
+            pool.submit(f"job {i}", job, size, job_size=size)
+        pool.submit("metadata", job, 0)
+        release.set()
+        pool.wait_all()
+
+    assert executor.submitted == [1, 0, 3, 2, 8, 5]
+
+
+def test_submit_blocks_on_full_queue() -> None:
+    release = threading.Event()
+    submitted = threading.Event()
+
+    def producer(pool: ExecPool) -> None:
+        pool.submit("job 3", release.wait, job_size=10)
+        submitted.set()
+
+    with ExecPool(ThreadPoolExecutor(1), 1, max_pending_size=15) as pool:
+        pool.submit("job 1", release.wait, job_size=10)
+        pool.submit("job 2", release.wait, job_size=10)
+        thread = threading.Thread(target=producer, args=(pool,))
+        thread.start()
+        assert not submitted.wait(0.1)
+
+        release.set()
+        thread.join()
+        pool.wait_all()
+
+
+@parametrize(
+    {"id": "stop on failure", "args": {"keep_going": False}},
+    {"id": "keep going", "args": {"keep_going": True}},
+)
+def test_error_callback(keep_going: bool) -> None:
+    failed: List[str] = []
+
+    def job(fail: bool) -> None:
+        if fail:
+            raise RuntimeError("failed")
+
+    with ThreadExecPool(1) as pool:
+        for job_id, fail in [("job 1", False), ("job 2", True)]:
+            pool.submit(
+                job_id,
+                job,
+                fail,
+                job_size=1,
+                error_callback=partial(failed.append, job_id),
+            )
+        if keep_going:
+            pool.wait_all(keep_going=True)
+        else:
+            with pytest.raises(RuntimeError):
+                pool.wait_all()
+
+    assert failed == ["job 2"]
@@ -0,0 +1,85 @@
+"""
+Unit tests for FrozenDataLimiter and FrozenTableTracker.
+"""
+
+import threading
+from unittest.mock import Mock
+
+from ch_backup.logic.frozen_data_limiter import FrozenDataLimiter, FrozenTableTracker
+
+
+def _acquire_in_thread(
+    limiter: FrozenDataLimiter, db_index: int, key: str, size: int
+) -> threading.Thread:
+    thread = threading.Thread(target=limiter.acquire, args=(db_index, key, size))
+    thread.start()
+    return thread
+
+
+def _is_blocked(thread: threading.Thread) -> bool:
+    thread.join(0.1)
+    return thread.is_alive()
+
+
+def test_freezing_waits_for_upload() -> None:
+    limiter = FrozenDataLimiter(10)
+    limiter.acquire(0, "table1", 8)
+
+    thread = _acquire_in_thread(limiter, 0, "table2", 8)
+    assert _is_blocked(thread)
+
+    limiter.commit(0, "table1", 6)
+    assert _is_blocked(thread)
+
+    limiter.free(0, 6)
+    thread.join(1)
+    assert not thread.is_alive()
+
+
+def test_freezing_ahead_does_not_block_current_database() -> None:
+    limiter = FrozenDataLimiter(10)
+    limiter.acquire(1, "db2.table1", 10)
+    limiter.acquire(0, "db1.table1", 10)
+
+    thread = _acquire_in_thread(limiter, 1, "db2.table2", 5)
+    assert _is_blocked(thread)
+
+    limiter.release(0)
+    assert _is_blocked(thread)
+
+    limiter.release(1)
+    thread.join(1)
+    assert not thread.is_alive()
+
+
+def test_close_unblocks_freezing() -> None:
+    limiter = FrozenDataLimiter(10)
+    limiter.acquire(0, "table1", 10)
+
+    thread = _acquire_in_thread(limiter, 2, "table2", 5)
+    assert _is_blocked(thread)
+
+    limiter.close()
+    thread.join(1)
+    assert not thread.is_alive()
+
+
+def test_table_tracker() -> None:
+    limiter = FrozenDataLimiter(10)
+    limiter.acquire(0, "table1", 100)
+    on_uploaded = Mock()
+    tracker = FrozenTableTracker(limiter, 0, "table1", on_uploaded)
+
+    tracker.add_part(4)
+    tracker.add_part(3)
+    tracker.part_uploaded(4)
+    tracker.scanned()
+    on_uploaded.assert_not_called()
+
+    thread = _acquire_in_thread(limiter, 0, "table2", 10)
+    assert _is_blocked(thread)
+
+    tracker.part_uploaded(3)
+    on_uploaded.assert_called_once()
+    thread.join(1)
+    assert not thread.is_alive()
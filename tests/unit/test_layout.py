@@ -1,11 +1,14 @@
 """Unit tests for backup layout cloud metadata path selection."""
 
 from collections import Counter
+from typing import Tuple
 from unittest.mock import MagicMock, patch
 
 from ch_backup.backup.layout import BackupLayout
+from ch_backup.backup.metadata import BackupState
 from ch_backup.backup.metadata.table_metadata import TableMetadata
 from ch_backup.config import DEFAULT_CONFIG
+from tests.unit.utils import backup_metadata
 
 
 class TestCloudStorageMetadataRemotePaths:
@@ -52,3 +55,86 @@ class TestCloudStorageMetadataRemotePaths:
         )
 
         assert Counter(remote_paths) == Counter(expected_paths)
+
+
+class TestCopyBackup:
+    """Tests for server-side copy of backups between buckets."""
+
+    # pylint: disable=protected-access
+
+    @staticmethod
+    def _make_layout(bucket: str) -> Tuple[BackupLayout, MagicMock]:
+        with (
+            patch("ch_backup.backup.layout.StorageLoader"),
+            patch("ch_backup.backup.layout.get_encryption") as get_encryption,
+        ):
+            get_encryption.return_value.metadata_size.return_value = 0
+            layout = BackupLayout(DEFAULT_CONFIG)  # type: ignore[arg-type]
+        storage_loader = MagicMock()
+        storage_loader.bucket = bucket
+        layout._storage_loader = storage_loader
+        layout._config = {"path_root": "ch_backup"}
+        return layout, storage_loader
+
+    def test_copies_own_and_linked_parts(self):
+        source, source_loader = self._make_layout("source")
+        target, target_loader = self._make_layout("target")
+
+        part = {
+            "bytes": 1024,
+            "files": ["file1", "file2"],
+            "checksum": "checksum1",
+            "tarball": True,
+            "disk_name": "default",
+        }
+        backup = backup_metadata(
+            "backup2",
+            BackupState.CREATED,
+            databases={
+                "db1": {
+                    "engine": "Atomic",
+                    "tables": {
+                        "table1": {
+                            "engine": "MergeTree",
+                            "parts": {
+                                "all_1_1_0": {**part, "link": None},
+                                "all_2_2_0": {**part, "link": "ch_backup/backup1"},
+                            },
+                        },
+                    },
+                },
+            },
+        )
+
+        source_loader.list_dir.return_value = [
+            "ch_backup/backup2/backup_struct.json",
+            "ch_backup/backup2/backup_light_struct.json",
+            "ch_backup/backup2/metadata/db1.tar",
+            "ch_backup/backup2/data/db1/table1/all_1_1_0/all_1_1_0.tar",
+        ]
+        source_loader.path_exists.return_value = True
+
+        target_meta = source.copy_backup(backup, target, threads=2)
+
+        copied = {call.args[1:] for call in target_loader.copy_file.call_args_list}
+        assert copied == {
+            (
+                "ch_backup/backup2/metadata/db1.tar",
+                "ch_backup/backup2/metadata/db1.tar",
+            ),
+            (
+                "ch_backup/backup2/data/db1/table1/all_1_1_0/all_1_1_0.tar",
+                "ch_backup/backup2/data/db1/table1/all_1_1_0/all_1_1_0.tar",
+            ),
+            (
+                "ch_backup/backup1/data/db1/table1/all_2_2_0/all_2_2_0.tar",
+                "ch_backup/backup2/data/db1/table1/all_2_2_0/all_2_2_0.tar",
+            ),
+        }
+        assert all(
+            call.args[0] == "source" for call in target_loader.copy_file.call_args_list
+        )
+        assert target_meta.state == BackupState.CREATED
+        assert not any(part.link for part in target_meta.get_parts())
+        assert target_meta.real_size == target_meta.size == 2048
+        assert any(part.link for part in backup.get_parts())
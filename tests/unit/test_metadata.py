@@ -15,7 +15,11 @@ from ch_backup.backup.metadata import (
     PartMetadata,
     normalize_backup_link,
 )
-from ch_backup.backup.metadata.table_metadata import PartInfo, split_part_name
+from ch_backup.backup.metadata.table_metadata import (
+    PartInfo,
+    TableMetadata,
+    split_part_name,
+)
 
 
 class TestBackupMetadata:
@@ -373,6 +377,41 @@ class TestPartMetadata:
         assert part.link == "20240101T000000"
         assert part.link_part_name == "all_1_1_0"
 
+    def test_hash_of_all_files(self):
+        """
+        hash_of_all_files is stored in table metadata only if it's known.
+        """
+        table = TableMetadata("db1", "table1", "MergeTree", None)
+        for name, hash_of_all_files in (("part1", "hash1"), ("part2", None)):
+            table.add_part(
+                PartMetadata(
+                    database="db1",
+                    table="table1",
+                    name=name,
+                    checksum="abc123",
+                    size=1024,
+                    files=["data.bin"],
+                    tarball=True,
+                    hash_of_all_files=hash_of_all_files,
+                )
+            )
+
+        raw_parts = table.raw_metadata["parts"]
+        assert raw_parts["part1"]["hash_of_all_files"] == "hash1"
+        assert "hash_of_all_files" not in raw_parts["part2"]
+        assert (
+            PartMetadata.load(
+                "db1", "table1", "part1", raw_parts["part1"]
+            ).hash_of_all_files
+            == "hash1"
+        )
+        assert (
+            PartMetadata.load(
+                "db1", "table1", "part2", raw_parts["part2"]
+            ).hash_of_all_files
+            is None
+        )
+
 
 class TestNormalizeBackupLink:
     """
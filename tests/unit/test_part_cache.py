@@ -0,0 +1,119 @@
+"""
+Unit tests for PartCache.
+"""
+
+import os
+from hashlib import md5
+from pathlib import Path
+
+from ch_backup.backup.metadata import PartMetadata
+from ch_backup.backup.part_cache import PartCache
+from ch_backup.storage.async_pipeline.stages.filesystem.download_progress import (
+    PROGRESS_FILE_NAME,
+)
+
+
+def _make_part(path: Path, name: str, data: bytes) -> PartMetadata:
+    (path / "proj.proj").mkdir(parents=True)
+    (path / "checksums.txt").write_bytes(name.encode())
+    (path / "proj.proj" / "data.bin").write_bytes(data)
+    return PartMetadata(
+        "db1",
+        "table1",
+        name,
+        md5(name.encode()).hexdigest(),
+        len(data),
+        ["checksums.txt", "proj.proj/data.bin"],
+        True,
+    )
+
+
+def test_cached_part_is_linked(tmp_path: Path) -> None:
+    cache = PartCache(str(tmp_path / "cache"), 1000)
+    part = _make_part(tmp_path / "downloaded", "all_1_1_0", b"data")
+    target_path = tmp_path / "detached" / "all_1_1_0"
+
+    assert not cache.get(part, str(target_path))
+    cache.put(part, str(tmp_path / "downloaded"))
+    assert cache.get(part, str(target_path))
+
+    target_file = target_path / "proj.proj" / "data.bin"
+    assert target_file.read_bytes() == b"data"
+    assert os.path.samefile(target_file, tmp_path / "downloaded/proj.proj/data.bin")
+
+
+def test_least_recently_used_parts_are_evicted(tmp_path: Path) -> None:
+    cache = PartCache(str(tmp_path / "cache"), 40)
+    parts = [
+        _make_part(tmp_path / name, name, b"x" * 10)
+        for name in ("all_1_1_0", "all_2_2_0", "all_3_3_0")
+    ]
+    cache.put(parts[0], str(tmp_path / "all_1_1_0"))
+    cache.put(parts[1], str(tmp_path / "all_2_2_0"))
+    assert cache.get(parts[0], str(tmp_path / "detached" / "all_1_1_0"))
+
+    cache.put(parts[2], str(tmp_path / "all_3_3_0"))
+
+    assert sorted(os.listdir(tmp_path / "cache")) == sorted(
+        [parts[0].checksum, parts[2].checksum]
+    )
+    # The state of the cache is restored from the directory
+    cache = PartCache(str(tmp_path / "cache"), 40)
+    assert not cache.get(parts[1], str(tmp_path / "detached" / "all_2_2_0"))
+    assert cache.get(parts[2], str(tmp_path / "detached" / "all_3_3_0"))
+
+
+def test_corrupted_entry_is_evicted(tmp_path: Path) -> None:
+    cache = PartCache(str(tmp_path / "cache"), 1000)
+    part = _make_part(tmp_path / "downloaded", "all_1_1_0", b"data")
+    cache.put(part, str(tmp_path / "downloaded"))
+    os.remove(tmp_path / "cache" / part.checksum / "proj.proj" / "data.bin")
+    target_path = tmp_path / "detached" / "all_1_1_0"
+
+    assert not cache.get(part, str(target_path))
+    assert not target_path.exists()
+    assert not os.listdir(tmp_path / "cache")
+
+
+def test_part_with_mismatched_checksum_is_not_cached(tmp_path: Path) -> None:
+    cache = PartCache(str(tmp_path / "cache"), 1000)
+    part = _make_part(tmp_path / "downloaded", "all_1_1_0", b"data")
+    (tmp_path / "downloaded" / "checksums.txt").write_bytes(b"other")
+
+    cache.put(part, str(tmp_path / "downloaded"))
+
+    assert not os.listdir(tmp_path / "cache")
+
+
+def test_part_is_linked_to_existing_target(tmp_path: Path) -> None:
+    cache = PartCache(str(tmp_path / "cache"), 1000)
+    part = _make_part(tmp_path / "downloaded", "all_1_1_0", b"data")
+    cache.put(part, str(tmp_path / "downloaded"))
+    target_path = tmp_path / "detached" / "all_1_1_0"
+    (target_path / "proj.proj").mkdir(parents=True)
+    (target_path / "proj.proj" / "data.bin").write_bytes(b"da")
+    (target_path / "partial.bin").write_bytes(b"partial")
+
+    assert cache.get(part, str(target_path))
+
+    assert sorted(str(p.relative_to(target_path)) for p in target_path.rglob("*")) == [
+        "checksums.txt",
+        "proj.proj",
+        "proj.proj/data.bin",
+    ]
+    assert (target_path / "proj.proj" / "data.bin").read_bytes() == b"data"
+    assert os.listdir(tmp_path / "cache") == [part.checksum]
+
+
+def test_cache_is_skipped_for_resumed_download(tmp_path: Path) -> None:
+    cache = PartCache(str(tmp_path / "cache"), 1000)
+    part = _make_part(tmp_path / "downloaded", "all_1_1_0", b"data")
+    cache.put(part, str(tmp_path / "downloaded"))
+    target_path = tmp_path / "detached" / "all_1_1_0"
+    target_path.mkdir(parents=True)
+    (target_path / PROGRESS_FILE_NAME).write_text("{}")
+
+    assert not cache.get(part, str(target_path))
+
+    assert os.listdir(target_path) == [PROGRESS_FILE_NAME]
+    assert os.listdir(tmp_path / "cache") == [part.checksum]
@@ -4,7 +4,7 @@ Unit tests partial restore matcher.
 
 import pytest
 
-from ch_backup.logic.partial_restore import PartialRestoreFilter
+from ch_backup.logic.partial_restore import PartialRestoreFilter, PartitionFilter
 
 
 @pytest.mark.parametrize(
@@ -30,3 +30,23 @@ def test_contains_table(patterns, db_name, table_name, included_result):
     assert pattern_matcher.accept_table(db_name, table_name) == included_result
     pattern_matcher_inverted = PartialRestoreFilter(patterns=patterns, inverted=True)
     assert pattern_matcher_inverted.accept_table(db_name, table_name) != included_result
+
+
+@pytest.mark.parametrize(
+    ("items", "part_name", "result"),
+    (
+        [[], "20240115_1_1_0", True],
+        [["20240115"], "20240115_1_1_0", True],
+        [["20240115"], "20240116_1_1_0", False],
+        [["202401", "202402"], "202402_3_5_1", True],
+        [["20240101..20240131"], "20240115_1_1_0", True],
+        [["20240101..20240131"], "20240131_1_1_0", True],
+        [["20240101..20240131"], "20240201_1_1_0", False],
+        [["9..10"], "10_1_1_0", True],
+        [["9..10"], "100_1_1_0", False],
+        [["a..c"], "b1e6c2b2a7c5a32e8d0c8bfe6ee8a2a1_1_1_0", True],
+        [["all"], "all_1_1_0", True],
+    ),
+)
+def test_partition_filter(items, part_name, result):
+    assert PartitionFilter(items).accept_part(part_name) == result
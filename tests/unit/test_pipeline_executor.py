@@ -0,0 +1,83 @@
+"""
+Unit tests for pipeline_executor module.
+"""
+
+import pickle
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, cast
+from unittest.mock import Mock, patch
+
+from ch_backup.config import DEFAULT_CONFIG
+from ch_backup.storage.async_pipeline import pipeline_executor
+from ch_backup.storage.async_pipeline.base_pipeline.exec_pool import ThreadExecPool
+from ch_backup.storage.async_pipeline.pipeline_executor import (
+    PipelineExecutor,
+    _JobConfig,
+)
+from ch_backup.storage.async_pipeline.tarball_ranges import TarballRange
+
+
+def test_job_config_delegates_to_config() -> None:
+    config = {"multiprocessing": {"workers": 4}}
+    job_config = _JobConfig(config)
+
+    assert job_config["multiprocessing"] == {"workers": 4}
+    assert job_config.get("pipeline") is None
+    assert job_config.get("pipeline", {}) == {}
+
+
+def test_job_config_is_pickled_as_worker_config_reference() -> None:
+    # pylint: disable=protected-access
+    worker_config = {"multiprocessing": {"workers": 4}}
+    pipeline_executor._init_worker(worker_config, {}, False)
+    try:
+        data = pickle.dumps(_JobConfig({"large": "x" * 1024 * 1024}))
+
+        assert len(data) < 1024
+        assert pickle.loads(data) is worker_config
+    finally:
+        pipeline_executor._WORKER_CONFIG = None
+
+
+def test_multipart_upload_is_aborted_on_failed_range(tmp_path: Path) -> None:
+    # pylint: disable=protected-access
+    config: dict = deepcopy(DEFAULT_CONFIG)
+    config["storage"]["chunk_size"] = 1024
+    config["multiprocessing"]["upload_range_size"] = 1024
+    (tmp_path / "data.bin").write_bytes(b"x" * 4096)
+    storage = Mock()
+    storage.create_multipart_upload.return_value = "upload1"
+
+    def upload_range(*args: Any) -> None:
+        tarball_range: TarballRange = args[6]
+        if tarball_range.start > 0:
+            raise RuntimeError("failed")
+
+    executor = PipelineExecutor.__new__(PipelineExecutor)
+    executor._config = config
+    executor._job_config = cast(dict, _JobConfig(config))
+    with (
+        ThreadExecPool(2) as pool,
+        patch.object(pipeline_executor, "get_storage_engine", return_value=storage),
+        patch.object(
+            pipeline_executor,
+            "upload_files_tarball_range_pipeline",
+            side_effect=upload_range,
+        ),
+    ):
+        executor._exec_pool = pool  # type: ignore[assignment]
+        executor.upload_files_tarball(
+            str(tmp_path),
+            "backup/data.tar",
+            is_async=True,
+            encryption=False,
+            delete=False,
+            compression=False,
+            files=["data.bin"],
+            size=4096,
+        )
+        pool.wait_all(keep_going=True)
+
+    storage.abort_multipart_upload.assert_called_once_with("backup/data.tar", "upload1")
+    storage.complete_multipart_upload.assert_not_called()
@@ -2,11 +2,18 @@
 Unit test for RateLimiter.
 """
 
+import copy
 from typing import List
+from unittest.mock import patch
 
 import pytest
 
-from ch_backup.storage.async_pipeline.base_pipeline.rate_limiter import RateLimiter
+from ch_backup.config import DEFAULT_CONFIG
+from ch_backup.storage.async_pipeline.base_pipeline.rate_limiter import (
+    RateLimiter,
+    SharedRateLimiter,
+)
+from ch_backup.storage.async_pipeline.pipeline_builder import PipelineBuilder
 from tests.unit.time_mocker import TimeMocker
 
 
@@ -24,10 +31,13 @@ from tests.unit.time_mocker import TimeMocker
         (123456, 5321, 23),
     ],
 )
-def test_rate_limiter_extract(data_size: int, rate: int, expected_time: int) -> None:
+@pytest.mark.parametrize("limiter_type", [RateLimiter, SharedRateLimiter])
+def test_rate_limiter_extract(
+    data_size: int, rate: int, expected_time: int, limiter_type: type
+) -> None:
     timer = TimeMocker()
     data = bytes("a" * data_size, encoding="utf-8")
-    rate_limiter = RateLimiter(rate, timer.time)
+    rate_limiter = limiter_type(rate, timer.time)
 
     while len(data) > 0:
         available = rate_limiter.extract_tokens(len(data))
@@ -59,3 +69,50 @@ def test_rate_limiter_grand(
         while not rate_limiter.grant(chunk_size):
             timer.sleep(1)
     assert timer.time() == expected_time
+
+
+def test_shared_rate_limiter() -> None:
+    timer = TimeMocker()
+    rate_limiter = SharedRateLimiter(10, timer.time)
+    # The copy shares the bucket state like the limiter passed to a worker process.
+    other_rate_limiter = copy.copy(rate_limiter)
+
+    assert rate_limiter.extract_tokens(6) == 6
+    assert other_rate_limiter.extract_tokens(6) == 4
+    assert not rate_limiter.grant(1)
+
+    timer.sleep(1)
+    assert other_rate_limiter.grant(10)
+    assert rate_limiter.extract_tokens(1) == 0
+
+
+@pytest.mark.parametrize(
+    "max_write_rate, total_rate_configured, expected_rates",
+    [
+        (0, False, []),
+        (100, False, [100]),
+        (0, True, [1000]),
+        (100, True, [100, 1000]),
+    ],
+)
+def test_rate_limiter_stages(
+    max_write_rate: int, total_rate_configured: bool, expected_rates: List[int]
+) -> None:
+    config: dict = copy.deepcopy(DEFAULT_CONFIG)
+    config["pipeline"]["runtime"] = "asyncio"
+    config["rate_limiter"]["max_write_rate"] = max_write_rate
+    global_rate_limiter = RateLimiter(1000) if total_rate_configured else None
+
+    with patch(
+        "ch_backup.storage.async_pipeline.pipeline_builder.get_global_rate_limiter",
+        return_value=global_rate_limiter,
+    ) as get_global_rate_limiter:
+        builder = PipelineBuilder(config)
+        # pylint: disable=protected-access
+        stages = builder._rate_limiter_stages("max_write_rate", "write", 1)
+
+    get_global_rate_limiter.assert_called_once_with("write")
+    assert [
+        stage.handler._rate_limiter._limit_per_sec  # pylint: disable=protected-access
+        for stage in stages
+    ] == expected_rates
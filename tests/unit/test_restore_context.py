@@ -0,0 +1,87 @@
+"""
+Unit tests for RestoreContext.
+"""
+
+import json
+from pathlib import Path
+
+from ch_backup.backup.metadata import PartMetadata
+from ch_backup.backup.restore_context import PartState, RestoreContext
+
+
+def _part(name: str) -> PartMetadata:
+    return PartMetadata("db1", "table1", name, "", 0, [], True)
+
+
+def _context(state_file: Path, threshold: int = 2) -> RestoreContext:
+    return RestoreContext(
+        {
+            "restore_context_path": str(state_file),
+            "restore_context_sync_threshold_ops": threshold,
+        }
+    )
+
+
+def test_state_changes_are_appended(tmp_path: Path) -> None:
+    state_file = tmp_path / "state.json"
+    context = _context(state_file)
+    context.change_part_state(PartState.DOWNLOADED, _part("all_1_1_0"))
+    context.change_part_state(PartState.RESTORED, _part("all_1_1_0"))
+    assert len(state_file.read_text().splitlines()) == 1
+
+    context.change_part_state(PartState.DOWNLOADED, _part("all_2_2_0"))
+    context.add_failed_part(_part("all_2_2_0"), ValueError("error"))
+    lines = state_file.read_text().splitlines()
+    assert [json.loads(line) for line in lines[1:]] == [
+        ["state", "db1", "table1", "all_2_2_0", "downloaded"],
+        ["failed_part", "db1", "table1", "all_2_2_0", "ValueError('error')"],
+    ]
+
+    context = _context(state_file)
+    assert context.part_restored(_part("all_1_1_0"))
+    assert context.part_downloaded(_part("all_2_2_0"))
+    assert not context.has_failed_parts()
+
+
+def test_journal_is_compacted(tmp_path: Path) -> None:
+    state_file = tmp_path / "state.json"
+    context = _context(state_file, threshold=1)
+    for state in [PartState.DOWNLOADED, PartState.RESTORED] * 3:
+        context.change_part_state(state, _part("all_1_1_0"))
+
+    assert len(state_file.read_text().splitlines()) <= 3
+    assert _context(state_file).part_restored(_part("all_1_1_0"))
+
+
+def test_incomplete_entry_is_skipped(tmp_path: Path) -> None:
+    state_file = tmp_path / "state.json"
+    context = _context(state_file, threshold=1)
+    context.change_part_state(PartState.DOWNLOADED, _part("all_1_1_0"))
+    context.change_part_state(PartState.DOWNLOADED, _part("all_2_2_0"))
+    with open(state_file, "a", encoding="utf-8") as f:
+        f.write('["state", "db1", "table1", "all_2_2_0", "rest')
+
+    context = _context(state_file)
+    assert context.part_downloaded(_part("all_1_1_0"))
+    assert context.part_downloaded(_part("all_2_2_0"))
+
+
+def test_state_of_previous_format_is_loaded(tmp_path: Path) -> None:
+    state_file = tmp_path / "state.json"
+    state_file.write_text(
+        json.dumps(
+            {
+                "databases": {"db1": {"table1": {"all_1_1_0": "restored"}}},
+                "failed": {},
+            }
+        )
+    )
+
+    context = _context(state_file)
+    assert context.part_restored(_part("all_1_1_0"))
+
+    context.change_part_state(PartState.DOWNLOADED, _part("all_2_2_0"))
+    context.dump_state()
+    context = _context(state_file)
+    assert context.part_restored(_part("all_1_1_0"))
+    assert context.part_downloaded(_part("all_2_2_0"))
@@ -2,11 +2,19 @@
 Unit test for RateLimiter.
 """
 
-from typing import List
+from typing import Any, List
+from unittest.mock import Mock, patch
 
 import pytest
+from botocore.exceptions import ClientError
 
-from ch_backup.storage.engine.s3.s3_retry import retry
+from ch_backup.storage.engine.s3.s3_retry import (
+    S3RetryingError,
+    S3RetryMeta,
+    ThrottlingBackoff,
+    is_throttling_error,
+    retry,
+)
 from tests.unit.time_mocker import TimeMocker
 
 
@@ -71,3 +79,77 @@ def test_rate_limiter_extract(
         last_execution_time = timer.time()
 
     some_s3_function()
+
+
+def test_throttling_backoff() -> None:
+    timer = TimeMocker()
+    backoff = ThrottlingBackoff(
+        initial_delay=1,
+        max_delay=4,
+        sleep_function=timer.sleep,
+        get_time_func=timer.time,
+    )
+
+    backoff.wait()
+    assert timer.time() == 0
+
+    for expected_delay in (1, 2, 4, 4):
+        backoff.on_throttled()
+        assert backoff.delay == expected_delay
+        start_time = timer.time()
+        backoff.wait()
+        assert expected_delay / 2 <= timer.time() - start_time <= expected_delay
+
+    for expected_delay in (2, 1, 0, 0):
+        backoff.on_success()
+        assert backoff.delay == expected_delay
+
+
+@pytest.mark.parametrize(
+    "code, status, expected",
+    [
+        ("SlowDown", 503, True),
+        ("ServiceUnavailable", 503, True),
+        ("TooManyRequests", 429, True),
+        ("Throttling", 400, True),
+        ("NoSuchKey", 404, False),
+        ("InternalError", 500, False),
+    ],
+)
+def test_is_throttling_error(code: str, status: int, expected: bool) -> None:
+    error = ClientError(
+        {"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}},
+        "UploadPart",
+    )
+    assert is_throttling_error(error) == expected
+
+
+@pytest.mark.parametrize(
+    "code, status, reset",
+    [
+        ("InternalError", 500, True),
+        ("BadGateway", 502, True),
+        ("SlowDown", 503, False),
+        ("NoSuchKey", 404, False),
+        ("AccessDenied", 403, False),
+    ],
+)
+def test_s3_client_is_reset_on_server_errors(
+    code: str, status: int, reset: bool
+) -> None:
+    engine = Mock()
+
+    def s3_operation(_engine: Any) -> None:
+        raise ClientError(
+            {"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}},
+            "GetObject",
+        )
+
+    with (
+        patch("ch_backup.storage.engine.s3.s3_retry._THROTTLING_BACKOFF"),
+        pytest.raises(S3RetryingError),
+    ):
+        S3RetryMeta.s3_exception_wrapper(s3_operation)(engine)
+
+    reset_mock = engine._s3_client_factory.reset  # pylint: disable=protected-access
+    assert reset_mock.called == reset
@@ -0,0 +1,41 @@
+"""
+Unit tests for S3StorageEngine.
+"""
+
+from typing import Tuple
+from unittest.mock import MagicMock
+
+import pytest
+
+from ch_backup.storage.engine.s3.s3_engine import S3StorageEngine
+
+
+def _engine() -> Tuple[S3StorageEngine, MagicMock, MagicMock]:
+    """
+    Return engine with mocked S3 client and multipart uploader.
+    """
+    s3_client_factory = MagicMock()
+    uploader = MagicMock()
+    engine = S3StorageEngine.__new__(S3StorageEngine)
+    # pylint: disable=protected-access
+    engine._s3_client_factory = s3_client_factory
+    engine._s3_bucket_name = "target"
+    engine._multipart_uploader = uploader
+    return engine, s3_client_factory.create_s3_client.return_value, uploader
+
+
+def test_failed_multipart_copy_is_aborted() -> None:
+    engine, s3_client, uploader = _engine()
+    s3_client.head_object.return_value = {
+        "ContentLength": S3StorageEngine.MAX_COPY_OBJECT_SIZE + 1
+    }
+    uploader.create_multipart_upload.return_value = "upload1"
+    uploader.upload_part_copy.side_effect = [None, RuntimeError("failed")]
+
+    with pytest.raises(RuntimeError):
+        engine.copy_file("source", "/backup/part.tar", "/backup/part.tar")
+
+    uploader.abort_multipart_upload.assert_called_once_with(
+        "backup/part.tar", "upload1"
+    )
+    uploader.complete_multipart_upload.assert_not_called()
@@ -3,7 +3,7 @@ Unit tests schema module.
 """
 
 from ch_backup.clickhouse.models import Table
-from ch_backup.clickhouse.schema import rewrite_table_schema
+from ch_backup.clickhouse.schema import get_table_dependencies, rewrite_table_schema
 from tests.unit.utils import parametrize
 
 UUID = "223b4576-76f0-4ed3-976f-46db82af82a9"
@@ -330,3 +330,78 @@ def test_rewrite_table_schema(
     )
     assert table.create_statement == result_table_schema
     assert table.engine == result_table_engine
+
+
+@parametrize(
+    {
+        "id": "MergeTree table without dependencies",
+        "args": {
+            "table_schema": "CREATE TABLE test_db.test_table (n Int32) ENGINE = MergeTree() ORDER BY n",
+            "table_engine": "MergeTree",
+            "result": set(),
+        },
+    },
+    {
+        "id": "MergeTree table with dictGet and joinGet in defaults",
+        "args": {
+            "table_schema": "CREATE TABLE test_db.test_table (n Int32, "
+            "s String DEFAULT dictGet('other_db.dict', 'value', n), "
+            "j String DEFAULT joinGet('join_table', 'value', n)) ENGINE = MergeTree() ORDER BY n",
+            "table_engine": "MergeTree",
+            "result": {("other_db", "dict"), ("test_db", "join_table")},
+        },
+    },
+    {
+        "id": "materialized view with TO clause",
+        "args": {
+            "table_schema": "ATTACH MATERIALIZED VIEW `test_db`.`test_table` TO `test_db`.`target` "
+            "(`n` Int32) AS SELECT n FROM `other_db`.`source` JOIN dim USING n",
+            "table_engine": "MaterializedView",
+            "result": {
+                ("test_db", "target"),
+                ("other_db", "source"),
+                ("test_db", "dim"),
+            },
+        },
+    },
+    {
+        "id": "materialized view with inner table",
+        "args": {
+            "table_schema": "CREATE MATERIALIZED VIEW test_db.test_table TO INNER UUID "
+            f"'{INNER_UUID}' (`n` Int32) ENGINE = MergeTree() ORDER BY n AS SELECT n FROM test_db.source",
+            "table_engine": "MaterializedView",
+            "result": {("test_db", "source")},
+        },
+    },
+    {
+        "id": "dictionary with ClickHouse source",
+        "args": {
+            "table_schema": "CREATE DICTIONARY test_db.test_table (id UInt64, value String) PRIMARY KEY id "
+            "SOURCE(CLICKHOUSE(HOST 'localhost' PORT 9000 USER 'default' TABLE 'source' DB 'other_db')) "
+            "LIFETIME(MIN 0 MAX 0) LAYOUT(FLAT())",
+            "table_engine": "Dictionary",
+            "result": {("other_db", "source")},
+        },
+    },
+    {
+        "id": "Distributed table",
+        "args": {
+            "table_schema": "CREATE TABLE test_db.test_table (n Int32) "
+            "ENGINE = Distributed('cluster', 'test_db', 'local_table', rand())",
+            "table_engine": "Distributed",
+            "result": {("test_db", "local_table")},
+        },
+    },
+)
+def test_get_table_dependencies(table_schema, table_engine, result):
+    table = Table(
+        database="test_db",
+        name="test_table",
+        create_statement=table_schema,
+        engine=table_engine,
+        disks=[],
+        data_paths=[],
+        metadata_path="",
+        uuid=UUID,
+    )
+    assert get_table_dependencies(table) == result
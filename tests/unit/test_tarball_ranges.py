@@ -0,0 +1,108 @@
+"""
+Unit tests for splitting of tarball uploads into ranges.
+"""
+
+from copy import deepcopy
+from math import ceil
+from pathlib import Path
+
+from ch_backup.config import DEFAULT_CONFIG
+from ch_backup.storage.async_pipeline.stages import (
+    ReadFilesTarballRangeStage,
+    ReadFilesTarballStage,
+)
+from ch_backup.storage.async_pipeline.tarball_ranges import split_tarball
+from tests.unit.utils import parametrize
+
+KIB = 1024
+MIB = 1024 * KIB
+
+
+@parametrize(
+    {"id": "range inside file", "args": {"start": 1000, "end": 2000}},
+    {"id": "range across files", "args": {"start": 700, "end": 9000}},
+    {"id": "range starts at header", "args": {"start": 512, "end": 2048}},
+    {"id": "whole tarball", "args": {"start": 0, "end": 100 * KIB}},
+)
+def test_read_files_tarball_range(tmp_path: Path, start: int, end: int) -> None:
+    files = [Path("a.bin"), Path("b.bin"), Path("long_name_" * 20 + ".bin")]
+    for i, file in enumerate(files):
+        (tmp_path / file).write_bytes(bytes([i + 1]) * (1000 + 3000 * i))
+
+    config = {"chunk_size": 700}
+    tarball = b"".join(ReadFilesTarballStage(config, tmp_path, files)())
+    tarball_range = b"".join(
+        ReadFilesTarballRangeStage(config, tmp_path, files, start, end)()
+    )
+
+    assert tarball_range == tarball[start:end]
+
+
+@parametrize(
+    {
+        "id": "not encrypted",
+        "args": {
+            "tarball_size": 100 * MIB + 1,
+            "encrypt": False,
+            "range_size": 20 * MIB,
+            "max_chunk_count": 10000,
+            "expected_chunk_size": 8 * MIB,
+            "expected_range_count": 7,
+        },
+    },
+    {
+        "id": "encrypted",
+        "args": {
+            "tarball_size": 100 * MIB + 1,
+            "encrypt": True,
+            "range_size": 20 * MIB,
+            "max_chunk_count": 10000,
+            "expected_chunk_size": 8 * MIB + 40,
+            "expected_range_count": 7,
+        },
+    },
+    {
+        "id": "chunk count limit",
+        "args": {
+            "tarball_size": 100 * MIB,
+            "encrypt": False,
+            "range_size": 20 * MIB,
+            "max_chunk_count": 5,
+            "expected_chunk_size": 24 * MIB,
+            "expected_range_count": 5,
+        },
+    },
+)
+# pylint: disable=too-many-positional-arguments
+def test_split_tarball(
+    tarball_size: int,
+    encrypt: bool,
+    range_size: int,
+    max_chunk_count: int,
+    expected_chunk_size: int,
+    expected_range_count: int,
+) -> None:
+    config: dict = deepcopy(DEFAULT_CONFIG)
+    config["storage"]["max_chunk_count"] = max_chunk_count
+    config["encryption"]["key"] = "a" * 32
+    encryption_chunk_size = 8 * MIB
+
+    chunk_size, ranges = split_tarball(config, tarball_size, encrypt, range_size)
+
+    assert chunk_size == expected_chunk_size
+    assert len(ranges) == expected_range_count
+    assert ranges[0].start == 0
+    assert ranges[0].first_part_num == 1
+    assert ranges[-1].end == tarball_size
+    for prev, next_ in zip(ranges, ranges[1:]):
+        assert prev.end == next_.start
+        size = prev.end - prev.start
+        if encrypt:
+            assert size % encryption_chunk_size == 0
+            size = size // encryption_chunk_size * (encryption_chunk_size + 40)
+        # Each range except the last one is uploaded as a whole number of chunks
+        assert size % chunk_size == 0
+        assert next_.first_part_num == prev.first_part_num + size // chunk_size
+    last_part_num = ranges[-1].first_part_num - 1
+    last_part_num += ceil((ranges[-1].end - ranges[-1].start) / chunk_size)
+    assert last_part_num <= max_chunk_count
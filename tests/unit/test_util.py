@@ -2,8 +2,11 @@
 Unit test for util module.
 """
 
+import time
 from pathlib import Path
+from unittest.mock import patch
 
+import psutil
 import pytest
 
 from ch_backup.clickhouse.models import Table
@@ -13,9 +16,12 @@ from ch_backup.util import (
     get_table_zookeeper_paths,
     is_equal_s3_endpoints,
     list_dir_files,
+    parallel_map,
     replace_macros,
     retry,
+    scan_dir_file_sizes,
     scan_dir_files,
+    set_idle_io_priority,
     strip_query,
 )
 
@@ -326,6 +332,53 @@ class TestScanDir:
 
         assert actual == expected
 
+    def test_scan_file_sizes_same_as_list(self):
+        # tests directory
+        dir_path = Path(__file__).parent.parent.resolve()
+        expected = list_dir_files(str(dir_path))
+        actual = scan_dir_file_sizes(str(dir_path))
+
+        assert sorted(file for file, _ in actual) == sorted(expected)
+        for file, size in actual:
+            assert (dir_path / file).stat().st_size == size
+
+
+@parametrize(
+    {
+        "id": "single thread",
+        "args": {
+            "threads": 1,
+        },
+    },
+    {
+        "id": "several threads",
+        "args": {
+            "threads": 4,
+        },
+    },
+)
+def test_parallel_map(threads):
+    def func(value):
+        time.sleep(0.001 * (value % 3))
+        return value * 2
+
+    assert list(parallel_map(func, range(20), threads)) == [i * 2 for i in range(20)]
+
+
+def test_parallel_map_is_lazy():
+    consumed = []
+
+    def values():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    results = parallel_map(lambda value: value, values(), 2)
+    assert next(results) == 0
+    results.close()
+
+    assert len(consumed) <= 5
+
 
 def test_replace_macros():
     assert replace_macros("{a}/{b}", {"a": "1", "b": "2"}) == "1/2"
@@ -354,3 +407,30 @@ def test_compare_s3_endpoints():
     endpoint_1 = "https://cloud-storage-1234QWERTYU.s3.yandexcloud.net/cloud_storage/qwerty1234/invalid-shard-1/"
     endpoint_2 = "https://s3.yandexcloud.net/cloud-storage-qwerty1234/cloud_storage/qwerty1234/invalid-shard-1/"
     assert not is_equal_s3_endpoints(endpoint_1, endpoint_2)
+
+
+class TestSetIdleIoPriority:
+    """
+    Tests for set_idle_io_priority() function.
+    """
+
+    def test_idle_class_is_set(self) -> None:
+        with patch("ch_backup.util.psutil.Process") as process:
+            set_idle_io_priority()
+
+        process.return_value.ionice.assert_called_once_with(psutil.IOPRIO_CLASS_IDLE)
+
+    @parametrize(
+        {"id": "os error", "args": {"error": OSError("not supported")}},
+        {"id": "no ionice", "args": {"error": AttributeError("ionice")}},
+    )
+    def test_unsupported_platform_is_ignored(self, error: Exception) -> None:
+        with patch("ch_backup.util.psutil.Process") as process:
+            process.return_value.ionice.side_effect = error
+            set_idle_io_priority()
+
+    def test_missing_idle_class_is_ignored(self) -> None:
+        with patch("ch_backup.util.psutil", spec=["Process"]) as psutil_mock:
+            set_idle_io_priority()
+
+        psutil_mock.Process.return_value.ionice.assert_not_called()
@@ -0,0 +1,164 @@
+"""
+Unit tests for WriteFilesStage.
+"""
+
+import grp
+import os
+import pwd
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from ch_backup.storage.async_pipeline.stages import (
+    ReadFilesTarballStage,
+    WriteFilesStage,
+)
+from ch_backup.storage.async_pipeline.stages.filesystem.download_progress import (
+    PROGRESS_FILE_NAME,
+    DownloadProgress,
+)
+
+KIB = 1024
+
+
+def test_files_are_written_with_owner(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    files = [Path("a.bin"), Path("proj.proj/b.bin"), Path("proj.proj/c.bin")]
+    for i, file in enumerate(files):
+        (source_dir / file).parent.mkdir(parents=True, exist_ok=True)
+        (source_dir / file).write_bytes(bytes([i + 1]) * (1000 + 3000 * i))
+
+    target_dir = tmp_path / "detached" / "part"
+    target_dir.mkdir(parents=True)
+    owner = (
+        pwd.getpwuid(os.getuid()).pw_name,
+        grp.getgrgid(os.getgid()).gr_name,
+    )
+    stage = WriteFilesStage({}, target_dir, 64 * KIB, owner)
+
+    with (
+        patch("os.chown") as chown_mock,
+        patch("os.fchown") as fchown_mock,
+    ):
+        for chunk in ReadFilesTarballStage({"chunk_size": 700}, source_dir, files)():
+            stage(chunk, 0)
+        stage.on_done()
+
+    for file in files:
+        assert (target_dir / file).read_bytes() == (source_dir / file).read_bytes()
+    assert [call.args[0] for call in chown_mock.call_args_list] == [
+        target_dir,
+        target_dir / "proj.proj",
+    ]
+    assert fchown_mock.call_count == len(files)
+    assert all(
+        call.args[1:] == (os.getuid(), os.getgid())
+        for call in fchown_mock.call_args_list
+    )
+
+
+def test_files_are_written_without_owner(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    (source_dir / "a.bin").write_bytes(b"a" * 1000)
+    target_dir = tmp_path / "part"
+
+    stage = WriteFilesStage({}, target_dir, 64 * KIB)
+    with patch("os.fchown") as fchown_mock:
+        for chunk in ReadFilesTarballStage(
+            {"chunk_size": 700}, source_dir, [Path("a.bin")]
+        )():
+            stage(chunk, 0)
+        stage.on_done()
+
+    assert (target_dir / "a.bin").read_bytes() == b"a" * 1000
+    fchown_mock.assert_not_called()
+
+
+def test_files_are_preallocated_and_keep_mtime(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    (source_dir / "a.bin").write_bytes(b"a" * 5000)
+    (source_dir / "empty.bin").write_bytes(b"")
+    os.utime(source_dir / "a.bin", (1600000000, 1600000000))
+    target_dir = tmp_path / "part"
+
+    stage = WriteFilesStage({"preallocate_files": True}, target_dir, 64 * KIB)
+    with patch("os.posix_fallocate", wraps=os.posix_fallocate) as fallocate_mock:
+        for chunk in ReadFilesTarballStage(
+            {"chunk_size": 700}, source_dir, [Path("a.bin"), Path("empty.bin")]
+        )():
+            stage(chunk, 0)
+        stage.on_done()
+
+    assert (target_dir / "a.bin").read_bytes() == b"a" * 5000
+    assert (target_dir / "a.bin").stat().st_mtime == 1600000000
+    assert (target_dir / "empty.bin").read_bytes() == b""
+    assert [call.args[1:] for call in fallocate_mock.call_args_list] == [(0, 5000)]
+
+
+@pytest.mark.parametrize("interrupted_at", [3, 10, 17, 30])
+def test_download_is_resumed_from_checkpoint(
+    tmp_path: Path, interrupted_at: int
+) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    files = [Path("a.bin"), Path("b" * 120 + ".bin"), Path("c.bin")]
+    for i, file in enumerate(files):
+        (source_dir / file).write_bytes(os.urandom(3000 + 5000 * i))
+    stream = b"".join(ReadFilesTarballStage({"chunk_size": 700}, source_dir, files)())
+    chunks = [stream[i : i + KIB] for i in range(0, len(stream), KIB)]
+    target_dir = tmp_path / "part"
+    target_dir.mkdir()
+
+    def _progress() -> DownloadProgress:
+        progress = DownloadProgress(target_dir, "backup/part.tar", 4 * KIB, 2 * KIB)
+        progress.load()
+        return progress
+
+    stage = WriteFilesStage({}, target_dir, 64 * KIB, progress=_progress())
+    for chunk in chunks[:interrupted_at]:
+        stage(chunk, 0)
+    del stage
+
+    progress = _progress()
+    assert progress.offset <= interrupted_at * KIB
+    assert progress.offset % (2 * KIB) == 0
+
+    stage = WriteFilesStage({}, target_dir, 64 * KIB, progress=progress)
+    for chunk in chunks[progress.offset // KIB :]:
+        stage(chunk, 0)
+    stage.on_done()
+
+    for file in files:
+        assert (target_dir / file).read_bytes() == (source_dir / file).read_bytes()
+    assert not (target_dir / PROGRESS_FILE_NAME).exists()
+
+
+def test_download_progress_is_ignored_if_not_valid(tmp_path: Path) -> None:
+    (tmp_path / "a.bin").write_bytes(b"a" * 1000)
+    DownloadProgress(tmp_path, "backup1/part.tar", KIB).save(
+        8 * KIB,
+        {"state": 1, "bytes_to_process": 0, "name": None},
+        {"a.bin": 1000},
+    )
+
+    progress = DownloadProgress(tmp_path, "backup1/part.tar", KIB)
+    progress.load()
+    assert progress.offset == 8 * KIB
+
+    progress = DownloadProgress(tmp_path, "backup2/part.tar", KIB)
+    progress.load()
+    assert progress.offset == 0
+
+    (tmp_path / "a.bin").write_bytes(b"a" * 10)
+    progress = DownloadProgress(tmp_path, "backup1/part.tar", KIB)
+    progress.load()
+    assert progress.offset == 0
+
+
+def test_download_progress_source_offset(tmp_path: Path) -> None:
+    progress = DownloadProgress(tmp_path, "backup/part.tar", KIB, 100, 140)
+    progress.offset = 300
+    assert progress.source_offset == 420